@@ -0,0 +1,50 @@
+from fastapi import Header, HTTPException, Request
+
+from core.config import get_settings
+from core.session import SessionClaims, SessionTokenError, get_session_manager
+from services.user_service import normalize_email
+
+
+def get_session_claims(
+    authorization: str | None = Header(None, description="Bearer session token from /users/login"),
+) -> SessionClaims | None:
+    """Verify an optional bearer session token locally (no database read).
+
+    Requests without a token return None so email-only clients keep working;
+    a token that is present but invalid is rejected.
+    """
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Authorization header must be 'Bearer <token>'")
+    try:
+        return get_session_manager().verify(token.strip())
+    except SessionTokenError as exc:
+        raise HTTPException(status_code=401, detail=str(exc))
+
+
+def session_user_id(claims: SessionClaims | None, email: str) -> str | None:
+    """User id from the session when it belongs to `email`, else None (look up by email)."""
+    if claims is None:
+        return None
+    if claims.email != normalize_email(email):
+        raise HTTPException(status_code=403, detail="Session does not belong to this email")
+    return claims.user_id
+
+
+def client_ip(request: Request) -> str:
+    """Address of the client, looking through trusted proxies (FORWARDED_ALLOW_IPS).
+
+    X-Forwarded-For is read right to left, skipping trusted proxies, so a
+    client cannot spoof its address by sending the header itself.
+    """
+    peer = request.client.host if request.client else ""
+    trusted = {item.strip() for item in get_settings().FORWARDED_ALLOW_IPS.split(",") if item.strip()}
+    if not trusted or ("*" not in trusted and peer not in trusted):
+        return peer
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if "*" in trusted or hop not in trusted:
+            return hop
+    return hops[0] if hops else peer
@@ -19,6 +19,7 @@ ERROR_RESPONSES: dict[int | str, dict[str, Any]] = {
     "404": {"model": ErrorResponse, "description": "Not found"},
     "409": {"model": ErrorResponse, "description": "Conflict"},
     "422": {"model": ErrorResponse, "description": "Validation error"},
+    "429": {"model": ErrorResponse, "description": "Too many requests"},
     "501": {"model": ErrorResponse, "description": "Not implemented"},
     "503": {"model": ErrorResponse, "description": "Service unavailable"},
     "409": {"model": ErrorResponse, "description": "Conflict"},
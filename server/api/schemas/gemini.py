@@ -87,6 +87,19 @@ class BatchIncidentExtractionRequest(BaseModel):
     )
 
 
+class BatchItemError(BaseModel):
+    """A batch item that could not be processed."""
+    
+    index: int = Field(
+        ...,
+        description="Position of the text in the request"
+    )
+    error: str = Field(
+        ...,
+        description="Why extraction failed (API error, timeout, unparseable response)"
+    )
+
+
 class BatchIncidentExtractionResponse(BaseModel):
     """Response containing extractions for multiple texts."""
     
@@ -102,3 +115,7 @@ class BatchIncidentExtractionResponse(BaseModel):
         ...,
         description="Number of texts that failed processing"
     )
+    errors: list[BatchItemError] = Field(
+        default_factory=list,
+        description="Failed items; their entries in results are non-incidents"
+    )
@@ -1,7 +1,13 @@
+from typing import Annotated
+
 from pydantic import BaseModel, Field, model_validator
 
 from api.schemas.base import BaseResponse
 
+# Same bounds as the single-point nearby query; NaN and infinity are rejected.
+Latitude = Annotated[float, Field(ge=-90, le=90, allow_inf_nan=False)]
+Longitude = Annotated[float, Field(ge=-180, le=180, allow_inf_nan=False)]
+
 
 class AutocompleteSuggestion(BaseModel):
     place_id: str
@@ -12,21 +18,14 @@ class AutocompleteSuggestion(BaseModel):
 
 class AutocompleteResponse(BaseResponse):
     suggestions: list[AutocompleteSuggestion]
+    # stations | cache | prefix | google | superseded
+    source: str | None = None
+    session_upstream_calls_saved: int | None = None
 
 
 class NearestStationRequest(BaseModel):
-    place_id: str | None = None
-    latitude: float | None = None
-    longitude: float | None = None
-
-    @model_validator(mode="after")
-    def validate_location_input(self) -> "NearestStationRequest":
-        # Require one of: Google place_id or explicit latitude/longitude.
-        has_place_id = bool(self.place_id)
-        has_coordinates = self.latitude is not None and self.longitude is not None
-        if not has_place_id and not has_coordinates:
-            raise ValueError("Provide either place_id or latitude and longitude")
-        return self
+    departure_place_id: str = Field(..., min_length=1)
+    destination_place_id: str = Field(..., min_length=1)
 
 
 class UserLocation(BaseModel):
@@ -35,7 +34,54 @@ class UserLocation(BaseModel):
 
 
 class NearestStationResponse(BaseResponse):
-    nearest_station: str
-    station_line: str | None = None
+    departure_nearest_station: str
+    destination_nearest_station: str
+    departure_station_line: str | None = None
+    destination_station_line: str | None = None
+    departure_distance_km: float = Field(..., ge=0)
+    destination_distance_km: float = Field(..., ge=0)
+    departure_user_location: UserLocation
+    destination_user_location: UserLocation
+
+
+class NearbyStation(BaseModel):
+    code: str | None = None
+    name: str
+    line: str | None = None
+    latitude: float
+    longitude: float
     distance_km: float = Field(..., ge=0)
-    user_location: UserLocation
+
+
+class NearbyStationsResponse(BaseResponse):
+    stations: list[NearbyStation]
+
+
+class JourneyLeg(BaseModel):
+    line: str | None = None
+    stations: list[str]
+
+
+class JourneyResponse(BaseResponse):
+    stations: list[str]
+    legs: list[JourneyLeg]
+    minutes: int = Field(..., ge=0)
+    interchanges: int = Field(..., ge=0)
+
+
+class NearestStationBatchRequest(BaseModel):
+    latitudes: list[Latitude] = Field(..., min_length=1, max_length=10_000)
+    longitudes: list[Longitude] = Field(..., min_length=1, max_length=10_000)
+    line: str | None = None
+
+    @model_validator(mode="after")
+    def validate_lengths(self) -> "NearestStationBatchRequest":
+        if len(self.latitudes) != len(self.longitudes):
+            raise ValueError("latitudes and longitudes must have the same length")
+        return self
+
+
+class NearestStationBatchResponse(BaseResponse):
+    station_indices: list[int | None]
+    station_codes: list[str | None]
+    distances_km: list[float | None]
@@ -41,3 +41,6 @@ class LoginUserRequest(BaseModel):
 
 class LoginUserResponse(BaseResponse):
     email: str
+    user_id: str | None = None
+    session_token: str | None = None
+    session_expires_at: int | None = None
@@ -1,18 +1,28 @@
+import asyncio
+import datetime
+from collections.abc import AsyncIterator
 from typing import Any
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from api.schemas.base import BaseResponse, ERROR_RESPONSES
 from api.schemas.user import SendTokenRequest, SendTokenResponse
+from core.config import get_settings
 from services.alert_service import (
     end_alert,
     get_alert,
+    get_alert_changes,
+    get_alert_stream_replay,
     notify_affected_users,
     predict_end_time_and_trigger,
     send_alert_to_device,
     trigger_alert,
 )
+from services.alert_stream_service import get_alert_stream_hub
+from services.occupancy_service import estimate_alert_impact, get_occupancy_table
+from services.schedule_engine import rider_week_minute
 
 router = APIRouter()
 
@@ -54,6 +64,38 @@ class AlertIdResponse(BaseResponse):
     alert_id: str
 
 
+class AlertDryRunRequest(BaseModel):
+    affected_stations: list[str] = Field(..., min_length=1)
+    # Unix seconds; defaults to now, which matches what notify-affected-user would hit.
+    timestamp: float | None = None
+    duration_minutes: int = Field(0, ge=0, le=1440)
+    bucket_minutes: int = Field(15, ge=1, le=1440)
+    sample_size: int = Field(10, ge=0, le=100)
+
+
+class StationRecipients(BaseModel):
+    station: str
+    recipients: int
+
+
+class TimeBucketRecipients(BaseModel):
+    day: str
+    time: str
+    recipients: int
+
+
+class RecipientSample(BaseModel):
+    user_id: str
+    stations: list[str]
+
+
+class AlertDryRunResponse(BaseResponse):
+    total_recipients: int
+    stations: list[StationRecipients]
+    buckets: list[TimeBucketRecipients]
+    sample: list[RecipientSample]
+
+
 class TriggerAlertRequest(BaseModel):
     alert_id: str
     title: str
@@ -73,6 +115,10 @@ class AlertDataResponse(BaseResponse):
 
 class AlertsListResponse(BaseResponse):
     alerts: list[dict[str, Any]]
+    deleted_alert_ids: list[str] = Field(default_factory=list)
+    watermark: float | None = None
+    # True when `alerts` is the full list, to replace rather than merge.
+    full_sync: bool = True
 
 
 class EndAlertRequest(BaseModel):
@@ -103,6 +149,25 @@ def notify_affected_users_endpoint(payload: NotifyAffectedUsersRequest) -> Alert
     return AlertIdResponse(status="success", message="Alert created", alert_id=alert_id)
 
 
+@router.post(
+    "/notify-affected-user/dry-run",
+    response_model=AlertDryRunResponse,
+    responses=ERROR_RESPONSES,
+)
+def notify_affected_users_dry_run_endpoint(payload: AlertDryRunRequest) -> AlertDryRunResponse:
+    """Count who an alert would reach, per station and time bucket, without sending it."""
+    if not get_occupancy_table().ready:
+        raise HTTPException(status_code=503, detail="Occupancy table is still loading")
+    impact = estimate_alert_impact(
+        affected_stations=payload.affected_stations,
+        start_minute=rider_week_minute(payload.timestamp),
+        duration_minutes=payload.duration_minutes,
+        bucket_minutes=payload.bucket_minutes,
+        sample_size=payload.sample_size,
+    )
+    return AlertDryRunResponse(status="success", message="Alert impact estimated", **impact)
+
+
 @router.post(
     "/predict-end-time-trigger",
     response_model=AlertDataResponse,
@@ -156,6 +221,86 @@ def end_alert_endpoint(payload: EndAlertRequest) -> EndAlertAndRefreshResponse:
 )
 def get_alert_endpoint(
     device_token: str = Query(..., description="Device token"),
+    since: float | None = Query(
+        None,
+        description="Watermark (Unix seconds) from a previous response; returns only changes after it",
+    ),
 ) -> AlertsListResponse:
-    alerts = get_alert(device_token=device_token)
-    return AlertsListResponse(status="success", message="Alerts fetched", alerts=alerts)
+    # Taken before reading so writes racing this request are re-sent next time.
+    watermark = datetime.datetime.now(datetime.timezone.utc)
+    retention = datetime.timedelta(days=get_settings().DELTA_SYNC_RETENTION_DAYS)
+    # Tombstones past the retention window may have expired, so resend everything.
+    full_sync = since is None or since < (watermark - retention).timestamp()
+    if full_sync:
+        alerts = get_alert(device_token=device_token)
+        deleted_alert_ids: list[str] = []
+    else:
+        since_dt = datetime.datetime.fromtimestamp(since, tz=datetime.timezone.utc)
+        alerts, deleted_alert_ids = get_alert_changes(device_token=device_token, since=since_dt)
+    return AlertsListResponse(
+        status="success",
+        message="Alerts fetched",
+        alerts=alerts,
+        deleted_alert_ids=deleted_alert_ids,
+        watermark=watermark.timestamp(),
+        full_sync=full_sync,
+    )
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses=ERROR_RESPONSES,
+)
+async def alert_stream_endpoint(
+    request: Request,
+    device_token: str = Query(..., description="Device token"),
+    last_event_id: int | None = Query(None, description="Resume after this event id"),
+    last_event_id_header: int | None = Header(None, alias="Last-Event-ID"),
+) -> StreamingResponse:
+    """Server-Sent Events stream of alert changes for one device token.
+
+    Emits `alert`, `alert_updated` and `alert_ended` events. Reconnecting
+    clients send `Last-Event-ID` (or `last_event_id`) to replay missed events;
+    ids are stored timestamps, so any worker can resume the stream.
+    """
+    heartbeat_seconds = get_settings().ALERT_STREAM_HEARTBEAT_SECONDS
+    hub = get_alert_stream_hub()
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+    subscription, replay = hub.subscribe(device_token, last_event_id=resume_from)
+    if replay is None:
+        # This worker's buffer does not reach back that far.
+        try:
+            replay = await asyncio.to_thread(get_alert_stream_replay, device_token, resume_from)
+        except BaseException:
+            hub.unsubscribe(subscription)
+            raise
+    # Live events can repeat the replay when a change lands while it is read.
+    replayed = set(replay)
+
+    async def event_source() -> AsyncIterator[str]:
+        try:
+            yield f"retry: {heartbeat_seconds * 1000}\n\n"
+            for event in replay:
+                yield event.encode()
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await subscription.next_event(timeout=heartbeat_seconds)
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                if event in replayed:
+                    continue
+                yield event.encode()
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,50 @@
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from api.schemas.base import BaseResponse, ERROR_RESPONSES
+from services.occupancy_service import get_occupancy_table, station_occupancy
+
+router = APIRouter()
+
+# endpoint = api/v1/analytics/
+
+DayOfWeek = Literal["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+class OccupancyBucket(BaseModel):
+    day: str
+    time: str
+    count: int
+
+
+class StationOccupancyResponse(BaseResponse):
+    station: str
+    total: int
+    bucket_minutes: int
+    buckets: list[OccupancyBucket]
+
+
+@router.get(
+    "/occupancy",
+    response_model=StationOccupancyResponse,
+    responses=ERROR_RESPONSES,
+)
+def station_occupancy_endpoint(
+    station: str = Query(..., min_length=2, description="Station code, e.g. KJ15"),
+    day: DayOfWeek | None = Query(None, description="Limit to one day; whole week if omitted"),
+    bucket_minutes: int = Query(15, ge=1, le=1440),
+) -> StationOccupancyResponse:
+    """Return how many subscribed commuters pass a station in each time bucket."""
+    if not get_occupancy_table().ready:
+        raise HTTPException(status_code=503, detail="Occupancy table is still loading")
+    result = station_occupancy(station, day, bucket_minutes)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown station")
+    return StationOccupancyResponse(
+        status="success",
+        message="Station occupancy fetched",
+        bucket_minutes=bucket_minutes,
+        **result,
+    )
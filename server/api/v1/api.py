@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from api.v1 import alerts, incidents, locations, report, route, users
+from api.v1 import alerts, analytics, incidents, locations, report, route, users
 
 api_router = APIRouter()
 api_router.include_router(alerts.router, prefix="/alerts", tags=["alerts"])
@@ -9,3 +9,4 @@ api_router.include_router(locations.router, prefix="/locations", tags=["location
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(route.router, prefix="/route", tags=["route"])
 api_router.include_router(report.router, prefix="/report", tags=["report"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
@@ -1,13 +1,28 @@
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 
 from api.schemas.base import ERROR_RESPONSES
 from api.schemas.location import (
     AutocompleteSuggestion,
     AutocompleteResponse,
+    JourneyLeg,
+    JourneyResponse,
+    NearbyStation,
+    NearbyStationsResponse,
+    NearestStationBatchRequest,
+    NearestStationBatchResponse,
     NearestStationRequest,
     NearestStationResponse,
 )
-from services.google_maps_service import autocomplete_locations, resolve_nearest_station_by_place_id
+from services.autocomplete_service import SOURCE_SUPERSEDED, get_autocomplete_service
+from services.google_maps_service import (
+    find_nearest_stations_batch,
+    find_stations_nearby,
+    resolve_nearest_station_by_place_id,
+)
+from services.journey_planner import journey_to_dict, plan_journey
+from services.station_catalog import CATALOG_FORMATS, FORMAT_ROWS, accepts_gzip, get_station_catalog
 
 router = APIRouter()
 
@@ -17,17 +32,30 @@ router = APIRouter()
     response_model=AutocompleteResponse,
     responses=ERROR_RESPONSES,
 )
-def autocomplete(query: str = Query(..., min_length=2, description="Address input")) -> AutocompleteResponse:
+async def autocomplete(
+    query: str = Query(..., min_length=2, description="Address input"),
+    session_token: str | None = Query(
+        None,
+        max_length=128,
+        description="Places session token; reuse it for every keystroke of one search",
+    ),
+) -> AutocompleteResponse:
     """Return Google autocomplete suggestions for user-typed address text."""
     try:
-        suggestions = autocomplete_locations(query=query, limit=5)
+        result = await get_autocomplete_service().autocomplete(query=query, limit=5, session_token=session_token)
     except RuntimeError as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
     return AutocompleteResponse(
         status="success",
-        message="Autocomplete suggestions fetched",
-        suggestions=[AutocompleteSuggestion(**item) for item in suggestions],
+        message=(
+            "Superseded by a newer query"
+            if result.source == SOURCE_SUPERSEDED
+            else "Autocomplete suggestions fetched"
+        ),
+        suggestions=[AutocompleteSuggestion(**item) for item in result.suggestions],
+        source=result.source,
+        session_upstream_calls_saved=result.session.upstream_calls_saved if result.session else None,
     )
 
 
@@ -36,11 +64,14 @@ def autocomplete(query: str = Query(..., min_length=2, description="Address inpu
     response_model=NearestStationResponse,
     responses=ERROR_RESPONSES,
 )
-def nearest_station(payload: NearestStationRequest) -> NearestStationResponse:
+async def nearest_station(payload: NearestStationRequest) -> NearestStationResponse:
     """Return nearest rail stations for departure and destination place IDs."""
     try:
-        departure_result = resolve_nearest_station_by_place_id(place_id=payload.departure_place_id)
-        destination_result = resolve_nearest_station_by_place_id(place_id=payload.destination_place_id)
+        # Both geocodes run concurrently over the shared connection pool.
+        departure_result, destination_result = await asyncio.gather(
+            resolve_nearest_station_by_place_id(place_id=payload.departure_place_id),
+            resolve_nearest_station_by_place_id(place_id=payload.destination_place_id),
+        )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     except RuntimeError as exc:
@@ -58,3 +89,94 @@ def nearest_station(payload: NearestStationRequest) -> NearestStationResponse:
         departure_user_location=departure_result["user_location"],
         destination_user_location=destination_result["user_location"],
     )
+
+
+@router.post(
+    "/nearest-station/batch",
+    response_model=NearestStationBatchResponse,
+    responses=ERROR_RESPONSES,
+)
+def nearest_station_batch(payload: NearestStationBatchRequest) -> NearestStationBatchResponse:
+    """Return the nearest station for each coordinate pair, in input order."""
+    result = find_nearest_stations_batch(payload.latitudes, payload.longitudes, line=payload.line)
+    return NearestStationBatchResponse(
+        status="success",
+        message="Nearest stations calculated",
+        **result,
+    )
+
+
+@router.get(
+    "/stations/nearby",
+    response_model=NearbyStationsResponse,
+    responses=ERROR_RESPONSES,
+)
+def stations_nearby(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=50, description="Maximum stations to return"),
+    radius_km: float | None = Query(None, gt=0, description="Only stations within this distance"),
+    line: str | None = Query(None, description="Restrict to one line, e.g. 'LRT Kelana Jaya Line'"),
+) -> NearbyStationsResponse:
+    """Return the closest stations to a coordinate, closest first."""
+    stations = find_stations_nearby(latitude, longitude, k=k, radius_km=radius_km, line=line)
+    return NearbyStationsResponse(
+        status="success",
+        message="Nearby stations fetched",
+        stations=[NearbyStation(**item) for item in stations],
+    )
+
+
+@router.get(
+    "/journey",
+    response_model=JourneyResponse,
+    responses=ERROR_RESPONSES,
+)
+def journey(
+    departing_station: str = Query(..., min_length=2, description="Station code, e.g. KJ01"),
+    destination_station: str = Query(..., min_length=2, description="Station code, e.g. KJ20"),
+) -> JourneyResponse:
+    """Return the fastest station sequence between two stations, split into per-line legs."""
+    planned = plan_journey(departing_station, destination_station)
+    if planned is None:
+        raise HTTPException(status_code=404, detail="No journey found between these stations")
+    result = journey_to_dict(planned)
+    return JourneyResponse(
+        status="success",
+        message="Journey planned",
+        stations=result["stations"],
+        legs=[JourneyLeg(**leg) for leg in result["legs"]],
+        minutes=result["minutes"],
+        interchanges=result["interchanges"],
+    )
+
+@router.get(
+    "/stations",
+    responses={
+        **ERROR_RESPONSES,
+        200: {"description": "Station catalog (JSON, optionally gzip-encoded)"},
+        304: {"description": "Client copy is current"},
+    },
+)
+def station_catalog(
+    format: str = Query(FORMAT_ROWS, pattern=f"^({'|'.join(CATALOG_FORMATS)})$", description="rows or columnar"),
+    if_none_match: str | None = Header(None),
+    accept_encoding: str | None = Header(None),
+) -> Response:
+    """Return the versioned station catalog; 304 when the client's ETag is current."""
+    catalog = get_station_catalog()
+    encoded = catalog.get(format)
+    use_gzip = accepts_gzip(accept_encoding)
+    headers = {
+        "ETag": encoded.gzip_etag if use_gzip else encoded.etag,
+        "X-Catalog-Version": catalog.version,
+        # Clients revalidate every time; unchanged catalogs cost a 304.
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if catalog.is_current(format, if_none_match):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=encoded.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=encoded.body, media_type="application/json", headers=headers)
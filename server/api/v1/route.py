@@ -1,16 +1,22 @@
 import datetime
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, EmailStr, Field
 
+from api.deps import get_session_claims, session_user_id
 from api.schemas.base import BaseResponse, ERROR_RESPONSES
+from core.config import get_settings
+from core.session import SessionClaims
 from services.route_service import (
     add_schedule,
+    add_schedules_batch,
     create_route,
+    create_routes_batch,
     delete_route,
     edit_route,
     get_all_routes_by_email,
     get_next_upcoming_route,
+    get_route_changes_by_email,
     get_specific_route,
     get_user_routes_with_schedules,
 )
@@ -54,6 +60,47 @@ class AddScheduleRequest(BaseModel):
     time_to: str
 
 
+class BatchRouteItem(BaseModel):
+    departing_location: str
+    destination_location: str
+    day_of_week: str
+    time: datetime.time
+    departing_station: str
+    destination_station: str
+    route_desc: str
+
+
+class BatchCreateRoutesRequest(BaseModel):
+    email: EmailStr
+    routes: list[BatchRouteItem] = Field(..., min_length=1, max_length=50)
+
+
+class BatchScheduleItem(BaseModel):
+    route_id: str
+    day_of_week: str
+    time_from: str
+    time_to: str
+
+
+class BatchAddSchedulesRequest(BaseModel):
+    user_id: str
+    schedules: list[BatchScheduleItem] = Field(..., min_length=1, max_length=200)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str
+    route_id: str | None = None
+    schedule_id: str | None = None
+    error: str | None = None
+
+
+class BatchResultsResponse(BaseResponse):
+    results: list[BatchItemResult]
+    created_count: int
+    failed_count: int
+
+
 class RouteIdResponse(BaseResponse):
     route_id: str
 
@@ -64,6 +111,10 @@ class ScheduleIdResponse(BaseResponse):
 
 class RoutesListResponse(BaseResponse):
     routes: list["RouteListItem"]
+    deleted_route_ids: list[str] = Field(default_factory=list)
+    watermark: float | None = None
+    # True when `routes` is the full list, to replace rather than merge.
+    full_sync: bool = True
 
 
 class RouteListItem(BaseModel):
@@ -108,9 +159,13 @@ class NextUpcomingRouteItem(BaseModel):
     response_model=RouteIdResponse,
     responses=ERROR_RESPONSES,
 )
-def create_route_endpoint(payload: RouteScheduleRequest) -> RouteIdResponse:
+def create_route_endpoint(
+    payload: RouteScheduleRequest,
+    session: SessionClaims | None = Depends(get_session_claims),
+) -> RouteIdResponse:
     route_id = create_route(
         email=str(payload.email),
+        user_id=session_user_id(session, str(payload.email)),
         departing_location=payload.departing_location,
         destination_location=payload.destination_location,
         day_of_week=payload.day_of_week,
@@ -134,9 +189,13 @@ def create_route_endpoint(payload: RouteScheduleRequest) -> RouteIdResponse:
     response_model=RouteIdResponse,
     responses=ERROR_RESPONSES,
 )
-def edit_route_endpoint(payload: EditRouteRequest) -> RouteIdResponse:
+def edit_route_endpoint(
+    payload: EditRouteRequest,
+    session: SessionClaims | None = Depends(get_session_claims),
+) -> RouteIdResponse:
     route_id = edit_route(
         email=str(payload.email),
+        user_id=session_user_id(session, str(payload.email)),
         route_id=payload.route_id,
         departing_location=payload.departing_location,
         destination_location=payload.destination_location,
@@ -161,8 +220,15 @@ def edit_route_endpoint(payload: EditRouteRequest) -> RouteIdResponse:
     response_model=BaseResponse,
     responses=ERROR_RESPONSES,
 )
-def delete_route_endpoint(payload: DeleteRouteRequest) -> BaseResponse:
-    deleted = delete_route(email=str(payload.email), route_id=payload.route_id)
+def delete_route_endpoint(
+    payload: DeleteRouteRequest,
+    session: SessionClaims | None = Depends(get_session_claims),
+) -> BaseResponse:
+    deleted = delete_route(
+        email=str(payload.email),
+        route_id=payload.route_id,
+        user_id=session_user_id(session, str(payload.email)),
+    )
     if not deleted:
         raise HTTPException(status_code=404, detail="User or route not found")
 
@@ -179,12 +245,31 @@ def delete_route_endpoint(payload: DeleteRouteRequest) -> BaseResponse:
 )
 def get_routes_by_email_endpoint(
     email: str = Query(..., description="User email address"),
+    since: float | None = Query(
+        None,
+        description="Watermark (Unix seconds) from a previous response; returns only changes after it",
+    ),
+    session: SessionClaims | None = Depends(get_session_claims),
 ) -> RoutesListResponse:
-    routes = get_all_routes_by_email(email)
+    user_id = session_user_id(session, email)
+    # Taken before reading so writes racing this request are re-sent next time.
+    watermark = datetime.datetime.now(datetime.timezone.utc)
+    retention = datetime.timedelta(days=get_settings().DELTA_SYNC_RETENTION_DAYS)
+    # Tombstones past the retention window may have expired, so resend everything.
+    full_sync = since is None or since < (watermark - retention).timestamp()
+    if full_sync:
+        routes = get_all_routes_by_email(email, user_id=user_id)
+        deleted_route_ids: list[str] = []
+    else:
+        since_dt = datetime.datetime.fromtimestamp(since, tz=datetime.timezone.utc)
+        routes, deleted_route_ids = get_route_changes_by_email(email, since=since_dt, user_id=user_id)
     return RoutesListResponse(
         status="success",
         message="Routes fetched successfully",
         routes=[RouteListItem(**route) for route in routes],
+        deleted_route_ids=deleted_route_ids,
+        watermark=watermark.timestamp(),
+        full_sync=full_sync,
     )
 
 
@@ -212,13 +297,18 @@ def get_routes_by_user_id_endpoint(
 def get_next_upcoming_route_endpoint(
     email: str = Query(..., description="User email address"),
     timestamp: float | None = Query(None, description="Unix timestamp in seconds (optional)"),
+    session: SessionClaims | None = Depends(get_session_claims),
 ) -> NextUpcomingRouteResponse:
     effective_timestamp = (
         timestamp
         if timestamp is not None
         else datetime.datetime.now(datetime.timezone.utc).timestamp()
     )
-    route = get_next_upcoming_route(email=email, timestamp=effective_timestamp)
+    route = get_next_upcoming_route(
+        email=email,
+        timestamp=effective_timestamp,
+        user_id=session_user_id(session, email),
+    )
     if route is None:
         raise HTTPException(status_code=404, detail="No upcoming route found")
 
@@ -237,8 +327,9 @@ def get_next_upcoming_route_endpoint(
 def get_specific_route_endpoint(
     email: str = Query(..., description="User email address"),
     route_id: str = Query(..., description="Route id"),
+    session: SessionClaims | None = Depends(get_session_claims),
 ) -> SpecificRouteResponse:
-    route = get_specific_route(email=email, route_id=route_id)
+    route = get_specific_route(email=email, route_id=route_id, user_id=session_user_id(session, email))
     if route is None:
         raise HTTPException(status_code=404, detail="Route not found")
 
@@ -270,3 +361,50 @@ def add_schedule_endpoint(payload: AddScheduleRequest) -> ScheduleIdResponse:
         message="Schedule added successfully",
         schedule_id=schedule_id,
     )
+
+
+def _batch_response(message: str, results: list[dict]) -> BatchResultsResponse:
+    created_count = sum(1 for item in results if item["status"] == "created")
+    return BatchResultsResponse(
+        status="success" if created_count == len(results) else "partial",
+        message=message,
+        results=[BatchItemResult(**item) for item in results],
+        created_count=created_count,
+        failed_count=len(results) - created_count,
+    )
+
+
+@router.post(
+    "/create-batch",
+    response_model=BatchResultsResponse,
+    responses=ERROR_RESPONSES,
+)
+def create_routes_batch_endpoint(
+    payload: BatchCreateRoutesRequest,
+    session: SessionClaims | None = Depends(get_session_claims),
+) -> BatchResultsResponse:
+    results = create_routes_batch(
+        email=str(payload.email),
+        user_id=session_user_id(session, str(payload.email)),
+        routes=[item.model_dump() for item in payload.routes],
+    )
+    if results is None:
+        raise HTTPException(status_code=404, detail="User not found or routes could not be created")
+
+    return _batch_response("Routes processed", results)
+
+
+@router.post(
+    "/add-schedule-batch",
+    response_model=BatchResultsResponse,
+    responses=ERROR_RESPONSES,
+)
+def add_schedules_batch_endpoint(payload: BatchAddSchedulesRequest) -> BatchResultsResponse:
+    results = add_schedules_batch(
+        user_id=payload.user_id,
+        schedules=[item.model_dump() for item in payload.schedules],
+    )
+    if results is None:
+        raise HTTPException(status_code=500, detail="Schedules could not be created")
+
+    return _batch_response("Schedules processed", results)
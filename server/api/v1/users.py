@@ -1,6 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+import math
+from collections.abc import Callable
+from typing import Any
 
-from api.schemas.base import ERROR_RESPONSES
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from api.deps import client_ip, get_session_claims
+from api.schemas.base import BaseResponse, ERROR_RESPONSES
 from api.schemas.user import (
     GetUserByEmailResponse,
     LoginUserRequest,
@@ -8,9 +14,14 @@ from api.schemas.user import (
     RegisterUserRequest,
     RegisterUserResponse,
 )
+from core.hashing_pool import HashingPoolBusy
+from core.login_throttle import EMAIL, IP, get_login_throttle
+from core.session import SessionClaims, get_session_manager
 from services.user_service import (
+    InvalidEmailError,
     get_user_by_email,
     map_user_record_to_response,
+    normalize_email,
     register_user,
     validate_login,
 )
@@ -24,14 +35,64 @@ router = APIRouter()
     response_model=LoginUserResponse,
     responses=ERROR_RESPONSES,
 )
-def login_user_endpoint(payload: LoginUserRequest) -> LoginUserResponse:
-    if not validate_login(str(payload.email), payload.password):
+async def login_user_endpoint(payload: LoginUserRequest, request: Request) -> LoginUserResponse:
+    throttle = get_login_throttle()
+    email = normalize_email(str(payload.email))
+    ip = client_ip(request)
+
+    # Locked-out emails/IPs are rejected before any Firestore or bcrypt work.
+    retry_after = max(
+        await _run_throttle(throttle.retry_after, EMAIL, email),
+        await _run_throttle(throttle.retry_after, IP, ip),
+    )
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts, please retry later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    try:
+        user = await validate_login(email, payload.password)
+    except HashingPoolBusy as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    if user is None:
+        await _run_throttle(throttle.record_failure, EMAIL, email)
+        await _run_throttle(throttle.record_failure, IP, ip)
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    # IP failures are kept: an attacker could otherwise clear them with their own account.
+    await _run_throttle(throttle.record_success, EMAIL, email)
 
+    user_id = str(user.get("id", ""))
+    token, claims = get_session_manager().issue(user_id=user_id, email=str(user.get("email", "")))
     return LoginUserResponse(
         status="success",
         message="Login success",
-        email= payload.email
+        email= payload.email,
+        user_id=user_id,
+        session_token=token,
+        session_expires_at=claims.expires_at,
+    )
+
+
+async def _run_throttle(fn: Callable[..., Any], *args: Any) -> Any:
+    # The in-memory tracker is instant; only a shared backend does I/O.
+    if get_login_throttle().backend is None:
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+@router.post("/logout",
+    response_model=BaseResponse,
+    responses=ERROR_RESPONSES,
+)
+def logout_user_endpoint(session: SessionClaims | None = Depends(get_session_claims)) -> BaseResponse:
+    if session is None:
+        raise HTTPException(status_code=401, detail="Missing session token")
+    get_session_manager().revoke(session)
+    return BaseResponse(
+        status="success",
+        message="Logged out",
     )
 
 
@@ -39,18 +100,23 @@ def login_user_endpoint(payload: LoginUserRequest) -> LoginUserResponse:
     response_model=RegisterUserResponse,
     responses=ERROR_RESPONSES,
 )
-def register_user_endpoint(new_user: RegisterUserRequest) -> RegisterUserResponse:
+async def register_user_endpoint(new_user: RegisterUserRequest) -> RegisterUserResponse:
     try:
-        created_user = register_user(new_user)
+        created_user = await register_user(new_user)
         if new_user.device_token:
-            send_alert_to_device(
+            await asyncio.to_thread(
+                send_alert_to_device,
                 token=new_user.device_token,
                 title="Welcome to On The Way",
                 body=f"User {new_user.username} is registered.",
             )
 
+    except InvalidEmailError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     except ValueError as exc:
         raise HTTPException(status_code=409, detail=str(exc))
+    except HashingPoolBusy as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
     except RuntimeError as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
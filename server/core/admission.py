@@ -0,0 +1,195 @@
+"""Adaptive admission control and load shedding.
+
+Sync handlers run in a shared threadpool, so when Firestore or FCM slows down
+requests pile up behind each other and the whole API stalls. Each route class
+(read, write, fan-out) gets its own concurrency limit that adapts to observed
+latency with AIMD: the limit grows by one per window of fast completions and
+is cut multiplicatively when latency exceeds the class target. Requests over
+the limit wait in a short bounded queue; when that is full or the wait times
+out they are shed with a fast 503 and a Retry-After hint.
+
+All state lives on the event loop (middleware is async), so no locking.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from core.metrics import get_metrics
+
+READ = "read"
+WRITE = "write"
+FANOUT = "fanout"
+
+# Endpoints that call FCM for many devices.
+FANOUT_PATHS = {
+    "/alerts/notify-affected-user",
+    "/alerts/predict-end-time-trigger",
+    "/alerts/end-alert",
+    "/alerts/send-token",
+}
+
+# Never limited: probes, docs and long-lived streams that would pin a slot.
+EXEMPT_PATHS = {"/", "/health", "/metrics", "/docs", "/openapi.json", "/alerts/stream"}
+
+
+@dataclass(frozen=True)
+class LimitConfig:
+    initial: int
+    minimum: int
+    maximum: int
+    target_latency_ms: float
+
+
+DEFAULT_LIMITS = {
+    READ: LimitConfig(initial=24, minimum=4, maximum=64, target_latency_ms=500),
+    WRITE: LimitConfig(initial=12, minimum=2, maximum=32, target_latency_ms=1000),
+    FANOUT: LimitConfig(initial=4, minimum=1, maximum=8, target_latency_ms=5000),
+}
+
+
+class Shed(Exception):
+    """Raised when a request is rejected instead of admitted."""
+
+    def __init__(self, retry_after_seconds: int) -> None:
+        super().__init__("Server is overloaded")
+        self.retry_after_seconds = retry_after_seconds
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with a bounded FIFO wait queue."""
+
+    def __init__(
+        self,
+        name: str,
+        config: LimitConfig,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        backoff: float = 0.8,
+    ) -> None:
+        self.name = name
+        self.config = config
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.backoff = backoff
+        self.limit = float(config.initial)
+        self.in_flight = 0
+        self.ema_latency_ms = config.target_latency_ms / 2
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._last_decrease = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise Shed(self.retry_after())
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout_seconds)
+        except TimeoutError:
+            if waiter.done():
+                # Slot was granted just as the wait expired; keep it.
+                return
+            self._waiters.remove(waiter)
+            raise Shed(self.retry_after())
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release(latency_ms=None)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency_ms: float | None) -> None:
+        self.in_flight -= 1
+        if latency_ms is not None:
+            self._record(latency_ms)
+        self._wake()
+
+    def retry_after(self) -> int:
+        # Roughly how long the current backlog needs to drain.
+        backlog = self.in_flight + len(self._waiters)
+        seconds = self.ema_latency_ms / 1000 * backlog / max(self.limit, 1.0)
+        return max(1, math.ceil(seconds))
+
+    def _record(self, latency_ms: float) -> None:
+        self.ema_latency_ms = 0.9 * self.ema_latency_ms + 0.1 * latency_ms
+        if latency_ms > self.config.target_latency_ms:
+            now = time.monotonic()
+            # Decrease at most once per observed latency window.
+            if now - self._last_decrease >= self.ema_latency_ms / 1000:
+                self.limit = max(float(self.config.minimum), self.limit * self.backoff)
+                self._last_decrease = now
+        else:
+            self.limit = min(float(self.config.maximum), self.limit + 1.0 / self.limit)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+
+class AdmissionController:
+    """Routes requests to the limiter for their route class."""
+
+    def __init__(
+        self,
+        api_prefix: str,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        limits: dict[str, LimitConfig] | None = None,
+    ) -> None:
+        self.api_prefix = api_prefix
+        self.limiters = {
+            name: AdaptiveLimiter(name, config, max_queue, queue_timeout_seconds)
+            for name, config in (limits or DEFAULT_LIMITS).items()
+        }
+        metrics = get_metrics()
+        for name, limiter in self.limiters.items():
+            label = f'{{route_class="{name}"}}'
+            metrics.register_gauge(
+                f"admission_queue_depth{label}", lambda l=limiter: l.queue_depth, "Requests waiting for a slot"
+            )
+            metrics.register_gauge(
+                f"admission_in_flight{label}", lambda l=limiter: l.in_flight, "Admitted requests in progress"
+            )
+            metrics.register_gauge(
+                f"admission_limit{label}", lambda l=limiter: l.limit, "Current adaptive concurrency limit"
+            )
+            metrics.register_gauge(
+                f"admission_latency_ema_ms{label}", lambda l=limiter: l.ema_latency_ms, "Smoothed handler latency"
+            )
+
+    def classify(self, method: str, path: str) -> str | None:
+        """Return the route class for a request, or None if it is exempt."""
+        relative = path.removeprefix(self.api_prefix) or "/"
+        if path in EXEMPT_PATHS or relative in EXEMPT_PATHS:
+            return None
+        if relative in FANOUT_PATHS:
+            return FANOUT
+        if method in {"GET", "HEAD", "OPTIONS"}:
+            return READ
+        return WRITE
+
+    async def acquire(self, route_class: str) -> AdaptiveLimiter:
+        limiter = self.limiters[route_class]
+        try:
+            await limiter.acquire()
+        except Shed:
+            get_metrics().inc(
+                f'admission_shed_total{{route_class="{route_class}"}}',
+                help_text="Requests rejected with 503 by admission control",
+            )
+            raise
+        return limiter
@@ -20,10 +20,111 @@ class Settings(BaseSettings):
     GEMINI_MODEL: str = "gemini-2.5-flash"
     GEMINI_MAX_RETRIES: int = 3
     GEMINI_TIMEOUT_SECONDS: int = 30
+    # Gemini calls in flight at once across all batch extractions.
+    GEMINI_MAX_CONCURRENCY: int = 4
+    # None uses the public API; point at scripts/stub_gemini.py for local runs.
+    GEMINI_BASE_URL: str | None = None
+    # Structured Gemini answers cached by content (see core.gemini.llm_cache_key).
+    LLM_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 50_000
     GEMINI_MIN_CONFIDENCE: float = 0.7
 
     GOOGLE_MAPS_API_KEY: str | None = None
+    # Overridable so tests can point at scripts/stub_google_maps.py.
+    GOOGLE_MAPS_BASE_URL: str = "https://maps.googleapis.com"
+
+    # Shared outbound HTTP client (core/http_client.py).
+    HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    HTTP_CLIENT_READ_TIMEOUT_SECONDS: float = 5.0
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 20
+    HTTP_CLIENT_MAX_RETRIES: int = 2
+    HTTP_CLIENT_BACKOFF_SECONDS: float = 0.2
     STATIONS_DATA_PATH: str = os.path.join(BASE_DIR, "data", "stations.json")
+    STATION_ALIASES_PATH: str = os.path.join(BASE_DIR, "data", "station_aliases.json")
+    # Offline station search answers autocomplete at or above this score.
+    STATION_SEARCH_MIN_SCORE: float = 0.5
+    # Optional configured run times; segments not listed are estimated from coordinates.
+    STATION_RUN_TIMES_PATH: str = os.path.join(BASE_DIR, "data", "station_run_times.json")
+    STATION_INTERCHANGES_PATH: str = os.path.join(BASE_DIR, "data", "station_interchanges.json")
+    # Average straight-line train speed (including acceleration) for estimated segments.
+    TRAVEL_TIME_AVG_SPEED_KMH: float = 50.0
+    # Added to in-train time for walking to the platform and waiting for a train.
+    TRAVEL_TIME_BUFFER_MINUTES: float = 5.0
+    # Per-user next-departure indexes; other instances' route writes show up within the TTL.
+    SCHEDULE_INDEX_TTL_SECONDS: int = 60
+    # Schedules are stored as wall-clock times in this timezone.
+    RIDER_TIMEZONE: str = "Asia/Kuala_Lumpur"
+    SCHEDULE_INDEX_MAX_USERS: int = 10_000
+    OCCUPANCY_SNAPSHOT_PATH: str = os.path.join(BASE_DIR, "data", "occupancy.npz")
+    # Save the occupancy table this often while it has unsaved changes.
+    OCCUPANCY_PERSIST_INTERVAL_SECONDS: float = 300.0
+    # Re-read routes written by other instances this often.
+    OCCUPANCY_SYNC_INTERVAL_SECONDS: float = 60.0
+
+    # Delete tombstones (deleted_routes, alert_tombstones) carry an expiresAt this
+    # far out for a Firestore TTL policy; a delta request older than it gets a
+    # full listing instead.
+    DELTA_SYNC_RETENTION_DAYS: int = 30
+    REMINDER_ENABLED: bool = True
+    # Pre-departure reminders fire this long before a schedule's timeFrom.
+    REMINDER_LEAD_MINUTES: int = 15
+    # Only remind riders whose route has an active alert on it.
+    REMINDER_DISRUPTIONS_ONLY: bool = True
+    PERSISTENT_CACHE_PATH: str = os.path.join(BASE_DIR, "data", "cache.sqlite3")
+    # Google Maps terms allow caching coordinates for up to 30 days.
+    GEOCODE_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    AUTOCOMPLETE_CACHE_TTL_SECONDS: int = 24 * 3600
+    # ZERO_RESULTS answers are remembered for less time than real results.
+    MAPS_NEGATIVE_CACHE_TTL_SECONDS: int = 6 * 3600
+    # Wait this long before sending a keystroke upstream; superseded ones are dropped.
+    AUTOCOMPLETE_DEBOUNCE_MS: int = 250
+    AUTOCOMPLETE_PREFIX_CACHE_MAX_ENTRIES: int = 5000
+
+    # Short-lived result cache for hot, coalesced reads (top3, station lookups).
+    MICROCACHE_TTL_SECONDS: float = 2.0
+
+    ALERT_STREAM_HEARTBEAT_SECONDS: int = 15
+
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_QUEUE: int = 50
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+
+    # bcrypt cost factor; existing hashes below it are upgraded on login.
+    BCRYPT_ROUNDS: int = 12
+    # None sizes the pool to the CPU count.
+    HASHING_POOL_WORKERS: int | None = None
+    HASHING_POOL_MAX_PENDING: int = 64
+
+    # uvicorn worker processes per instance (uvicorn reads the same variable).
+    # Above 1, SESSION_SECRET is required so every worker verifies every token.
+    WEB_CONCURRENCY: int = 1
+
+    # Signs session tokens. Comma-separated previous secrets still verify
+    # during a key rotation.
+    SESSION_SECRET: str | None = None
+    SESSION_PREVIOUS_SECRETS: str = ""
+    SESSION_TTL_SECONDS: int = 7 * 24 * 3600
+    # How often each instance re-reads revoked sessions, i.e. how long a logout
+    # can take to reach the other workers and instances.
+    SESSION_REVOCATION_REFRESH_SECONDS: float = 30.0
+
+    # Failed logins before a lockout; each further failure doubles it.
+    LOGIN_THROTTLE_EMAIL_THRESHOLD: int = 5
+    # 0 turns the per-IP scope off.
+    LOGIN_THROTTLE_IP_THRESHOLD: int = 20
+    LOGIN_THROTTLE_BASE_LOCKOUT_SECONDS: float = 30.0
+    LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS: float = 3600.0
+    LOGIN_THROTTLE_MAX_ENTRIES: int = 10_000
+    # Mirror lockouts in Firestore so all instances enforce them.
+    LOGIN_THROTTLE_SHARED: bool = False
+    # Reverse proxies (comma-separated addresses, or "*") whose X-Forwarded-For
+    # names the real client, as uvicorn's --forwarded-allow-ips. Behind a proxy
+    # that is not listed, every client appears as the proxy address.
+    FORWARDED_ALLOW_IPS: str = ""
+
+    # Fall back to querying users by email when emails/{email} is missing.
+    # Turn off after running scripts/backfill_email_index.py.
+    EMAIL_INDEX_LEGACY_FALLBACK: bool = True
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -2,17 +2,48 @@
 
 This module provides the low-level interface to Google's Gemini API.
 All HTTP concerns (retries, timeouts, error handling) are handled here.
+
+Structured answers can be cached by content: callers that pass a
+prompt_version get identical input (after normalisation) answered from the
+persistent cache instead of a paid call, for the same model and schema.
+Only answers that pass the caller's validator are cached.
 """
 
+from collections.abc import Callable
 from typing import Any
+import asyncio
+import hashlib
 import json
+import unicodedata
 from google import genai
 from google.genai import types
 
 from core.config import get_settings
+from core.persistent_cache import get_persistent_cache
 
 _settings = get_settings()
 
+LLM_CACHE_NAMESPACE = "llm"
+
+
+def normalize_llm_input(text: str) -> str:
+    """NFKC-normalise and collapse whitespace, so copies of a post from different platforms match."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def llm_cache_key(text: str, prompt_version: str, model: str, output_schema: Any) -> str:
+    """Content address of a structured generation: sha256 over input, prompt version, model and schema."""
+    if isinstance(output_schema, type) and hasattr(output_schema, "model_json_schema"):
+        output_schema = output_schema.model_json_schema()
+    material = json.dumps(
+        [normalize_llm_input(text), prompt_version, model, output_schema],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
 
 class GeminiClient:
     """Wrapper for Gemini API interactions."""
@@ -20,7 +51,8 @@ class GeminiClient:
     def __init__(self) -> None:
         """Initialize Gemini client with configuration."""
         self.model_name = _settings.GEMINI_MODEL
-        self.client = genai.Client(api_key=_settings.GEMINI_API_KEY)
+        http_options = types.HttpOptions(base_url=_settings.GEMINI_BASE_URL) if _settings.GEMINI_BASE_URL else None
+        self.client = genai.Client(api_key=_settings.GEMINI_API_KEY, http_options=http_options)
     
     async def generate_content(
         self, 
@@ -57,7 +89,10 @@ class GeminiClient:
         self,
         prompt: str,
         output_schema: Any,
-        system_instruction: str | None = None
+        system_instruction: str | None = None,
+        prompt_version: str | None = None,
+        cache_input: str | None = None,
+        validate: Callable[[dict[str, Any]], Any] | None = None,
     ) -> dict[str, Any]:
         """Generate structured JSON output from Gemini.
         
@@ -65,6 +100,15 @@ class GeminiClient:
             prompt: The user prompt/text to analyze
             output_schema: Output schema (can be a Pydantic model or dict)
             system_instruction: Optional system instructions
+            prompt_version: Version of the caller's prompt and instructions.
+                When given, answers are cached by content; bump it whenever
+                the prompt or instructions change.
+            cache_input: What the answer depends on, if not the whole prompt
+                (e.g. just the post text). Defaults to the prompt.
+            validate: Optional check of the parsed answer that raises
+                GeminiParseError when it is unusable. Failing answers are
+                never cached, and a cached answer that fails is dropped and
+                regenerated.
             
         Returns:
             Parsed JSON response matching output_schema
@@ -73,6 +117,42 @@ class GeminiClient:
             GeminiAPIError: If API call fails
             GeminiParseError: If response cannot be parsed
         """
+        if prompt_version is None:
+            result = await self._generate_structured(prompt, output_schema, system_instruction)
+            if validate is not None:
+                validate(result)
+            return result
+        
+        cache = get_persistent_cache()
+        key = llm_cache_key(
+            prompt if cache_input is None else cache_input, prompt_version, self.model_name, output_schema
+        )
+        found, cached = await cache.aget(LLM_CACHE_NAMESPACE, key)
+        if found:
+            try:
+                if validate is not None:
+                    validate(cached)
+                return cached
+            except GeminiParseError:
+                await asyncio.to_thread(cache.delete, LLM_CACHE_NAMESPACE, key)
+        result = await self._generate_structured(prompt, output_schema, system_instruction)
+        if validate is not None:
+            validate(result)
+        await cache.aset(
+            LLM_CACHE_NAMESPACE,
+            key,
+            result,
+            ttl_seconds=_settings.LLM_CACHE_TTL_SECONDS,
+            max_entries=_settings.LLM_CACHE_MAX_ENTRIES,
+        )
+        return result
+
+    async def _generate_structured(
+        self,
+        prompt: str,
+        output_schema: Any,
+        system_instruction: str | None = None
+    ) -> dict[str, Any]:
         try:
             config = types.GenerateContentConfig(
                 system_instruction=system_instruction,
@@ -0,0 +1,99 @@
+"""Dedicated, size-limited executor for bcrypt work.
+
+bcrypt is deliberately slow, so running it inline in FastAPI's shared
+threadpool lets a login burst starve every other endpoint. Hashing and
+verification are instead submitted to a small pool of their own (bcrypt
+releases the GIL, so threads scale across cores) and awaited from async
+handlers. Pending work is capped; beyond that callers get HashingPoolBusy
+and the API answers 503 instead of queueing without bound.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from core.config import get_settings
+from core.metrics import get_metrics
+from utils.hashing_utils import hash_password, verify_password
+
+
+class HashingPoolBusy(RuntimeError):
+    """Raised when the hashing queue is full."""
+
+
+class HashingPool:
+    """Bounded bcrypt executor with queue metrics."""
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+
+        metrics = get_metrics()
+        metrics.register_gauge(
+            "hashing_pool_queue_depth",
+            lambda: max(self._pending - self._running, 0),
+            "bcrypt jobs waiting for a worker",
+        )
+        metrics.register_gauge("hashing_pool_running", lambda: self._running, "bcrypt jobs running")
+        metrics.register_gauge("hashing_pool_workers", lambda: self.workers, "bcrypt worker threads")
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password; raises ValueError for non-bcrypt stored values."""
+        return await self._submit("verify", verify_password, password, hashed_password)
+
+    async def _submit(self, op: str, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                get_metrics().inc("hashing_pool_rejected_total", help_text="bcrypt jobs rejected (queue full)")
+                raise HashingPoolBusy("Too many concurrent authentication requests")
+            self._pending += 1
+
+        submitted_at = time.perf_counter()
+
+        def run() -> Any:
+            started_at = time.perf_counter()
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                finished_at = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                metrics = get_metrics()
+                metrics.inc(f'hashing_pool_jobs_total{{op="{op}"}}')
+                metrics.inc(f'hashing_pool_wait_seconds_total{{op="{op}"}}', started_at - submitted_at)
+                metrics.inc(f'hashing_pool_run_seconds_total{{op="{op}"}}', finished_at - started_at)
+
+        return await asyncio.wrap_future(self._executor.submit(run))
+
+
+# Singleton pool
+_hashing_pool: HashingPool | None = None
+_hashing_pool_lock = threading.Lock()
+
+
+def get_hashing_pool() -> HashingPool:
+    global _hashing_pool
+
+    if _hashing_pool is None:
+        with _hashing_pool_lock:
+            if _hashing_pool is None:
+                settings = get_settings()
+                _hashing_pool = HashingPool(
+                    workers=settings.HASHING_POOL_WORKERS or os.cpu_count() or 2,
+                    max_pending=settings.HASHING_POOL_MAX_PENDING,
+                )
+    return _hashing_pool
@@ -0,0 +1,87 @@
+"""Shared, connection-pooled async HTTP client for outbound API calls.
+
+One httpx.AsyncClient per event loop keeps TLS connections alive across
+requests (and multiplexes them over HTTP/2 when the optional `h2` package is
+installed). `get_json` adds tuned timeouts and retries transient failures
+with exponential backoff and full jitter.
+"""
+
+import asyncio
+import random
+import weakref
+from typing import Any
+
+import httpx
+
+from core.config import get_settings
+from core.metrics import get_metrics
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Clients are bound to the loop they were first used on.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        settings = get_settings()
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(
+                settings.HTTP_CLIENT_READ_TIMEOUT_SECONDS,
+                connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                keepalive_expiry=30.0,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_http_client() -> None:
+    """Close this loop's client (called on application shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def get_json(url: str, params: dict[str, str], metric_label: str) -> dict[str, Any]:
+    """GET a JSON document, retrying timeouts, connection errors and 429/5xx.
+
+    Raises RuntimeError once retries are exhausted.
+    """
+    settings = get_settings()
+    metrics = get_metrics()
+    attempts = settings.HTTP_CLIENT_MAX_RETRIES + 1
+    last_error = "unknown error"
+    for attempt in range(attempts):
+        if attempt:
+            metrics.inc(f'http_client_retries_total{{api="{metric_label}"}}', help_text="Outbound request retries")
+            # Full jitter: sleep uniformly in [0, base * 2^attempt].
+            await asyncio.sleep(random.uniform(0, settings.HTTP_CLIENT_BACKOFF_SECONDS * 2**attempt))
+        try:
+            response = await get_http_client().get(url, params=params)
+        except httpx.TransportError as exc:
+            last_error = f"{type(exc).__name__}: {exc}"
+            continue
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            last_error = f"HTTP {response.status_code}"
+            continue
+        if response.is_error:
+            raise RuntimeError(f"{metric_label} request failed with HTTP {response.status_code}")
+        return response.json()
+
+    metrics.inc(f'http_client_failures_total{{api="{metric_label}"}}', help_text="Outbound requests that gave up")
+    raise RuntimeError(f"{metric_label} request failed after {attempts} attempts: {last_error}")
@@ -0,0 +1,190 @@
+"""Login failure tracking with exponential lockout.
+
+A failed login costs a Firestore query plus a full bcrypt verification, so
+credential stuffing is also a CPU denial of service. Failures are counted per
+email and per client IP (see api.deps.client_ip for proxies; a threshold of
+0 turns a scope off); once a key reaches its threshold it is locked out
+for a period that doubles with every further failure (up to a cap). Locked
+keys are rejected before any Firestore or bcrypt work.
+
+State lives in a bounded LRU so a flood of distinct emails or IPs cannot grow
+memory without limit. An optional shared backend mirrors lockouts across
+instances; the local LRU is always consulted first.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from core.config import get_settings
+from core.firebase import get_firestore_client, initialize_firebase
+from core.metrics import get_metrics
+
+EMAIL = "email"
+IP = "ip"
+
+
+@dataclass
+class FailureState:
+    failures: int = 0
+    last_failure: float = 0.0
+    locked_until: float = 0.0
+
+
+class ThrottleBackend(Protocol):
+    """Shared store for lockouts, so every instance rejects a locked key."""
+
+    def load(self, key: str) -> FailureState | None: ...
+
+    def store(self, key: str, state: FailureState) -> None: ...
+
+    def clear(self, key: str) -> None: ...
+
+
+class FirestoreThrottleBackend:
+    """Keeps lockout state in `login_throttle/{sha256(key)}` documents."""
+
+    COLLECTION = "login_throttle"
+
+    def _document(self, key: str) -> Any:
+        initialize_firebase()
+        db = get_firestore_client()
+        if db is None:
+            raise RuntimeError("Could not obtain Firestore client")
+        doc_id = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return db.collection(self.COLLECTION).document(doc_id)
+
+    def load(self, key: str) -> FailureState | None:
+        snapshot = self._document(key).get()
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict() or {}
+        return FailureState(
+            failures=int(data.get("failures", 0)),
+            last_failure=float(data.get("last_failure", 0.0)),
+            locked_until=float(data.get("locked_until", 0.0)),
+        )
+
+    def store(self, key: str, state: FailureState) -> None:
+        self._document(key).set(
+            {
+                "failures": state.failures,
+                "last_failure": state.last_failure,
+                "locked_until": state.locked_until,
+            }
+        )
+
+    def clear(self, key: str) -> None:
+        self._document(key).delete()
+
+
+@dataclass(frozen=True)
+class ThrottlePolicy:
+    threshold: int
+    base_lockout_seconds: float
+    max_lockout_seconds: float
+
+
+class LoginThrottle:
+    """Bounded per-email / per-IP failure tracker."""
+
+    def __init__(
+        self,
+        policies: dict[str, ThrottlePolicy],
+        max_entries: int = 10_000,
+        failure_window_seconds: float = 900.0,
+        backend: ThrottleBackend | None = None,
+    ) -> None:
+        self.policies = policies
+        self.max_entries = max_entries
+        self.failure_window_seconds = failure_window_seconds
+        self.backend = backend
+        self._states: OrderedDict[str, FailureState] = OrderedDict()
+        self._lock = threading.Lock()
+        get_metrics().register_gauge(
+            "login_throttle_tracked_keys", lambda: len(self._states), "Emails and IPs with recent login failures"
+        )
+
+    def retry_after(self, scope: str, value: str) -> float:
+        """Seconds until `value` may try again, or 0 if it is not locked."""
+        if not value:
+            return 0.0
+        key = f"{scope}:{value}"
+        now = time.time()
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+        if (state is None or state.locked_until <= now) and self.backend is not None:
+            state = self.backend.load(key)
+        if state is None or state.locked_until <= now:
+            return 0.0
+        get_metrics().inc(
+            f'login_throttle_blocked_total{{scope="{scope}"}}',
+            help_text="Login attempts rejected while locked out",
+        )
+        return state.locked_until - now
+
+    def record_failure(self, scope: str, value: str) -> None:
+        policy = self.policies[scope]
+        if not value or policy.threshold <= 0:
+            return
+        key = f"{scope}:{value}"
+        now = time.time()
+        with self._lock:
+            state = self._states.pop(key, None)
+            if state is None or now - state.last_failure > self.failure_window_seconds:
+                state = FailureState()
+            state.failures += 1
+            state.last_failure = now
+            if state.failures >= policy.threshold:
+                exponent = state.failures - policy.threshold
+                lockout = min(policy.base_lockout_seconds * (2**exponent), policy.max_lockout_seconds)
+                state.locked_until = now + lockout
+            self._states[key] = state
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+        get_metrics().inc(f'login_failures_total{{scope="{scope}"}}', help_text="Failed login attempts")
+        if self.backend is not None and state.locked_until > now:
+            self.backend.store(key, state)
+
+    def record_success(self, scope: str, value: str) -> None:
+        key = f"{scope}:{value}"
+        with self._lock:
+            state = self._states.pop(key, None)
+        if self.backend is not None and state is not None and state.locked_until:
+            self.backend.clear(key)
+
+
+# Singleton throttle
+_login_throttle: LoginThrottle | None = None
+_login_throttle_lock = threading.Lock()
+
+
+def get_login_throttle() -> LoginThrottle:
+    global _login_throttle
+
+    if _login_throttle is None:
+        with _login_throttle_lock:
+            if _login_throttle is None:
+                settings = get_settings()
+                _login_throttle = LoginThrottle(
+                    policies={
+                        EMAIL: ThrottlePolicy(
+                            threshold=settings.LOGIN_THROTTLE_EMAIL_THRESHOLD,
+                            base_lockout_seconds=settings.LOGIN_THROTTLE_BASE_LOCKOUT_SECONDS,
+                            max_lockout_seconds=settings.LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS,
+                        ),
+                        IP: ThrottlePolicy(
+                            threshold=settings.LOGIN_THROTTLE_IP_THRESHOLD,
+                            base_lockout_seconds=settings.LOGIN_THROTTLE_BASE_LOCKOUT_SECONDS,
+                            max_lockout_seconds=settings.LOGIN_THROTTLE_MAX_LOCKOUT_SECONDS,
+                        ),
+                    },
+                    max_entries=settings.LOGIN_THROTTLE_MAX_ENTRIES,
+                    backend=FirestoreThrottleBackend() if settings.LOGIN_THROTTLE_SHARED else None,
+                )
+    return _login_throttle
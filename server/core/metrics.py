@@ -0,0 +1,86 @@
+"""Minimal in-process metrics registry.
+
+Counters and gauges are kept in memory and rendered in the Prometheus text
+exposition format by the `/metrics` endpoint. Gauges can also be backed by a
+callback so components report live values (queue depth, open connections)
+without pushing updates on every change.
+"""
+
+import threading
+from collections.abc import Callable
+
+
+class MetricsRegistry:
+    """Thread-safe store of named counters and gauges."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._callbacks: dict[str, Callable[[], float]] = {}
+        self._help: dict[str, str] = {}
+
+    def inc(self, name: str, value: float = 1.0, help_text: str | None = None) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0.0) + value
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    def set_gauge(self, name: str, value: float, help_text: str | None = None) -> None:
+        with self._lock:
+            self._gauges[name] = value
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    def register_gauge(self, name: str, fn: Callable[[], float], help_text: str | None = None) -> None:
+        """Report fn() as the gauge value each time metrics are collected."""
+        with self._lock:
+            self._callbacks[name] = fn
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            values = {**self._counters, **self._gauges}
+            callbacks = dict(self._callbacks)
+        for name, fn in callbacks.items():
+            try:
+                values[name] = float(fn())
+            except Exception:
+                continue
+        return values
+
+    def render_prometheus(self) -> str:
+        values = self.snapshot()
+        with self._lock:
+            counters = set(self._counters)
+            help_texts = dict(self._help)
+
+        # Labelled series are stored as 'name{label="x"}' and share one header.
+        lines: list[str] = []
+        seen_bases: set[str] = set()
+        for name in sorted(values):
+            base = name.split("{", 1)[0]
+            if base not in seen_bases:
+                seen_bases.add(base)
+                help_text = help_texts.get(name) or help_texts.get(base)
+                if help_text:
+                    lines.append(f"# HELP {base} {help_text}")
+                lines.append(f"# TYPE {base} {'counter' if name in counters else 'gauge'}")
+            lines.append(f"{name} {values[name]:g}")
+        return "\n".join(lines) + "\n"
+
+
+# Singleton registry
+_metrics: MetricsRegistry | None = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    global _metrics
+
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
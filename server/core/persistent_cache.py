@@ -0,0 +1,171 @@
+"""Small persistent TTL cache backed by SQLite.
+
+Survives restarts (unlike lru_cache / SingleFlight) so results of paid
+external calls are reused across deploys and processes on the same disk.
+Values are JSON; entries live in named namespaces with a per-entry TTL.
+Expired rows are ignored on read and pruned periodically on write. Writers
+can also cap a namespace's size, evicting its least recently read entries.
+
+Every call is a blocking SQLite query (and usually a commit); coroutines use
+aget / aset, which run it on a worker thread.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from core.config import get_settings
+from core.metrics import get_metrics
+
+# Prune expired rows once every this many writes.
+PRUNE_EVERY_WRITES = 500
+# A hit refreshes the entry's last-read time at most this often, so hot keys
+# do not turn every read into a write.
+TOUCH_INTERVAL_SECONDS = 60.0
+
+
+class PersistentCache:
+    """Thread-safe SQLite key/value cache with per-namespace hit metrics."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache)")}
+        if "accessed_at" not in columns:
+            # Caches created before size caps existed.
+            self._conn.execute("ALTER TABLE cache ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (namespace, accessed_at)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._writes = 0
+        # namespace -> [hits, misses] since start, for the hit-ratio gauges.
+        self._lookups: dict[str, list[int]] = {}
+
+    def get(self, namespace: str, key: str) -> tuple[bool, Any]:
+        """Return (found, value); expired entries count as misses."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            found = row is not None and row[1] > now
+            if found and now - row[2] >= TOUCH_INTERVAL_SECONDS:
+                self._conn.execute(
+                    "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+                )
+                self._conn.commit()
+            lookups = self._lookups.get(namespace)
+            if lookups is None:
+                lookups = self._lookups[namespace] = [0, 0]
+                get_metrics().register_gauge(
+                    f'persistent_cache_hit_ratio{{namespace="{namespace}"}}',
+                    lambda: lookups[0] / max(1, lookups[0] + lookups[1]),
+                    "Share of persistent cache lookups answered from the cache since start",
+                )
+            lookups[0 if found else 1] += 1
+        get_metrics().inc(
+            f'persistent_cache_requests_total{{namespace="{namespace}",result="{"hit" if found else "miss"}"}}',
+            help_text="Persistent cache lookups by result",
+        )
+        return (True, json.loads(row[0])) if found else (False, None)
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        ttl_seconds: float,
+        max_entries: int | None = None,
+    ) -> None:
+        """Store a value; with max_entries, the namespace keeps only its most recently read rows."""
+        encoded = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        evicted = 0
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, encoded, now + ttl_seconds, now),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY_WRITES == 0:
+                self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+            if max_entries is not None:
+                evicted = self._conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                    " SELECT key FROM cache WHERE namespace = ?"
+                    " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (namespace, namespace, max_entries),
+                ).rowcount
+            self._conn.commit()
+        if evicted > 0:
+            get_metrics().inc(
+                f'persistent_cache_evictions_total{{namespace="{namespace}"}}',
+                evicted,
+                help_text="Persistent cache entries evicted by a namespace size cap",
+            )
+
+    async def aget(self, namespace: str, key: str) -> tuple[bool, Any]:
+        """get() off the event loop."""
+        return await asyncio.to_thread(self.get, namespace, key)
+
+    async def aset(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        ttl_seconds: float,
+        max_entries: int | None = None,
+    ) -> None:
+        """set() off the event loop."""
+        await asyncio.to_thread(self.set, namespace, key, value, ttl_seconds, max_entries)
+
+    def delete(self, namespace: str, key: str | None = None) -> None:
+        with self._lock:
+            if key is None:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+            else:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+            self._conn.commit()
+
+    def count(self, namespace: str | None = None) -> int:
+        with self._lock:
+            if namespace is None:
+                row = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+            else:
+                row = self._conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (namespace,)).fetchone()
+        return int(row[0])
+
+
+# Singleton cache
+_persistent_cache: PersistentCache | None = None
+_persistent_cache_lock = threading.Lock()
+
+
+def get_persistent_cache() -> PersistentCache:
+    global _persistent_cache
+
+    if _persistent_cache is None:
+        with _persistent_cache_lock:
+            if _persistent_cache is None:
+                _persistent_cache = PersistentCache(get_settings().PERSISTENT_CACHE_PATH)
+                get_metrics().register_gauge(
+                    "persistent_cache_entries", _persistent_cache.count, "Rows in the persistent cache"
+                )
+    return _persistent_cache
@@ -0,0 +1,224 @@
+"""Signed, expiring session tokens.
+
+Issued at login so authenticated calls can identify the user locally instead
+of re-resolving the Firestore user id from the email on every request.
+
+Token format is `<payload>.<signature>`, both base64url without padding.
+The payload is compact JSON carrying the user id, email, key id, issue and
+expiry times and a unique token id (jti). Signatures are HMAC-SHA256.
+
+Rotation: SESSION_SECRET signs new tokens; secrets in
+SESSION_PREVIOUS_SECRETS still verify, so keys can be rotated without
+logging everyone out. Revocation: revoked jtis are kept in memory until the
+token would have expired anyway, and persisted to Firestore so they survive
+restarts. Each instance loads them at startup and then re-reads the ones
+revoked since, every SESSION_REVOCATION_REFRESH_SECONDS, so a logout on one
+worker reaches the others within that interval.
+"""
+
+import asyncio
+import base64
+import datetime
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+
+from core.config import get_settings
+from core.firebase import get_firestore_client, initialize_firebase
+
+logger = logging.getLogger("core.session")
+
+REVOKED_SESSIONS_COLLECTION = "revoked_sessions"
+# Re-read this far behind the last refresh, for clock skew between instances.
+REFRESH_OVERLAP = datetime.timedelta(seconds=60)
+
+
+class SessionTokenError(Exception):
+    """Raised when a session token is malformed, expired, forged or revoked."""
+
+
+@dataclass(frozen=True)
+class SessionClaims:
+    user_id: str
+    email: str
+    jti: str
+    issued_at: int
+    expires_at: int
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _key_id(secret: str) -> str:
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:8]
+
+
+class SessionManager:
+    """Issues and verifies session tokens; holds the revocation list."""
+
+    def __init__(self, secret: str, previous_secrets: list[str], ttl_seconds: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._current_kid = _key_id(secret)
+        self._keys = {_key_id(item): item.encode("utf-8") for item in [*previous_secrets, secret] if item}
+        self._revoked: dict[str, int] = {}
+        self._lock = threading.Lock()
+        # When revocations were last read from Firestore; None until load_revocations.
+        self.refreshed_at: datetime.datetime | None = None
+
+    def issue(self, user_id: str, email: str) -> tuple[str, SessionClaims]:
+        now = int(time.time())
+        claims = SessionClaims(
+            user_id=user_id,
+            email=email,
+            jti=secrets.token_urlsafe(12),
+            issued_at=now,
+            expires_at=now + self.ttl_seconds,
+        )
+        payload = {
+            "uid": claims.user_id,
+            "email": claims.email,
+            "jti": claims.jti,
+            "iat": claims.issued_at,
+            "exp": claims.expires_at,
+            "kid": self._current_kid,
+        }
+        encoded = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        return f"{encoded}.{self._sign(self._current_kid, encoded)}", claims
+
+    def verify(self, token: str) -> SessionClaims:
+        """Return the token's claims without any database read."""
+        try:
+            encoded, signature = token.split(".", 1)
+            payload = json.loads(_b64decode(encoded))
+            kid = str(payload["kid"])
+            claims = SessionClaims(
+                user_id=str(payload["uid"]),
+                email=str(payload["email"]),
+                jti=str(payload["jti"]),
+                issued_at=int(payload["iat"]),
+                expires_at=int(payload["exp"]),
+            )
+        except (ValueError, KeyError, TypeError) as exc:
+            raise SessionTokenError("Malformed session token") from exc
+
+        if kid not in self._keys:
+            raise SessionTokenError("Session token signed with an unknown key")
+        # Compared as bytes: compare_digest rejects non-ASCII str with a TypeError.
+        expected = self._sign(kid, encoded).encode("ascii")
+        if not hmac.compare_digest(signature.encode("utf-8", errors="replace"), expected):
+            raise SessionTokenError("Invalid session token signature")
+        if claims.expires_at <= time.time():
+            raise SessionTokenError("Session token has expired")
+        with self._lock:
+            if claims.jti in self._revoked:
+                raise SessionTokenError("Session token has been revoked")
+        return claims
+
+    def revoke(self, claims: SessionClaims) -> None:
+        """Revoke a token locally and persist it for other instances and restarts."""
+        self._remember_revoked(claims.jti, claims.expires_at)
+        initialize_firebase()
+        db = get_firestore_client()
+        if db is None:
+            return
+        db.collection(REVOKED_SESSIONS_COLLECTION).document(claims.jti).set(
+            {
+                "user_id": claims.user_id,
+                "expires_at": datetime.datetime.fromtimestamp(claims.expires_at, tz=datetime.timezone.utc),
+                "revoked_at": datetime.datetime.now(datetime.timezone.utc),
+            }
+        )
+
+    def load_revocations(self) -> int:
+        """Load still-relevant revocations from Firestore (called at startup)."""
+        initialize_firebase()
+        db = get_firestore_client()
+        if db is None:
+            return 0
+        now = datetime.datetime.now(datetime.timezone.utc)
+        count = self._remember_docs(db.collection(REVOKED_SESSIONS_COLLECTION).where("expires_at", ">", now).stream())
+        self.refreshed_at = now
+        return count
+
+    def refresh_revocations(self) -> int:
+        """Pick up tokens revoked since the last load or refresh, by any instance."""
+        if self.refreshed_at is None:
+            return self.load_revocations()
+        initialize_firebase()
+        db = get_firestore_client()
+        if db is None:
+            return 0
+        started = datetime.datetime.now(datetime.timezone.utc)
+        query = db.collection(REVOKED_SESSIONS_COLLECTION).where("revoked_at", ">", self.refreshed_at - REFRESH_OVERLAP)
+        count = self._remember_docs(query.stream())
+        self.refreshed_at = started
+        return count
+
+    def _remember_docs(self, docs) -> int:
+        count = 0
+        for doc in docs:
+            expires_at = (doc.to_dict() or {}).get("expires_at")
+            if isinstance(expires_at, datetime.datetime):
+                self._remember_revoked(doc.id, int(expires_at.timestamp()))
+                count += 1
+        return count
+
+    def _remember_revoked(self, jti: str, expires_at: int) -> None:
+        now = time.time()
+        with self._lock:
+            # Expired tokens fail verification anyway, so drop them here.
+            self._revoked = {key: exp for key, exp in self._revoked.items() if exp > now}
+            self._revoked[jti] = expires_at
+
+    def _sign(self, kid: str, encoded: str) -> str:
+        digest = hmac.new(self._keys[kid], encoded.encode("ascii"), hashlib.sha256).digest()
+        return _b64encode(digest)
+
+
+# Singleton manager
+_session_manager: SessionManager | None = None
+_session_manager_lock = threading.Lock()
+
+
+def get_session_manager() -> SessionManager:
+    global _session_manager
+
+    if _session_manager is None:
+        with _session_manager_lock:
+            if _session_manager is None:
+                settings = get_settings()
+                secret = settings.SESSION_SECRET
+                if not secret and settings.WEB_CONCURRENCY > 1:
+                    # Each worker would sign with its own key and reject the others' tokens.
+                    raise RuntimeError("SESSION_SECRET must be configured when WEB_CONCURRENCY > 1")
+                if not secret:
+                    # Tokens then only survive this process; fine for local dev.
+                    logger.warning("SESSION_SECRET is not configured; using an ephemeral key")
+                    secret = secrets.token_urlsafe(32)
+                previous = [item.strip() for item in settings.SESSION_PREVIOUS_SECRETS.split(",") if item.strip()]
+                _session_manager = SessionManager(
+                    secret=secret,
+                    previous_secrets=previous,
+                    ttl_seconds=settings.SESSION_TTL_SECONDS,
+                )
+    return _session_manager
+
+
+async def refresh_revocations_periodically(interval_seconds: float) -> None:
+    """Pick up other instances' revocations every `interval_seconds`."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(get_session_manager().refresh_revocations)
+        except Exception as exc:
+            logger.warning("Could not refresh revoked sessions: %s", exc)
@@ -0,0 +1,196 @@
+"""In-process request coalescing for identical concurrent reads.
+
+Sync FastAPI handlers run in a threadpool, so a burst of identical requests
+(e.g. every device polling alerts during an incident) would otherwise stream
+Firestore once per request. A SingleFlight group lets the first caller for a
+key do the fetch while every concurrent caller for the same key waits for and
+shares that result. An optional micro-cache keeps the result for a short TTL
+so back-to-back bursts also collapse into one backend call.
+
+AsyncSingleFlight does the same for coroutines on an event loop.
+
+Results are shared between callers and must be treated as read-only.
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+class _Call:
+    """A single in-flight fetch that concurrent callers wait on."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class _ResultCache:
+    """TTL micro-cache and counters shared by the sync and async groups."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._cache: dict[Hashable, tuple[float, Any]] = {}
+        self.backend_calls = 0
+        self.shared_calls = 0
+        self.cache_hits = 0
+
+    def _cached(self, key: Hashable) -> tuple[bool, Any]:
+        """(True, value) for a live cached result, counted as a hit."""
+        if self.ttl_seconds > 0:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self.cache_hits += 1
+                return True, cached[1]
+        return False, None
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        now = time.monotonic()
+        if len(self._cache) >= self.max_entries:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            if len(self._cache) >= self.max_entries:
+                self._cache.clear()
+        self._cache[key] = (now + self.ttl_seconds, value)
+
+    def _stats(self, in_flight: int) -> dict[str, int]:
+        return {
+            "backend_calls": self.backend_calls,
+            "shared_calls": self.shared_calls,
+            "cache_hits": self.cache_hits,
+            "in_flight": in_flight,
+            "cached_keys": len(self._cache),
+        }
+
+
+class SingleFlight(_ResultCache):
+    """Collapse concurrent calls with the same key into one execution."""
+
+    def __init__(self, ttl_seconds: float = 0.0, max_entries: int = 1024) -> None:
+        """Create a coalescing group.
+
+        Args:
+            ttl_seconds: How long a successful result is served from the
+                micro-cache. 0 disables caching (coalescing only).
+            max_entries: Upper bound on cached keys before expired entries
+                are pruned and, if still full, the cache is cleared.
+        """
+        super().__init__(ttl_seconds, max_entries)
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Return fn() for key, sharing the result with concurrent callers.
+
+        Exceptions raised by fn are re-raised in every waiting caller and are
+        never cached.
+        """
+        with self._lock:
+            hit, value = self._cached(key)
+            if hit:
+                return value
+
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared_calls += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.backend_calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                # invalidate() may already have detached this call; its result
+                # is then stale and must not be cached.
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                    if call.error is None:
+                        self._store(key, call.result)
+            call.done.set()
+
+        return call.result
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Drop cached results and detach in-flight calls.
+
+        Callers arriving after invalidation start a fresh fetch instead of
+        joining one that may have read pre-write state. Omit key to clear
+        the whole group.
+        """
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+                self._calls.clear()
+            else:
+                self._cache.pop(key, None)
+                self._calls.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return self._stats(len(self._calls))
+
+
+class AsyncSingleFlight(_ResultCache):
+    """SingleFlight for async callers: concurrent awaits of one key share a task."""
+
+    def __init__(self, ttl_seconds: float = 0.0, max_entries: int = 1024) -> None:
+        super().__init__(ttl_seconds, max_entries)
+        self._tasks: dict[Hashable, asyncio.Task[Any]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() for key, sharing the result with concurrent callers.
+
+        Exceptions propagate to every waiter and are never cached. A caller
+        being cancelled does not cancel the shared fetch for the others.
+        """
+        hit, value = self._cached(key)
+        if hit:
+            return value
+
+        task = self._tasks.get(key)
+        if task is not None:
+            self.shared_calls += 1
+        else:
+            self.backend_calls += 1
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        if key is None:
+            self._cache.clear()
+            self._tasks.clear()
+        else:
+            self._cache.pop(key, None)
+            self._tasks.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        return self._stats(len(self._tasks))
+
+    def _finish(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        # Skip if invalidate() detached this task: its result may be stale.
+        if self._tasks.get(key) is not task:
+            return
+        del self._tasks[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._store(key, task.result())
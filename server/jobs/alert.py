@@ -11,56 +11,14 @@ if project_root not in sys.path:
 
 from core.firebase import initialize_firebase, get_firestore_client
 from jobs.route import get_user_routes_with_schedules
+from services.journey_planner import route_stations
+from services.schedule_engine import is_schedule_active, rider_week_minute
+from services.travel_time import canonical_station_code
 
 # =============================================================================
 # Helper Functions
 # =============================================================================
 
-def to_total_minutes(t_str: str) -> int:
-    """Helper to convert HH:MM to total minutes since midnight."""
-    try:
-        h, m = map(int, t_str.split(":"))
-        return h * 60 + m
-    except (ValueError, AttributeError):
-        return 0
-
-def is_station_in_route(departing_station: str, destination_station: str, target_station: str) -> bool:
-    """
-    Checks if target_station is between departing_station and destination_station.
-    Assumes station IDs like 'KJ18', 'KJ20' etc.
-    """
-    try:
-        dep_num = int(str(departing_station)[2:])
-        dest_num = int(str(destination_station)[2:])
-        target_num = int(str(target_station)[2:])
-        
-        lower = min(dep_num, dest_num)
-        upper = max(dep_num, dest_num)
-        
-        return lower <= target_num <= upper
-    except (ValueError, TypeError, IndexError):
-        return False
-
-def is_time_affected(schedule: Dict[str, Any], current_time_str: str, current_day_str: str) -> bool:
-    """
-    Checks if an incident at current_time_str on current_day_str affects the given schedule.
-    Logic: dayOfWeek matches AND timeFrom <= current_time <= timeTo.
-    """
-    if schedule.get("dayOfWeek") != current_day_str:
-        return False
-    
-    time_from = schedule.get("timeFrom")
-    time_to = schedule.get("timeTo")
-    
-    if not time_from or not time_to:
-        return False
-        
-    t_from = to_total_minutes(str(time_from))
-    t_to = to_total_minutes(str(time_to))
-    t_curr = to_total_minutes(current_time_str)
-    
-    return t_from <= t_curr <= t_to
-
 def send_push_notification(device_token: str, title: str, body: str):
     """Mock implementation of sending a push notification."""
     print(f"\n>>> [MOCK NOTIFICATION] SENT TO TOKEN: {device_token}")
@@ -88,9 +46,8 @@ def notify_affected_users(affected_stations: List[str], line: str, incident_type
     
     user_involved = {}
     notified_count = 0
-    now = datetime.datetime.now()
-    current_day = now.strftime("%A")
-    current_time = now.strftime("%H:%M")
+    # Same rider-timezone evaluation as services/alert_service.
+    current_minute = rider_week_minute()
     
     for user_doc in users:
         user_data = user_doc.to_dict()
@@ -102,15 +59,14 @@ def notify_affected_users(affected_stations: List[str], line: str, incident_type
         is_user_notified = False
         
         for route in routes:
-            dep_st = route.get("departingStation")
-            dest_st = route.get("destinationStation")
+            stations_on_route = route_stations(route)
             
-            stations_found = [s for s in affected_stations if is_station_in_route(dep_st, dest_st, s)]
+            stations_found = [s for s in affected_stations if canonical_station_code(s) in stations_on_route]
             
             if stations_found:
                 schedules = route.get("schedules", [])
                 for schedule in schedules:
-                    if is_time_affected(schedule, current_time, current_day):
+                    if is_schedule_active(schedule, current_minute):
                         if device_token not in user_involved:
                             user_involved[device_token] = []
                         
@@ -11,10 +11,10 @@ if project_root not in sys.path:
 
 from core.firebase import initialize_firebase, get_firestore_client
 from jobs.users import get_user_id_by_email
-
-DAYS_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-MINUTES_IN_DAY = 1440
-MINUTES_IN_WEEK = 7 * MINUTES_IN_DAY
+from services.journey_planner import route_station_sequence
+from services.schedule_engine import rider_week_minute
+from services.schedule_index import WeeklyScheduleIndex
+from services.travel_time import calc_time_to
 
 
 def get_user_routes_with_schedules(user_id: str) -> List[Dict[str, Any]]:
@@ -50,15 +50,6 @@ def get_user_routes_with_schedules(user_id: str) -> List[Dict[str, Any]]:
         
     return full_routes
 
-def calcTimeTo(time_from, departing_station, destination_station):
-    BUFFER_TIME = 10
-    departing_station_num = int(departing_station[2:])
-    destination_station_num = int(destination_station[2:])
-    duration = abs(destination_station_num - departing_station_num) * 2 + BUFFER_TIME
-    time_from_dt = datetime.datetime.strptime(time_from, "%H:%M")
-    time_to_dt = time_from_dt + datetime.timedelta(minutes=duration)
-    return time_to_dt.strftime("%H:%M")
-
 def add_schedule(user_id: str, route_id: str, day_of_week: str, time_from: str, time_to: str) -> str | None:
     """
     Adds a schedule sub-subcollection to a route document.
@@ -133,13 +124,14 @@ def save_or_update_route(
         route_exists = True
 
     # Calculate timeTo for the schedule subcollection
-    time_to = calcTimeTo(time, departing_station, destination_station)
+    time_to = calc_time_to(time, departing_station, destination_station)
 
     route_data = {
         "departingLocation": departing_location,
         "destinationLocation": destination_location,
         "departingStation": departing_station,
         "destinationStation": destination_station,
+        "stationSequence": route_station_sequence(departing_station, destination_station),
         "description": route_desc,
         "updatedAt": datetime.datetime.now(datetime.timezone.utc),
     }
@@ -179,60 +171,20 @@ def get_next_upcoming_route(email: str, timestamp: float) -> Dict[str, Any] | No
     Finds the next upcoming route for a user, searching throughout the entire week.
     Returns the route info flattened with only the relevant upcoming schedule.
     """
-    dt = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
-    current_day = dt.strftime("%A")
-    current_time_str = dt.strftime("%H:%M")
-
     routes = get_all_routes_by_email(email)
     if not routes:
         return None
 
-    try:
-        current_day_idx = DAYS_ORDER.index(current_day)
-    except ValueError:
+    # wait=0 (a schedule due exactly now) counts as the next departure.
+    departure = WeeklyScheduleIndex(routes).next_after(rider_week_minute(timestamp))
+    if departure is None:
         return None
 
-    current_hour, current_min = map(int, current_time_str.split(":"))
-    current_total_min: int = (current_day_idx * MINUTES_IN_DAY) + (current_hour * 60) + current_min
-    
-    # Use global constant for week minutes
-    
-    best_candidate = None
-    min_wait: float = float('inf')
-
-    for route in routes:
-        schedules = route.get("schedules", [])
-        for schedule in schedules:
-            day = schedule.get("dayOfWeek")
-            time_str = schedule.get("timeFrom")
-            if not day or not time_str:
-                continue
-                
-            try:
-                # Explicitly cast to string for the static analysis tool
-                day_str: str = str(day)
-                day_idx: int = DAYS_ORDER.index(day_str)
-                hour, minute = map(int, time_str.split(":"))
-            except (ValueError, AttributeError):
-                continue
-                
-            schedule_total_min: int = (day_idx * MINUTES_IN_DAY) + (hour * 60) + minute
-            
-            # Calculate wait time in minutes (cyclic)
-            wait: int = (schedule_total_min - current_total_min) % MINUTES_IN_WEEK
-            
-            # If wait is 0, it means the schedule is exactly now. 
-            # We usually want the "next" occurrence unless it's strictly >= now.
-            # For this logic, wait=0 means it's due now.
-            if float(wait) < min_wait:
-                min_wait = wait
-                candidate = route.copy()
-                candidate.pop("schedules", None)
-                candidate["routeId"] = str(route.get("id", ""))
-                candidate.update(schedule)
-                candidate["scheduleId"] = str(schedule.get("id", ""))
-                if "id" in candidate:
-                    del candidate["id"]
-                best_candidate = candidate
-
-    return best_candidate
+    candidate = departure.route.copy()
+    candidate.pop("schedules", None)
+    candidate["routeId"] = str(departure.route.get("id", ""))
+    candidate.update(departure.schedule)
+    candidate["scheduleId"] = str(departure.schedule.get("id", ""))
+    if "id" in candidate:
+        del candidate["id"]
+    return candidate
@@ -15,6 +15,7 @@ from jobs.alert import (
 )
 from jobs.users import register_user, check_email_exists, get_user
 from jobs.route import save_or_update_route
+from services.schedule_engine import rider_timezone
 
 # Configuration
 TEST_EMAIL = "alert_tester_management@example.com"
@@ -29,7 +30,7 @@ def setup_test_environment():
         register_user("Management Tester", "pass123", TEST_EMAIL, "1990-01-01", DEVICE_TOKEN)
     
     # 2. Register Route (active for 'now')
-    now = datetime.datetime.now()
+    now = datetime.datetime.now(rider_timezone())
     current_day = now.strftime("%A")
     current_time_minus_10 = (now - datetime.timedelta(minutes=10)).strftime("%H:%M")
 
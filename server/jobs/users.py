@@ -13,6 +13,7 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from core.firebase import initialize_firebase, get_firestore_client
+from services.user_service import is_indexable_email, normalize_email
 from utils.hashing_utils import hash_password, verify_password
 
 def register_user(user_name, user_password, user_email, dob, device_token):
@@ -26,6 +27,11 @@ def register_user(user_name, user_password, user_email, dob, device_token):
         print("Error: Could not obtain Firestore client.")
         return None
 
+    email = normalize_email(user_email)
+    if not is_indexable_email(email):
+        print("Error: Email addresses containing '/' are not supported.")
+        return None
+
     # Parse DOB into a datetime object (UTC+8)
     tz_utc8 = datetime.timezone(datetime.timedelta(hours=8))
     try:
@@ -38,17 +44,19 @@ def register_user(user_name, user_password, user_email, dob, device_token):
     record = {
         "user_name": user_name,
         "password_enc": hash_password(user_password),
-        "email": user_email.lower(),
+        "email": email,
         "date_of_birth": dob_dt,
         "created_at": datetime.datetime.now(datetime.timezone.utc),
         "last_modified": datetime.datetime.now(datetime.timezone.utc),
         "device_token": device_token,
     }
 
-    # Load
-    collection_ref = db.collection("users")
+    # Load (user and emails/{email} index together, as the API does)
     doc_id = str(uuid.uuid4())
-    collection_ref.document(doc_id).set(record)
+    batch = db.batch()
+    batch.create(db.collection("emails").document(record["email"]), {"user_id": doc_id, "created_at": record["created_at"]})
+    batch.set(db.collection("users").document(doc_id), record)
+    batch.commit()
     print(f"User '{user_name}' registered successfully with ID: {doc_id}")
     return doc_id
 
@@ -62,7 +70,7 @@ def check_email_exists(email):
         return False
 
     collection_ref = db.collection("users")
-    query = collection_ref.where("email", "==", email.lower()).limit(1)
+    query = collection_ref.where("email", "==", normalize_email(email)).limit(1)
     results = query.stream()
     
     # Check if results stream has at least one document
@@ -80,7 +88,7 @@ def get_user(email):
 
     db = get_firestore_client()
     collection_ref = db.collection("users")
-    query = collection_ref.where("email", "==", email.lower()).limit(1)
+    query = collection_ref.where("email", "==", normalize_email(email)).limit(1)
     results = query.stream()
 
     user_data = None
@@ -110,7 +118,7 @@ def get_user_id_by_email(email: str) -> str:
         return None
 
     users_ref = db.collection("users")
-    query = users_ref.where("email", "==", email.lower()).limit(1)
+    query = users_ref.where("email", "==", normalize_email(email)).limit(1)
     results = query.stream()
 
     for doc in results:
@@ -130,7 +138,7 @@ def login_user():
 
     db = get_firestore_client()
     collection_ref = db.collection("users")
-    query = collection_ref.where("email", "==", email.lower()).limit(1)
+    query = collection_ref.where("email", "==", normalize_email(email)).limit(1)
     results = query.stream()
 
     for doc in results:
@@ -1,18 +1,34 @@
+import asyncio
 from contextlib import asynccontextmanager
+import json
 import logging
 import time
+from typing import Any
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from api.schemas.base import ErrorResponse
 from api.v1.api import api_router
+from core.admission import AdmissionController, Shed
 from core.config import get_settings
 from core.firebase import get_firestore_client, initialize_firebase
+from core.http_client import close_http_client
+from core.metrics import get_metrics
+from core.session import get_session_manager, refresh_revocations_periodically
+from services.alert_service import start_alert_stream_feed
+from services.occupancy_service import (
+    get_occupancy_table,
+    load_occupancy_table,
+    persist_occupancy_periodically,
+    sync_occupancy_periodically,
+)
+from services.reminder_service import run_reminder_dispatcher
+from services.travel_time import get_travel_time_matrix
 
 settings = get_settings()
 
@@ -25,8 +41,48 @@ logger.setLevel(logging.INFO)
 async def lifespan(app: FastAPI):
     # Startup
     initialize_firebase()
+    # Fails startup on a multi-worker deployment without SESSION_SECRET.
+    session_manager = get_session_manager()
+    try:
+        session_manager.load_revocations()
+    except Exception as exc:
+        logger.warning("Could not load revoked sessions: %s", exc)
+    revocations = asyncio.create_task(
+        refresh_revocations_periodically(settings.SESSION_REVOCATION_REFRESH_SECONDS)
+    )
+    # Every worker listens, so stream clients see alert changes made anywhere.
+    try:
+        alert_feed = start_alert_stream_feed()
+    except Exception as exc:
+        logger.warning("Could not start the alert stream feed: %s", exc)
+        alert_feed = []
+    # Precompute the station travel-time matrix before the first schedule write.
+    get_travel_time_matrix()
+    # Occupancy loads in the background; analytics report not-ready until then.
+    occupancy_load = asyncio.create_task(asyncio.to_thread(load_occupancy_table))
+    occupancy_persist = asyncio.create_task(
+        persist_occupancy_periodically(settings.OCCUPANCY_PERSIST_INTERVAL_SECONDS)
+    )
+    occupancy_sync = asyncio.create_task(sync_occupancy_periodically(settings.OCCUPANCY_SYNC_INTERVAL_SECONDS))
+    # Pre-departure reminders start once the occupancy registry is loaded.
+    reminders = asyncio.create_task(run_reminder_dispatcher()) if settings.REMINDER_ENABLED else None
     yield
-    # Shutdown (if needed in future)
+    # Shutdown
+    if reminders is not None:
+        reminders.cancel()
+    revocations.cancel()
+    for watch in alert_feed:
+        watch.unsubscribe()
+    occupancy_persist.cancel()
+    occupancy_sync.cancel()
+    occupancy_load.cancel()
+    table = get_occupancy_table()
+    if table.ready and table.dirty:
+        try:
+            table.save(settings.OCCUPANCY_SNAPSHOT_PATH)
+        except Exception as exc:
+            logger.warning("Could not save occupancy snapshot: %s", exc)
+    await close_http_client()
 
 
 app = FastAPI(
@@ -48,21 +104,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request/response fields that must never reach the logs.
+REDACTED_BODY_FIELDS = frozenset({"password", "session_token"})
+
+
+def _redact_body(text: str) -> str:
+    """Mask secret fields of a JSON body; other bodies are logged as-is."""
+    if not text.lstrip().startswith("{"):
+        return text
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return text
+
+    def redact(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {
+                key: "[REDACTED]" if key in REDACTED_BODY_FIELDS and item is not None else redact(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [redact(item) for item in value]
+        return value
+
+    return json.dumps(redact(payload), separators=(",", ":"), ensure_ascii=False)
+
+
 # Logging interceptor to show all request and response content
 @app.middleware("http")
 async def log_requests_and_responses(request: Request, call_next) -> Response:
     request_body = await request.body()
-    request_body_text = request_body.decode("utf-8", errors="replace")
+    request_body_text = _redact_body(request_body.decode("utf-8", errors="replace"))
 
     start_time = time.perf_counter()
     response = await call_next(request)
     duration_ms = (time.perf_counter() - start_time) * 1000
 
+    # Long-lived streams (alert SSE) cannot be buffered for logging.
+    if response.headers.get("content-type", "").startswith("text/event-stream"):
+        logger.info(
+            "STREAM method=%s path=%s query=%s status=%s",
+            request.method,
+            request.url.path,
+            request.url.query,
+            response.status_code,
+        )
+        return response
+
     response_body_bytes = b""
     async for chunk in response.body_iterator:
         response_body_bytes += chunk
 
-    response_body_text = response_body_bytes.decode("utf-8", errors="replace")
+    if response.headers.get("content-encoding"):
+        response_body_text = f"<{response.headers['content-encoding']} {len(response_body_bytes)} bytes>"
+    else:
+        response_body_text = _redact_body(response_body_bytes.decode("utf-8", errors="replace"))
 
     logger.info(
         "REQUEST method=%s path=%s query=%s body=%s",
@@ -87,6 +183,48 @@ async def log_requests_and_responses(request: Request, call_next) -> Response:
         media_type=response.media_type,
     )
 
+admission_controller = AdmissionController(
+    api_prefix=settings.API_V1_STR,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    queue_timeout_seconds=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+)
+
+
+# Admission control: registered last so it runs first and sheds overload
+# before any body is read or logged.
+@app.middleware("http")
+async def admission_control(request: Request, call_next) -> Response:
+    route_class = (
+        admission_controller.classify(request.method, request.url.path)
+        if settings.ADMISSION_CONTROL_ENABLED
+        else None
+    )
+    if route_class is None:
+        return await call_next(request)
+
+    try:
+        limiter = await admission_controller.acquire(route_class)
+    except Shed as exc:
+        error_payload = ErrorResponse(
+            error="SERVICE_UNAVAILABLE",
+            message="Server is busy, please retry",
+            details={"path": str(request.url.path), "route_class": route_class},
+        )
+        return JSONResponse(
+            status_code=503,
+            content=error_payload.model_dump(),
+            headers={"Retry-After": str(exc.retry_after_seconds)},
+        )
+
+    start_time = time.perf_counter()
+    latency_ms = None
+    try:
+        response = await call_next(request)
+        latency_ms = (time.perf_counter() - start_time) * 1000
+        return response
+    finally:
+        limiter.release(latency_ms=latency_ms)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
@@ -98,7 +236,11 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
         message=str(exc.detail),
         details={"path": str(request.url.path)},
     )
-    return JSONResponse(status_code=exc.status_code, content=error_payload.model_dump())
+    return JSONResponse(
+        status_code=exc.status_code,
+        content=error_payload.model_dump(),
+        headers=getattr(exc, "headers", None),
+    )
 
 
 @app.exception_handler(RequestValidationError)
@@ -155,3 +297,8 @@ def health_check() -> dict[str, str]:
         "service": "Donki-Wonki API",
         "firebase": firebase_status,
     }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> str:
+    return get_metrics().render_prometheus()
@@ -0,0 +1,89 @@
+"""Create emails/{normalized_email} index documents for existing users.
+
+Users registered before the email index existed are only found through the
+legacy query fallback. Run this once, then set EMAIL_INDEX_LEGACY_FALLBACK
+to false. Safe to re-run: existing index documents are left untouched.
+
+When several user documents share an email (possible before the index made
+registration race-free), the earliest created one is indexed and the rest
+are reported. Emails containing "/" cannot be index document ids and are
+reported too.
+
+Usage:
+    python scripts/backfill_email_index.py [--dry-run]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+from core.firebase import get_firestore_client, initialize_firebase
+from services.route_service import MAX_BATCH_WRITES
+from services.user_service import EMAIL_INDEX_COLLECTION, is_indexable_email, normalize_email
+
+EPOCH = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill the users email index.")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be written.")
+    args = parser.parse_args()
+
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        raise SystemExit("Could not obtain Firestore client")
+
+    owners: dict[str, tuple[datetime.datetime, str]] = {}
+    duplicates: dict[str, list[str]] = {}
+    unindexable: list[tuple[str, str]] = []
+    for doc in db.collection("users").stream():
+        data = doc.to_dict() or {}
+        email = normalize_email(str(data.get("email", "")))
+        if not email:
+            continue
+        if not is_indexable_email(email):
+            unindexable.append((email, doc.id))
+            continue
+        created_at = data.get("created_at") or EPOCH
+        current = owners.get(email)
+        if current is not None:
+            duplicates.setdefault(email, []).append(max(current, (created_at, doc.id))[1])
+        if current is None or (created_at, doc.id) < current:
+            owners[email] = (created_at, doc.id)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    index_ref = db.collection(EMAIL_INDEX_COLLECTION)
+    batch = db.batch()
+    pending = 0
+    written = 0
+    for email, (created_at, user_id) in owners.items():
+        if index_ref.document(email).get().exists:
+            continue
+        written += 1
+        if args.dry_run:
+            continue
+        batch.set(index_ref.document(email), {"user_id": user_id, "created_at": now if created_at is EPOCH else created_at})
+        pending += 1
+        if pending == MAX_BATCH_WRITES:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+
+    suffix = " (dry run)" if args.dry_run else ""
+    print(f"users_with_email={len(owners)} index_docs_written={written}{suffix}")
+    for email, user_ids in duplicates.items():
+        print(f"[DUPLICATE] {email}: kept {owners[email][1]}, not indexed {', '.join(user_ids)}")
+    for email, user_id in unindexable:
+        print(f"[UNINDEXABLE] {email}: user {user_id} (contains '/')")
+
+
+if __name__ == "__main__":
+    main()
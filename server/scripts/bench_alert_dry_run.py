@@ -0,0 +1,160 @@
+"""Benchmark the alert impact dry run against a synthetic rider base.
+
+Fills an OccupancyTable in memory (no Firestore) with random commutes on
+the real station dataset (plus some on legacy AG/SP code ranges outside it),
+checks the dry run against a brute-force scan that applies
+notify_affected_users' matching rule, and times the query. Then rewrites a
+few routes and checks the per-station window arrays patched in place against
+arrays built from scratch.
+
+Usage:
+    python scripts/bench_alert_dry_run.py [--users 100000] [--queries 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+import numpy as np
+
+from services import occupancy_service
+from services.journey_planner import route_station_sequence, route_stations
+from services.occupancy_service import OccupancyTable, estimate_alert_impact
+from services.schedule_engine import DAYS_ORDER, MINUTES_IN_DAY, is_schedule_active
+from services.travel_time import calc_time_to, canonical_station_code, get_travel_time_matrix
+
+
+def synthetic_routes(users: int, rng: random.Random) -> list[tuple[str, str, dict]]:
+    codes = get_travel_time_matrix().codes
+    # Stations outside the dataset; routes between them get a same-line code range.
+    legacy = [f"AG{number}" for number in range(1, 19)] + [f"SP{number}" for number in range(1, 30)]
+    routes = []
+    for user in range(users):
+        for route in range(rng.choice([1, 1, 2])):
+            if rng.random() < 0.05:
+                line = rng.choice(["AG", "SP"])
+                departing, destination = rng.sample([code for code in legacy if code.startswith(line)], 2)
+            else:
+                departing, destination = rng.sample(codes, 2)
+            time_from = f"{rng.randrange(6, 23):02d}:{rng.choice([0, 10, 20, 30, 40, 50]):02d}"
+            time_to = calc_time_to(time_from, departing, destination)
+            days = DAYS_ORDER[:5] if rng.random() < 0.8 else rng.sample(DAYS_ORDER, 2)
+            routes.append(
+                (
+                    f"user-{user}",
+                    f"route-{route}",
+                    {
+                        "departingStation": departing,
+                        "destinationStation": destination,
+                        "stationSequence": route_station_sequence(departing, destination),
+                        "schedules": [{"dayOfWeek": day, "timeFrom": time_from, "timeTo": time_to} for day in days],
+                    },
+                )
+            )
+    return routes
+
+
+def brute_force(
+    routes: list[tuple[str, str, dict]],
+    tokens: set[str],
+    stations: list[str],
+    minute: int,
+) -> set[str]:
+    return {
+        user_id
+        for user_id, _, route in routes
+        if user_id in tokens
+        and {canonical_station_code(station) for station in stations} & route_stations(route)
+        and any(is_schedule_active(schedule, minute) for schedule in route["schedules"])
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Alert dry-run benchmark.")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    routes = synthetic_routes(args.users, rng)
+    table = OccupancyTable(get_travel_time_matrix().codes)
+    start = time.perf_counter()
+    for user_id, route_id, route in routes:
+        table.set_route(user_id, route_id, route)
+    # One rider in ten never registered a device token, so notify skips them.
+    tokens = {user_id for user_id, _, _ in routes if rng.random() < 0.9}
+    for user_id, _, _ in routes:
+        table.set_device_token(user_id, user_id in tokens)
+    print(f"users={args.users} routes={len(routes)} build={time.perf_counter() - start:.1f}s")
+    occupancy_service._occupancy_table = table
+
+    codes = sorted({code for _, _, route in routes for code in route_stations(route)})
+    queries = [
+        (rng.sample(codes, rng.choice([1, 2, 3])), rng.randrange(5) * MINUTES_IN_DAY + rng.randrange(7 * 60, 20 * 60))
+        for _ in range(args.queries)
+    ]
+
+    start = time.perf_counter()
+    for code in codes:
+        table.station_windows(code)
+    built = time.perf_counter() - start
+    print(f"station window arrays built in {built * 1000:.0f}ms (once)")
+
+    checks = queries[:5] + [(["ag9", "SP4"], queries[0][1])]
+    for stations, minute in checks:
+        expected = brute_force(routes, tokens, stations, minute)
+        result = estimate_alert_impact(stations, minute, 0, 15, sample_size=len(expected))
+        if result["total_recipients"] != len(expected) or {item["user_id"] for item in result["sample"]} != expected:
+            raise AssertionError(
+                f"dry run found {result['total_recipients']} at {stations}, brute force {len(expected)}"
+            )
+    print(f"[PASS] matches brute force on {len(checks)} queries, legacy codes and device tokens included")
+
+    rewritten = synthetic_routes(200, random.Random(11))
+    start = time.perf_counter()
+    for (user_id, route_id, _), (_, _, route) in zip(routes, rewritten):
+        table.set_route(user_id, route_id, route)
+    written = time.perf_counter() - start
+    start = time.perf_counter()
+    for code in codes:
+        table.station_windows(code)
+    patched = time.perf_counter() - start
+    fresh = OccupancyTable(table.station_codes)
+    for user_id, route_id, route in routes[len(rewritten):]:
+        fresh.set_route(user_id, route_id, route)
+    for (user_id, route_id, _), (_, _, route) in zip(routes, rewritten):
+        fresh.set_route(user_id, route_id, route)
+    for code in codes:
+        ours, theirs = table.station_windows(code), fresh.station_windows(code)
+        pairs = sorted(zip(ours.starts.tolist(), ours.ends.tolist(), map(table.user_id_at, ours.users.tolist())))
+        expected_pairs = sorted(
+            zip(theirs.starts.tolist(), theirs.ends.tolist(), map(fresh.user_id_at, theirs.users.tolist()))
+        )
+        if pairs != expected_pairs or not np.all(np.diff(ours.starts) >= 0):
+            raise AssertionError(f"patched windows at {code} differ from a rebuild")
+    print(
+        f"[PASS] {len(rewritten)} route writes ({written / len(rewritten) * 1000:.2f}ms each) patched into "
+        f"every station's window arrays in {patched * 1000:.0f}ms (a full build takes {built * 1000:.0f}ms)"
+    )
+
+    for duration in (0, 60, 180):
+        timings = []
+        for stations, minute in queries:
+            start = time.perf_counter()
+            result = estimate_alert_impact(stations, minute, duration, 15, sample_size=10)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(
+            f"duration={duration:>3}min buckets={len(result['buckets']):>2} "
+            f"p50={timings[len(timings) // 2]:.1f}ms p95={timings[int(len(timings) * 0.95)]:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
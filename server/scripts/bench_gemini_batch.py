@@ -0,0 +1,143 @@
+"""Throughput of GeminiService batch extraction against the local Gemini stub.
+
+Runs the same posts one call at a time and through extract_incidents_batch
+(several batches at once, as concurrent requests would), with simulated model
+latency. The stub's peak in-flight count must stay within
+GEMINI_MAX_CONCURRENCY. Reposting the batched posts (with different
+whitespace) must be answered from the LLM cache without reaching the stub.
+A malformed answer must not be cached. A final batch mixes in transient 503s
+and a post that never answers, to check retries and partial-failure
+reporting.
+
+Usage:
+    python scripts/bench_gemini_batch.py [--posts 60] [--latency 0.2]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+from scripts.stub_gemini import STALL_MARKER, StubGemini, start_stub
+
+POSTS = [
+    "KJ line stuck at KL Sentral again, 20 minutes no train",
+    "Train broke down near Pasar Seni, everyone asked to alight",
+    "Signal problem at Masjid Jamek, trains running slow",
+    "Platform at KLCC is so packed I can't get on",
+    "Lovely sunset from the Bangsar platform today",
+    "Does anyone know if the Gombak car park is free on weekends?",
+]
+
+
+async def run(stub: StubGemini, posts: int, latency: float) -> None:
+    from core.config import get_settings
+    from core.gemini import GeminiParseError
+    from core.metrics import get_metrics
+    from api.schemas.gemini import BatchIncidentExtractionRequest, IncidentExtractionRequest
+    from services.gemini_service import GeminiService
+
+    settings = get_settings()
+    stub.latency_seconds = latency
+    service = GeminiService()
+    # Distinct texts per phase so the LLM cache does not answer them.
+    requests = [
+        IncidentExtractionRequest(text=f"{POSTS[index % len(POSTS)]} #{index}", source="twitter")
+        for index in range(posts)
+    ]
+
+    start = time.perf_counter()
+    for request in requests:
+        await service.extract_incident(request.model_copy(update={"text": f"{request.text} (seq)"}))
+    sequential = time.perf_counter() - start
+    print(f"sequential: {posts} posts in {sequential:.2f}s ({posts / sequential:.1f} posts/s)")
+
+    stub.max_in_flight = 0
+    batches = [BatchIncidentExtractionRequest(texts=requests[start:start + 10]) for start in range(0, posts, 10)]
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(service.extract_incidents_batch(batch) for batch in batches))
+    concurrent = time.perf_counter() - start
+    incidents = sum(result.is_incident for response in responses for result in response.results)
+    print(
+        f"batched: {posts} posts in {concurrent:.2f}s ({posts / concurrent:.1f} posts/s, "
+        f"{sequential / concurrent:.1f}x) incidents={incidents} peak_in_flight={stub.max_in_flight}"
+    )
+    if stub.max_in_flight > settings.GEMINI_MAX_CONCURRENCY:
+        raise AssertionError(f"{stub.max_in_flight} calls in flight, limit {settings.GEMINI_MAX_CONCURRENCY}")
+
+    calls = stub.requests["generateContent"]
+    reposts = [
+        BatchIncidentExtractionRequest(
+            texts=[
+                IncidentExtractionRequest(text=f"  {item.text.replace(' ', '  ')}\n", source="user_report")
+                for item in batch.texts
+            ]
+        )
+        for batch in batches
+    ]
+    start = time.perf_counter()
+    cached = await asyncio.gather(*(service.extract_incidents_batch(batch) for batch in reposts))
+    elapsed = time.perf_counter() - start
+    hit_ratio = get_metrics().snapshot().get('persistent_cache_hit_ratio{namespace="llm"}', 0.0)
+    print(
+        f"reposted: {posts} posts in {elapsed * 1000:.0f}ms model_calls={stub.requests['generateContent'] - calls} "
+        f"llm_cache_hit_ratio={hit_ratio:.2f}"
+    )
+    if stub.requests["generateContent"] != calls or [r.results for r in cached] != [r.results for r in responses]:
+        raise AssertionError("reposted posts were not answered from the LLM cache")
+
+    stub.malformed_next = 1
+    malformed = IncidentExtractionRequest(text=f"{POSTS[0]} (malformed)")
+    try:
+        await service.extract_incident(malformed)
+        raise AssertionError("a malformed answer was accepted")
+    except GeminiParseError:
+        pass
+    calls = stub.requests["generateContent"]
+    retried = await service.extract_incident(malformed)
+    if stub.requests["generateContent"] != calls + 1 or not retried.is_incident:
+        raise AssertionError("the malformed answer was served from the LLM cache")
+    print("[PASS] a malformed answer was rejected without being cached")
+
+    stub.fail_next = 3
+    texts = [IncidentExtractionRequest(text=f"{text} (retry)") for text in POSTS[:4]]
+    texts.insert(2, IncidentExtractionRequest(text=f"Is KJ running? {STALL_MARKER}"))
+    start = time.perf_counter()
+    response = await service.extract_incidents_batch(BatchIncidentExtractionRequest(texts=texts))
+    retries = get_metrics().snapshot().get("gemini_retries_total", 0)
+    print(
+        f"partial failure: processed={response.processed_count} failed={response.failed_count} "
+        f"errors={[(error.index, error.error) for error in response.errors]} retries={retries:.0f} "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    if (response.processed_count, [error.index for error in response.errors]) != (4, [2]):
+        raise AssertionError("expected only the stalled post (index 2) to fail")
+    print("[PASS] retries absorbed the 503s and the stalled post was reported as failed")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gemini batch extraction benchmark.")
+    parser.add_argument("--posts", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    stub = start_stub()
+    # Settings are read at import time, so point them at the stub first.
+    os.environ.update(
+        GEMINI_BASE_URL=stub.base_url,
+        GEMINI_API_KEY="stub",
+        GEMINI_TIMEOUT_SECONDS=os.environ.get("GEMINI_TIMEOUT_SECONDS", "2"),
+        GEMINI_MAX_RETRIES=os.environ.get("GEMINI_MAX_RETRIES", "2"),
+        PERSISTENT_CACHE_PATH=os.path.join(tempfile.mkdtemp(), "cache.sqlite3"),
+    )
+    asyncio.run(run(stub, args.posts, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark journey planning: matrix build time and per-query latency.
+
+Builds the travel-time graph for the real dataset and for synthetic
+multi-line networks (lines crossing at shared interchange stations), then
+times cold plans (path walk from the precomputed matrix) and cached plans.
+Planned travel times are checked against a fresh Dijkstra run per query.
+
+Usage:
+    python scripts/bench_journey_planner.py [--queries 2000] [--lines 4 8 12] [--stations-per-line 30]
+"""
+
+import argparse
+import heapq
+import math
+import os
+import random
+import sys
+import time
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+from services import journey_planner
+from services.google_maps_service import load_stations
+from services.travel_time import Timetable, TravelTimeMatrix
+
+# Rough Klang Valley bounding box.
+LAT_RANGE = (2.90, 3.35)
+LNG_RANGE = (101.40, 101.85)
+
+
+def synthetic_network(lines: int, per_line: int, rng: random.Random) -> list[dict]:
+    """Straight lines at random angles through the box; every 6th stop is a shared interchange name."""
+    stations = []
+    for line in range(lines):
+        lat0, lng0 = rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+        angle = rng.uniform(0, math.pi)
+        for stop in range(per_line):
+            stations.append(
+                {
+                    "code": f"L{line:02d}{stop + 1:03d}",
+                    "name": f"Hub {stop // 6}" if stop % 6 == 0 else f"Line {line} stop {stop}",
+                    "line": f"Line {line}",
+                    "latitude": lat0 + 0.01 * stop * math.cos(angle),
+                    "longitude": lng0 + 0.01 * stop * math.sin(angle),
+                }
+            )
+    return stations
+
+
+def dijkstra_minutes(matrix: TravelTimeMatrix, start: int, end: int) -> float:
+    best = {start: 0.0}
+    queue = [(0.0, start)]
+    while queue:
+        minutes, node = heapq.heappop(queue)
+        if node == end:
+            return minutes
+        if minutes > best.get(node, math.inf):
+            continue
+        for neighbour, cost in matrix.edges[node]:
+            if minutes + cost < best.get(neighbour, math.inf):
+                best[neighbour] = minutes + cost
+                heapq.heappush(queue, (minutes + cost, neighbour))
+    return math.inf
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Journey planner benchmark.")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--lines", type=int, nargs="+", default=[4, 8, 12])
+    parser.add_argument("--stations-per-line", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    datasets = [("stations.json", load_stations())] + [
+        (f"synthetic-{lines}x{args.stations_per_line}", synthetic_network(lines, args.stations_per_line, rng))
+        for lines in args.lines
+    ]
+
+    print(f"queries={args.queries}")
+    print(f"{'dataset':>18} | {'stations':>8} | {'build_ms':>8} | {'dijkstra_us/q':>13} | {'plan_us/q':>9} | {'cached_us/q':>11}")
+    for name, stations in datasets:
+        start = time.perf_counter()
+        matrix = TravelTimeMatrix(stations, Timetable(), avg_speed_kmh=50.0)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # Plan against this dataset instead of the process-wide matrix.
+        journey_planner.get_travel_time_matrix = lambda: matrix
+        journey_planner._plan.cache_clear()
+        pairs = [(rng.choice(matrix.codes), rng.choice(matrix.codes)) for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        expected = [dijkstra_minutes(matrix, matrix.index_of(a), matrix.index_of(b)) for a, b in pairs]
+        dijkstra_us = (time.perf_counter() - start) * 1e6 / len(pairs)
+
+        start = time.perf_counter()
+        planned = [journey_planner.plan_journey(a, b) for a, b in pairs]
+        plan_us = (time.perf_counter() - start) * 1e6 / len(pairs)
+
+        start = time.perf_counter()
+        for a, b in pairs:
+            journey_planner.plan_journey(a, b)
+        cached_us = (time.perf_counter() - start) * 1e6 / len(pairs)
+
+        for want, got in zip(expected, planned):
+            got_minutes = math.inf if got is None else got.minutes
+            if not math.isclose(want, got_minutes) and not (math.isinf(want) and math.isinf(got_minutes)):
+                raise AssertionError(f"{name}: planned {got_minutes} minutes, Dijkstra found {want}")
+        print(f"{name:>18} | {len(stations):>8} | {build_ms:>8.1f} | {dijkstra_us:>13.1f} | {plan_us:>9.1f} | {cached_us:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Benchmark bcrypt login throughput per core through the hashing pool.
+
+Fires a burst of concurrent verifications at HashingPool for several worker
+counts and bcrypt costs, and prints logins/s overall and per worker.
+
+Usage:
+    python scripts/bench_login_hashing.py [--logins 64] [--rounds 10 12]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+from core.hashing_pool import HashingPool
+from utils.hashing_utils import hash_password
+
+
+async def run_burst(pool: HashingPool, password: str, hashed: str, logins: int) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(pool.verify(password, hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    if not all(results):
+        raise AssertionError("verification failed")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="bcrypt login throughput benchmark.")
+    parser.add_argument("--logins", type=int, default=64, help="Concurrent logins per burst.")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12], help="bcrypt cost factors.")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, max(cpu_count // 2, 1), cpu_count})
+    password = "BenchmarkPass123!"
+
+    print(f"cpu_count={cpu_count} logins_per_burst={args.logins}")
+    print(f"{'rounds':>6} | {'workers':>7} | {'elapsed_s':>9} | {'logins/s':>9} | {'logins/s/worker':>15}")
+    for rounds in args.rounds:
+        hashed = hash_password(password, rounds=rounds)
+        for workers in worker_counts:
+            pool = HashingPool(workers=workers, max_pending=args.logins)
+            elapsed = asyncio.run(run_burst(pool, password, hashed, args.logins))
+            throughput = args.logins / elapsed
+            print(f"{rounds:>6} | {workers:>7} | {elapsed:>9.3f} | {throughput:>9.1f} | {throughput / workers:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark the pre-departure reminder queue over one simulated week.
+
+Fills the reminder queue from an in-memory OccupancyTable of synthetic
+commuters (no Firestore, nothing is sent), then steps through every minute of
+a week: each departure must come due exactly once, REMINDER_LEAD_MINUTES
+before it leaves. The time per wake-up is compared with scanning every route
+each minute.
+
+Usage:
+    python scripts/bench_reminder_queue.py [--users 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+from scripts.bench_alert_dry_run import synthetic_routes
+from services.occupancy_service import OccupancyTable
+from services.reminder_service import ReminderQueue
+from services.schedule_engine import MINUTES_IN_WEEK, rider_wall_minute
+from services.travel_time import get_travel_time_matrix
+
+LEAD_MINUTES = 15
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reminder queue benchmark.")
+    parser.add_argument("--users", type=int, default=100_000)
+    args = parser.parse_args()
+
+    table = OccupancyTable(get_travel_time_matrix().codes)
+    for user_id, route_id, route in synthetic_routes(args.users, random.Random(7)):
+        table.set_route(user_id, route_id, route)
+    routes = table.routes()
+    expected = Counter((key, start % MINUTES_IN_WEEK) for key, route in routes for start, _ in route.windows)
+
+    queue = ReminderQueue(lead_minutes=LEAD_MINUTES)
+    week_start = rider_wall_minute() // MINUTES_IN_WEEK * MINUTES_IN_WEEK + MINUTES_IN_WEEK
+    start = time.perf_counter()
+    queue.fill(table.routes, week_start)
+    print(f"routes={len(routes)} departures={len(expected)} fill={time.perf_counter() - start:.2f}s")
+
+    fired: Counter = Counter()
+    wakeups = 0
+    busiest = 0.0
+    start = time.perf_counter()
+    now = week_start
+    while True:
+        next_fire = queue.next_fire()
+        if next_fire is None or next_fire >= week_start + MINUTES_IN_WEEK:
+            break
+        # The dispatcher sleeps straight to the next due minute.
+        now = next_fire
+        tick = time.perf_counter()
+        for reminder in queue.pop_due(now):
+            if (reminder.departure - LEAD_MINUTES) % MINUTES_IN_WEEK != now % MINUTES_IN_WEEK:
+                raise AssertionError(f"{reminder} fired at week minute {now % MINUTES_IN_WEEK}")
+            fired[(reminder.key, reminder.departure)] += 1
+        busiest = max(busiest, time.perf_counter() - tick)
+        wakeups += 1
+    elapsed = time.perf_counter() - start
+    if fired != expected:
+        raise AssertionError(f"{sum(fired.values())} firings for {len(expected)} departures")
+    print(f"[PASS] every departure fired once: {sum(fired.values())} firings in {wakeups} wake-ups")
+    print(f"heap: week={elapsed:.2f}s per-wakeup={elapsed / wakeups * 1000:.3f}ms busiest={busiest * 1000:.2f}ms")
+
+    # Baseline: wake every minute and check every route's schedules.
+    start = time.perf_counter()
+    for minute in range(0, 60):
+        sum(
+            1
+            for _, route in routes
+            for window_start, _ in route.windows
+            if (window_start - LEAD_MINUTES) % MINUTES_IN_WEEK == minute
+        )
+    per_minute = (time.perf_counter() - start) / 60
+    print(f"scan: per-minute={per_minute * 1000:.1f}ms week={per_minute * MINUTES_IN_WEEK:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark backend calls vs client concurrency for SingleFlight.
+
+Simulates N devices hitting the same read (e.g. /report/top3) at once, with a
+fake backend that sleeps like a Firestore stream. Prints how many backend
+fetches each mode issued.
+
+Usage:
+    python scripts/bench_singleflight.py [--latency-ms 80] [--rounds 3]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+from core.singleflight import SingleFlight
+
+
+class FakeBackend:
+    def __init__(self, latency_s: float) -> None:
+        self.latency_s = latency_s
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def fetch(self) -> list[dict[str, str]]:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_s)
+        return [{"id": "r1"}, {"id": "r2"}, {"id": "r3"}]
+
+
+def run_burst(concurrency: int, rounds: int, latency_s: float, mode: str) -> tuple[int, float]:
+    backend = FakeBackend(latency_s)
+    flight = None
+    if mode == "singleflight":
+        flight = SingleFlight()
+    elif mode == "microcache":
+        flight = SingleFlight(ttl_seconds=2.0)
+
+    def request() -> None:
+        if flight is None:
+            backend.fetch()
+        else:
+            flight.do("top3", backend.fetch)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(rounds):
+            futures = [pool.submit(request) for _ in range(concurrency)]
+            for future in futures:
+                future.result()
+    elapsed = time.perf_counter() - start
+    return backend.calls, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SingleFlight coalescing benchmark.")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Simulated backend latency.")
+    parser.add_argument("--rounds", type=int, default=3, help="Back-to-back bursts per concurrency level.")
+    args = parser.parse_args()
+    latency_s = args.latency_ms / 1000
+
+    print(f"backend latency={args.latency_ms:.0f}ms rounds={args.rounds}")
+    print(f"{'concurrency':>11} | {'mode':>12} | {'requests':>8} | {'backend calls':>13} | {'elapsed_s':>9}")
+    for concurrency in (1, 10, 50, 200, 1000):
+        for mode in ("direct", "singleflight", "microcache"):
+            calls, elapsed = run_burst(concurrency, args.rounds, latency_s, mode)
+            total = concurrency * args.rounds
+            print(f"{concurrency:>11} | {mode:>12} | {total:>8} | {calls:>13} | {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
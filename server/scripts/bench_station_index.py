@@ -0,0 +1,102 @@
+"""Benchmark nearest-station lookups: linear haversine scan vs StationIndex.
+
+Uses the real dataset plus synthetic networks spread over the Klang Valley
+bounding box, and checks all methods agree on every query. The batch column
+times StationIndex.nearest_batch (NumPy) over all queries at once.
+
+Usage:
+    python scripts/bench_station_index.py [--queries 2000] [--sizes 37 500 2000 10000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+from services.google_maps_service import _haversine_km, load_stations
+from services.station_index import StationIndex
+
+# Rough Klang Valley bounding box.
+LAT_RANGE = (2.90, 3.35)
+LNG_RANGE = (101.40, 101.85)
+LINES = ["KJ", "AG", "SP", "KG", "PY", "MR", "BRT"]
+
+
+def synthetic_stations(count: int, rng: random.Random) -> list[dict]:
+    return [
+        {
+            "code": f"{LINES[i % len(LINES)]}{i:04d}",
+            "name": f"Station {i}",
+            "line": LINES[i % len(LINES)],
+            "latitude": rng.uniform(*LAT_RANGE),
+            "longitude": rng.uniform(*LNG_RANGE),
+        }
+        for i in range(count)
+    ]
+
+
+def linear_nearest(stations: list[dict], latitude: float, longitude: float) -> tuple[dict, float]:
+    # The lookup find_nearest_station used before the index.
+    best_station = None
+    best_distance = float("inf")
+    for station in stations:
+        distance = _haversine_km(latitude, longitude, float(station["latitude"]), float(station["longitude"]))
+        if distance < best_distance:
+            best_distance = distance
+            best_station = station
+    return best_station, best_distance
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Nearest-station lookup benchmark.")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 10000])
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    queries = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(args.queries)]
+    datasets = [("stations.json", load_stations())] + [
+        (f"synthetic-{size}", synthetic_stations(size, rng)) for size in args.sizes
+    ]
+
+    print(f"queries={args.queries}")
+    print(f"{'dataset':>17} | {'stations':>8} | {'build_ms':>8} | {'scan_us/q':>9} | {'index_us/q':>10} | {'batch_us/q':>10} | {'speedup':>7}")
+    for name, stations in datasets:
+        start = time.perf_counter()
+        index = StationIndex(stations)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        expected = [linear_nearest(stations, lat, lng) for lat, lng in queries]
+        scan_us = (time.perf_counter() - start) * 1e6 / len(queries)
+
+        start = time.perf_counter()
+        actual = [index.nearest(lat, lng, k=1)[0] for lat, lng in queries]
+        index_us = (time.perf_counter() - start) * 1e6 / len(queries)
+
+        lats = np.array([lat for lat, _ in queries])
+        lngs = np.array([lng for _, lng in queries])
+        start = time.perf_counter()
+        batch_positions, _ = index.nearest_batch(lats, lngs)
+        batch_us = (time.perf_counter() - start) * 1e6 / len(queries)
+        if any(stations[p] is not got for p, (got, _) in zip(batch_positions, actual)):
+            raise AssertionError(f"{name}: batch disagrees with index")
+
+        for (want, want_km), (got, got_km) in zip(expected, actual):
+            if want is not got and abs(want_km - got_km) > 1e-9:
+                raise AssertionError(f"{name}: index disagrees with scan")
+        print(
+            f"{name:>17} | {len(stations):>8} | {build_ms:>8.1f} | {scan_us:>9.1f} | {index_us:>10.1f} | {batch_us:>10.2f} | "
+            f"{scan_us / index_us:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Local stand-in for the Gemini generateContent API.
+
+Answers structured incident-extraction calls with a keyword classification of
+the post in the prompt, and counts requests, so GeminiService can be exercised
+without an API key or spend. `latency_seconds` and `fail_next` simulate slow
+responses and transient 503s, `malformed_next` answers that break the schema
+(a 0-100 confidence score); posts containing STALL_MARKER never get an
+answer in time.
+
+Usage:
+    python scripts/stub_gemini.py [--port 8766]
+
+then run the API with:
+    GEMINI_BASE_URL=http://127.0.0.1:8766 GEMINI_API_KEY=stub
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STALL_MARKER = "#stall"
+STALL_SECONDS = 60.0
+
+INCIDENT_KEYWORDS = {
+    "breakdown": "breakdown",
+    "broke down": "breakdown",
+    "signal": "signal_fault",
+    "packed": "overcrowding",
+    "maintenance": "maintenance",
+    "delay": "delay",
+    "stuck": "delay",
+}
+LINES = {"kelana jaya": "Kelana Jaya", "kj": "KJ", "ampang": "AG", "sri petaling": "SP"}
+STATIONS = ["KL Sentral", "Pasar Seni", "Masjid Jamek", "Bangsar", "KLCC", "Gombak"]
+
+_POST_PATTERN = re.compile(r'Post:\n"""\n(.*?)\n"""', re.DOTALL)
+
+
+class StubGemini(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int) -> None:
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.requests: Counter[str] = Counter()
+        self.latency_seconds = 0.0
+        self.fail_next = 0
+        self.malformed_next = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def enter(self) -> None:
+        with self._lock:
+            self.requests["generateContent"] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self) -> bool:
+        """Finish a request; returns False if it should fail with a 503."""
+        with self._lock:
+            self.in_flight -= 1
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return False
+        return True
+
+    def take_malformed(self) -> bool:
+        with self._lock:
+            if self.malformed_next > 0:
+                self.malformed_next -= 1
+                return True
+        return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubGemini
+
+    def do_POST(self) -> None:
+        if not self.path.split("?")[0].endswith(":generateContent"):
+            self.send_error(404)
+            return
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = "".join(
+            part.get("text", "") for content in payload.get("contents", []) for part in content.get("parts", [])
+        )
+        post = (_POST_PATTERN.search(prompt) or re.search(r"(.*)", prompt, re.DOTALL)).group(1)
+
+        self.server.enter()
+        time.sleep(STALL_SECONDS if STALL_MARKER in post else self.server.latency_seconds)
+        if not self.server.leave():
+            self.send_error(503)
+            return
+        answer = _classify(post)
+        if self.server.take_malformed():
+            answer["confidence_score"] *= 100
+        body = {
+            "candidates": [
+                {
+                    "content": {"role": "model", "parts": [{"text": json.dumps(answer)}]},
+                    "finishReason": "STOP",
+                }
+            ]
+        }
+        encoded = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def _classify(post: str) -> dict:
+    lowered = post.lower()
+    incident_type = next((kind for word, kind in INCIDENT_KEYWORDS.items() if word in lowered), "none")
+    if incident_type == "none":
+        return {
+            "is_incident": False,
+            "incident_type": "none",
+            "severity": "low",
+            "confidence_score": 0.9,
+            "explanation": "No service incident mentioned",
+        }
+    return {
+        "is_incident": True,
+        "line": next((code for word, code in LINES.items() if word in lowered), None),
+        "station": next((station for station in STATIONS if station.lower() in lowered), None),
+        "incident_type": incident_type,
+        "severity": "high" if incident_type == "breakdown" else "medium",
+        "description": post.strip()[:120],
+        "confidence_score": 0.85,
+        "explanation": f"Matched keyword for {incident_type}",
+    }
+
+
+def start_stub(port: int = 0) -> StubGemini:
+    """Start the stub on a background thread (port 0 picks a free port)."""
+    server = StubGemini(port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stub Gemini server.")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    server = StubGemini(args.port)
+    print(f"Stub Gemini listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Local stand-in for the Google Maps Geocoding and Places Autocomplete APIs.
+
+Serves canned JSON for a few Klang Valley places and counts requests, so the
+maps cache (and anything built on geocoding) can be exercised without an API
+key or spend. Unknown place_ids / queries answer ZERO_RESULTS.
+`latency_seconds` and `fail_next` simulate slow responses and transient 503s.
+
+Usage:
+    python scripts/stub_google_maps.py [--port 8765]
+
+then run the API with:
+    GOOGLE_MAPS_BASE_URL=http://127.0.0.1:8765 GOOGLE_MAPS_API_KEY=stub
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PLACES = {
+    "stub-klcc": {"name": "Suria KLCC", "address": "Kuala Lumpur City Centre, Kuala Lumpur", "lat": 3.1579, "lng": 101.7123},
+    "stub-mid-valley": {"name": "Mid Valley Megamall", "address": "Mid Valley City, Kuala Lumpur", "lat": 3.1178, "lng": 101.6769},
+    "stub-kl-sentral": {"name": "KL Sentral", "address": "Brickfields, Kuala Lumpur", "lat": 3.1343, "lng": 101.6861},
+    "stub-gombak": {"name": "Gombak Terminal", "address": "Gombak, Selangor", "lat": 3.2312, "lng": 101.7244},
+}
+
+
+class StubGoogleMaps(ThreadingHTTPServer):
+    def __init__(self, port: int) -> None:
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.requests: Counter[str] = Counter()
+        self.latency_seconds = 0.0
+        self.fail_next = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def record(self, api: str) -> bool:
+        """Count a request; returns False if it should fail with a 503."""
+        with self._lock:
+            self.requests[api] += 1
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return False
+        return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubGoogleMaps
+
+    def do_GET(self) -> None:
+        parsed = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        if parsed.path == "/maps/api/geocode/json":
+            api, body = "geocode", _geocode(params.get("place_id", ""))
+        elif parsed.path == "/maps/api/place/autocomplete/json":
+            api, body = "autocomplete", _autocomplete(params.get("input", ""))
+        else:
+            self.send_error(404)
+            return
+        time.sleep(self.server.latency_seconds)
+        if not self.server.record(api):
+            self.send_error(503)
+            return
+        encoded = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def _geocode(place_id: str) -> dict:
+    place = PLACES.get(place_id)
+    if place is None:
+        return {"status": "ZERO_RESULTS", "results": []}
+    return {
+        "status": "OK",
+        "results": [
+            {
+                "place_id": place_id,
+                "formatted_address": place["address"],
+                "geometry": {"location": {"lat": place["lat"], "lng": place["lng"]}},
+            }
+        ],
+    }
+
+
+def _autocomplete(query: str) -> dict:
+    needle = query.lower().strip()
+    predictions = [
+        {
+            "place_id": place_id,
+            "description": f"{place['name']}, {place['address']}",
+            "structured_formatting": {"main_text": place["name"], "secondary_text": place["address"]},
+        }
+        for place_id, place in PLACES.items()
+        if needle and needle in f"{place['name']} {place['address']}".lower()
+    ]
+    return {"status": "OK" if predictions else "ZERO_RESULTS", "predictions": predictions}
+
+
+def start_stub(port: int = 0) -> StubGoogleMaps:
+    """Start the stub on a background thread (port 0 picks a free port)."""
+    server = StubGoogleMaps(port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stub Google Maps server.")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = StubGoogleMaps(args.port)
+    print(f"Stub Google Maps listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Simulate typing sessions against the autocomplete service and the stub server.
+
+Each session types a query one keystroke at a time (starting at 2 chars, as
+the app does) and reports how many keystrokes reached Google versus how many
+were answered by the offline station search, the exact cache, the prefix
+trie or dropped by debouncing.
+
+Usage:
+    python scripts/test_autocomplete_session.py [--keystroke-ms 80]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from collections import Counter
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+from scripts.stub_google_maps import start_stub
+
+stub = start_stub()
+os.environ["GOOGLE_MAPS_BASE_URL"] = stub.base_url
+os.environ["GOOGLE_MAPS_API_KEY"] = "stub"
+os.environ["PERSISTENT_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+
+from services.autocomplete_service import get_autocomplete_service
+
+SESSIONS = [
+    ("session-a", "mid valley megamall"),
+    ("session-b", "suria klcc"),
+    ("session-c", "mid valley city"),
+    ("session-d", "gombak terminal"),
+]
+
+
+async def type_query(session_token: str, text: str, keystroke_seconds: float) -> Counter:
+    service = get_autocomplete_service()
+    tasks = []
+    for end in range(2, len(text) + 1):
+        tasks.append(asyncio.create_task(service.autocomplete(text[:end], limit=5, session_token=session_token)))
+        await asyncio.sleep(keystroke_seconds)
+    results = await asyncio.gather(*tasks)
+    sources = Counter(result.source for result in results)
+    final = results[-1]
+    if final.source == "superseded" or not final.suggestions:
+        raise AssertionError(f"{session_token}: final keystroke got no suggestions ({final.source})")
+    sources["saved"] = final.session.upstream_calls_saved
+    return sources
+
+
+async def run(keystroke_seconds: float) -> None:
+    total_keystrokes = 0
+    for session_token, text in SESSIONS:
+        before = stub.requests["autocomplete"]
+        sources = await type_query(session_token, text, keystroke_seconds)
+        keystrokes = len(text) - 1
+        total_keystrokes += keystrokes
+        print(
+            f"[PASS] {session_token} '{text}': keystrokes={keystrokes} "
+            f"upstream={stub.requests['autocomplete'] - before} saved={sources['saved']} "
+            f"(stations={sources['stations']} cache={sources['cache']} prefix={sources['prefix']} superseded={sources['superseded']})"
+        )
+    print(f"\nTotal keystrokes={total_keystrokes} upstream calls={stub.requests['autocomplete']}")
+
+    # Two clients without a session token (e.g. behind one NAT) typing at once:
+    # neither may supersede the other's keystrokes.
+    service = get_autocomplete_service()
+    queries = ["brickfields, kuala", "gombak, selangor"]
+    results = await asyncio.gather(*(service.autocomplete(text, limit=5, session_token=None) for text in queries))
+    if any(result.source == "superseded" or not result.suggestions for result in results):
+        raise AssertionError(f"token-less requests were superseded: {[result.source for result in results]}")
+    print(f"[PASS] token-less requests answered directly: {[result.source for result in results]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Autocomplete session simulation.")
+    parser.add_argument("--keystroke-ms", type=float, default=80.0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.keystroke_ms / 1000))
+    finally:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 # server/scripts/test_google_maps_service_all_functions.py
+import asyncio
 import os
 import sys
 import traceback
@@ -29,17 +30,17 @@ api_key_set = bool(settings.GOOGLE_MAPS_API_KEY)
 # 1) _haversine_km
 check("_haversine_km", lambda: round(gms._haversine_km(3.139, 101.687, 3.139, 101.687), 9))
 
-# 2) _load_stations
-check("_load_stations", lambda: f"count={len(gms._load_stations())}")
+# 2) load_stations
+check("load_stations", lambda: f"count={len(gms.load_stations())}")
 
 # 3) _request_google_json (live)
 def test_request_google_json():
     if not api_key_set:
         raise RuntimeError("GOOGLE_MAPS_API_KEY missing")
-    payload = gms._request_google_json(
+    payload = asyncio.run(gms._request_google_json(
         gms.GEOCODE_URL,
         {"address": "KL Sentral, Kuala Lumpur", "key": settings.GOOGLE_MAPS_API_KEY},
-    )
+    ))
     return f"status={payload.get('status')} results={len(payload.get('results', []))}"
 
 
@@ -47,7 +48,7 @@ check("_request_google_json", test_request_google_json)
 
 # 4) autocomplete_locations (live)
 def test_autocomplete():
-    suggestions = gms.autocomplete_locations("KL Sentral", limit=5)
+    suggestions = asyncio.run(gms.autocomplete_locations("KL Sentral", limit=5))
     if not isinstance(suggestions, list):
         raise AssertionError("suggestions not list")
     first = suggestions[0].get("place_id") if suggestions else None
@@ -59,7 +60,7 @@ check("autocomplete_locations", test_autocomplete)
 # Use first place_id for downstream live tests
 place_id = None
 try:
-    s = gms.autocomplete_locations("KL Sentral", limit=1)
+    s = asyncio.run(gms.autocomplete_locations("KL Sentral", limit=1))
     if s:
         place_id = s[0].get("place_id")
 except Exception:
@@ -69,7 +70,7 @@ except Exception:
 def test_geocode_place_id():
     if not place_id:
         raise RuntimeError("No place_id available from autocomplete")
-    lat, lng = gms.geocode_place_id(place_id)
+    lat, lng = asyncio.run(gms.geocode_place_id(place_id))
     return f"lat={lat:.6f} lng={lng:.6f}"
 
 
@@ -86,7 +87,7 @@ check("find_nearest_station", test_find_nearest_station)
 
 # 7) resolve_nearest_station (coords path)
 def test_resolve_coords():
-    nearest = gms.resolve_nearest_station(place_id=None, latitude=3.1390, longitude=101.6869)
+    nearest = asyncio.run(gms.resolve_nearest_station(place_id=None, latitude=3.1390, longitude=101.6869))
     return f"station={nearest.get('nearest_station')} distance_km={nearest.get('distance_km')}"
 
 
@@ -96,7 +97,7 @@ check("resolve_nearest_station(coords)", test_resolve_coords)
 def test_resolve_place_id():
     if not place_id:
         raise RuntimeError("No place_id available from autocomplete")
-    nearest = gms.resolve_nearest_station(place_id=place_id, latitude=None, longitude=None)
+    nearest = asyncio.run(gms.resolve_nearest_station(place_id=place_id, latitude=None, longitude=None))
     return f"station={nearest.get('nearest_station')} distance_km={nearest.get('distance_km')}"
 
 
@@ -0,0 +1,101 @@
+"""Check the persistent Google Maps cache against the local stub server.
+
+Starts scripts/stub_google_maps.py in-process, points the service at it with
+a throwaway cache file, and verifies hits, negative caching, request
+counts, retries and concurrent geocoding. No API key or network needed.
+
+Usage:
+    python scripts/test_maps_cache.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+from scripts.stub_google_maps import start_stub
+
+stub = start_stub()
+os.environ["GOOGLE_MAPS_BASE_URL"] = stub.base_url
+os.environ["GOOGLE_MAPS_API_KEY"] = "stub"
+os.environ["PERSISTENT_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+
+from fastapi.testclient import TestClient
+
+import main
+from services import google_maps_service as gms
+
+
+def _assert(name: str, condition: bool, detail: str) -> None:
+    if not condition:
+        raise AssertionError(f"{name}: {detail}")
+    print(f"[PASS] {name}: {detail}")
+
+
+async def _timed(coro):
+    start = time.perf_counter()
+    out = await coro
+    return out, (time.perf_counter() - start) * 1000
+
+
+async def run() -> None:
+    coords, miss_ms = await _timed(gms.geocode_place_id("stub-klcc"))
+    again, hit_ms = await _timed(gms.geocode_place_id("stub-klcc"))
+    _assert("geocode cached", coords == again and stub.requests["geocode"] == 1,
+            f"miss={miss_ms:.2f}ms hit={hit_ms:.2f}ms upstream_calls={stub.requests['geocode']}")
+
+    for _ in range(2):
+        try:
+            await gms.geocode_place_id("stub-unknown")
+        except RuntimeError as exc:
+            error = str(exc)
+    _assert("geocode ZERO_RESULTS negative-cached", stub.requests["geocode"] == 2 and "ZERO_RESULTS" in error,
+            f"upstream_calls={stub.requests['geocode']}")
+
+    first = await gms.autocomplete_locations("Mid Valley", limit=5)
+    second = await gms.autocomplete_locations("  mid   VALLEY ", limit=1)
+    _assert("autocomplete cached and normalized", stub.requests["autocomplete"] == 1 and second == first[:1],
+            f"suggestions={len(first)} upstream_calls={stub.requests['autocomplete']}")
+
+    await gms.autocomplete_locations("zzz nowhere")
+    await gms.autocomplete_locations("zzz nowhere")
+    _assert("autocomplete ZERO_RESULTS negative-cached", stub.requests["autocomplete"] == 2,
+            f"upstream_calls={stub.requests['autocomplete']}")
+
+    nearest = await gms.resolve_nearest_station(place_id="stub-kl-sentral", latitude=None, longitude=None)
+    _assert("nearest station via stub", bool(nearest.get("nearest_station")),
+            f"station={nearest['nearest_station']} distance_km={nearest['distance_km']}")
+
+    stub.fail_next = 1
+    await gms.geocode_place_id("stub-gombak")
+    _assert("transient 503 retried", stub.requests["geocode"] == 5, f"upstream_calls={stub.requests['geocode']}")
+
+
+def check_concurrent_endpoint() -> None:
+    stub.latency_seconds = 0.3
+    with TestClient(main.app) as client:
+        start = time.perf_counter()
+        response = client.post(
+            "/api/v1/locations/nearest-station",
+            json={"departure_place_id": "stub-klcc", "destination_place_id": "stub-mid-valley"},
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    stub.latency_seconds = 0.0
+    _assert("nearest-station geocodes concurrently", response.status_code == 200 and elapsed_ms < 550,
+            f"status={response.status_code} elapsed={elapsed_ms:.0f}ms for two 300ms upstream calls")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+        # stub-klcc is cached from run(); clear so both geocodes go upstream.
+        gms.get_persistent_cache().delete(gms.GEOCODE_CACHE_NAMESPACE)
+        check_concurrent_endpoint()
+    finally:
+        stub.shutdown()
+    print("\nAll maps cache checks passed")
@@ -1,7 +1,9 @@
 import argparse
 import datetime
+import os
 import sys
 import time
+from zoneinfo import ZoneInfo
 
 import requests
 
@@ -32,8 +34,9 @@ def run(base_url: str, email_prefix: str) -> None:
     email = f"{email_prefix}_{int(time.time())}@example.com"
     password = "ReusableRouteTest123!"
 
-    now_utc = datetime.datetime.now(datetime.timezone.utc)
-    schedule_dt = now_utc + datetime.timedelta(minutes=5)
+    # Schedules are wall-clock times in the server's rider timezone.
+    now_local = datetime.datetime.now(ZoneInfo(os.environ.get("RIDER_TIMEZONE", "Asia/Kuala_Lumpur")))
+    schedule_dt = now_local + datetime.timedelta(minutes=5)
     day_of_week = schedule_dt.strftime("%A")
     time_from = schedule_dt.strftime("%H:%M")
 
@@ -116,7 +119,7 @@ def run(base_url: str, email_prefix: str) -> None:
 
     next_route = requests.get(
         f"{base_url}/api/v1/route/next-upcoming",
-        params={"email": email, "timestamp": int(now_utc.timestamp())},
+        params={"email": email, "timestamp": int(now_local.timestamp())},
         timeout=20,
     )
     _assert_status("route-next-upcoming", next_route, 200)
@@ -0,0 +1,130 @@
+"""Check that a logout on one instance is rejected by another.
+
+Two SessionManagers with the same secret stand in for two workers; they share
+an in-process stand-in for the `revoked_sessions` collection instead of
+Firestore. One revokes a token and the other must reject it after its next
+refresh, without restarting.
+
+Usage:
+    python scripts/test_session_revocation.py
+"""
+
+import datetime
+import os
+import sys
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_ROOT not in sys.path:
+    sys.path.insert(0, SERVER_ROOT)
+
+import core.session as session
+from core.session import SessionManager, SessionTokenError
+
+_OPERATORS = {
+    ">": lambda left, right: left > right,
+}
+
+
+class _Doc:
+    def __init__(self, doc_id: str, data: dict) -> None:
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self) -> dict:
+        return dict(self._data)
+
+
+class _DocumentRef:
+    def __init__(self, store: dict, doc_id: str) -> None:
+        self._store = store
+        self._doc_id = doc_id
+
+    def set(self, data: dict) -> None:
+        self._store[self._doc_id] = dict(data)
+
+
+class _Query:
+    def __init__(self, store: dict, filters: list) -> None:
+        self._store = store
+        self._filters = filters
+
+    def where(self, field: str, op: str, value) -> "_Query":
+        return _Query(self._store, [*self._filters, (field, _OPERATORS[op], value)])
+
+    def stream(self):
+        for doc_id, data in list(self._store.items()):
+            if all(field in data and compare(data[field], value) for field, compare, value in self._filters):
+                yield _Doc(doc_id, data)
+
+
+class _Collection(_Query):
+    def __init__(self, store: dict) -> None:
+        super().__init__(store, [])
+
+    def document(self, doc_id: str) -> _DocumentRef:
+        return _DocumentRef(self._store, doc_id)
+
+
+class SharedStore:
+    """Just enough of a Firestore client for the revoked_sessions collection."""
+
+    def __init__(self) -> None:
+        self.collections: dict[str, dict] = {}
+
+    def collection(self, name: str) -> _Collection:
+        return _Collection(self.collections.setdefault(name, {}))
+
+
+def _assert(name: str, condition: bool, detail: str) -> None:
+    if not condition:
+        raise AssertionError(f"{name}: {detail}")
+    print(f"[PASS] {name}: {detail}")
+
+
+def _rejected(manager: SessionManager, token: str) -> bool:
+    try:
+        manager.verify(token)
+    except SessionTokenError:
+        return True
+    return False
+
+
+def main() -> None:
+    store = SharedStore()
+    session.initialize_firebase = lambda: None
+    session.get_firestore_client = lambda: store
+
+    first = SessionManager(secret="shared-secret", previous_secrets=[], ttl_seconds=3600)
+    second = SessionManager(secret="shared-secret", previous_secrets=[], ttl_seconds=3600)
+    first.load_revocations()
+    second.load_revocations()
+
+    token, claims = first.issue("user-1", "user@example.com")
+    other_token, _ = first.issue("user-2", "other@example.com")
+    _assert("token verifies on both", not _rejected(first, token) and not _rejected(second, token),
+            f"jti={claims.jti}")
+
+    first.revoke(claims)
+    _assert("revoking instance rejects at once", _rejected(first, token), "verify raised SessionTokenError")
+
+    refreshed = second.refresh_revocations()
+    _assert("other instance rejects after refresh", _rejected(second, token) and refreshed == 1,
+            f"refreshed={refreshed}")
+    _assert("other tokens unaffected", not _rejected(second, other_token), "second token still verifies")
+
+    again = second.refresh_revocations()
+    _assert("refresh only re-reads recent revocations", again == 1 and _rejected(second, token),
+            f"refreshed={again} (within the clock-skew overlap)")
+
+    second.refreshed_at = datetime.datetime.now(datetime.timezone.utc) + 2 * session.REFRESH_OVERLAP
+    _assert("refresh skips revocations before the watermark", second.refresh_revocations() == 0,
+            "no documents re-read")
+
+    third = SessionManager(secret="shared-secret", previous_secrets=[], ttl_seconds=3600)
+    loaded = third.load_revocations()
+    _assert("restarted instance loads the revocation", _rejected(third, token) and loaded == 1,
+            f"loaded={loaded}")
+
+
+if __name__ == "__main__":
+    main()
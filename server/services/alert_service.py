@@ -4,11 +4,21 @@ from typing import Any
 from uuid import uuid4
 
 from firebase_admin import messaging
+from core.config import get_settings
 from core.firebase import get_firestore_client, initialize_firebase
+from core.singleflight import SingleFlight
+from services.alert_stream_service import AlertEvent, get_alert_stream_hub, make_alert_event, stream_event_id
+from services.journey_planner import route_stations
 from services.route_service import get_user_routes_with_schedules
+from services.schedule_engine import is_schedule_active, rider_week_minute
+from services.travel_time import canonical_station_code
 
 logger = logging.getLogger("services.alerts")
 
+# Coalesces concurrent get_alert polls per device token. No micro-cache:
+# alert writes invalidate the group so clients never see a deleted alert.
+_alerts_flight = SingleFlight()
+
 
 def _build_fcm_message(
     token: str,
@@ -61,39 +71,19 @@ def predict_incident(text: str, source: str) -> dict[str, Any]:
     }
 
 
-def _to_total_minutes(time_str: str) -> int:
-    try:
-        hour, minute = map(int, time_str.split(":"))
-        return hour * 60 + minute
-    except (ValueError, AttributeError):
-        return 0
+def _involved_tokens(user_involved: Any) -> list[str]:
+    if not isinstance(user_involved, list):
+        return []
+    return [
+        item["device_token"]
+        for item in user_involved
+        if isinstance(item, dict) and isinstance(item.get("device_token"), str) and item["device_token"]
+    ]
 
 
-def _is_station_in_route(
-    departing_station: str,
-    destination_station: str,
-    target_station: str,
-) -> bool:
-    try:
-        dep_num = int(str(departing_station)[2:])
-        dest_num = int(str(destination_station)[2:])
-        target_num = int(str(target_station)[2:])
-        return min(dep_num, dest_num) <= target_num <= max(dep_num, dest_num)
-    except (ValueError, TypeError, IndexError):
-        return False
-
-
-def _is_time_affected(schedule: dict[str, Any], current_time: str, current_day: str) -> bool:
-    if schedule.get("dayOfWeek") != current_day:
-        return False
-    time_from = schedule.get("timeFrom")
-    time_to = schedule.get("timeTo")
-    if not time_from or not time_to:
-        return False
-    current_minutes = _to_total_minutes(current_time)
-    from_minutes = _to_total_minutes(str(time_from))
-    to_minutes = _to_total_minutes(str(time_to))
-    return from_minutes <= current_minutes <= to_minutes
+def _stream_payload(alert_data: dict[str, Any]) -> dict[str, Any]:
+    # Other riders' device tokens never go out on a device's stream.
+    return {key: value for key, value in alert_data.items() if key != "user_involved"}
 
 
 def notify_affected_users(
@@ -111,9 +101,8 @@ def notify_affected_users(
     user_involved_map: dict[str, list[str]] = {}
     notified_count = 0
 
-    now = datetime.datetime.now(datetime.timezone.utc)
-    current_day = now.strftime("%A")
-    current_time = now.strftime("%H:%M")
+    # Schedules are rider-local; evaluate the whole sweep at one moment.
+    current_minute = rider_week_minute()
 
     for user_doc in db.collection("users").stream():
         user_data = user_doc.to_dict()
@@ -125,18 +114,15 @@ def notify_affected_users(
         notified_this_user = False
 
         for route in routes:
-            dep_station = str(route.get("departingStation", ""))
-            dest_station = str(route.get("destinationStation", ""))
+            stations_on_route = route_stations(route)
             matched_stations = [
-                station
-                for station in affected_stations
-                if _is_station_in_route(dep_station, dest_station, station)
+                station for station in affected_stations if canonical_station_code(station) in stations_on_route
             ]
             if not matched_stations:
                 continue
 
             for schedule in route.get("schedules", []):
-                if not _is_time_affected(schedule, current_time, current_day):
+                if not is_schedule_active(schedule, current_minute):
                     continue
 
                 existing = user_involved_map.setdefault(device_token, [])
@@ -161,23 +147,25 @@ def notify_affected_users(
         {"device_token": token, "stations": stations}
         for token, stations in user_involved_map.items()
     ]
-    db.collection("alerts").document(alert_id).set(
-        {
-            "alert_id": alert_id,
-            "time_from": datetime.datetime.now(datetime.timezone.utc),
-            "predicted_time": predicted_time,
-            "user_involved": user_involved,
-            "incident_details": {
-                "affected_stations": affected_stations,
-                "line": line,
-                "type": incident_type,
-                "description": description,
-            },
-            "notified_count": notified_count,
-            "created_at": datetime.datetime.now(datetime.timezone.utc),
-            "updated_at": datetime.datetime.now(datetime.timezone.utc),
-        }
-    )
+    # One timestamp: the stream feed tells new alerts from updates by created_at == updated_at.
+    now = datetime.datetime.now(datetime.timezone.utc)
+    alert_data = {
+        "alert_id": alert_id,
+        "time_from": now,
+        "predicted_time": predicted_time,
+        "user_involved": user_involved,
+        "incident_details": {
+            "affected_stations": affected_stations,
+            "line": line,
+            "type": incident_type,
+            "description": description,
+        },
+        "notified_count": notified_count,
+        "created_at": now,
+        "updated_at": now,
+    }
+    db.collection("alerts").document(alert_id).set(alert_data)
+    _alerts_flight.invalidate()
     return alert_id
 
 
@@ -220,7 +208,8 @@ def predict_end_time(alert_id: str, new_pred_end_time: str) -> dict[str, Any] |
             "updated_at": datetime.datetime.now(datetime.timezone.utc),
         }
     )
-    return alert_ref.get().to_dict()
+    _alerts_flight.invalidate()
+    return alert_ref.get().to_dict() or {}
 
 
 def get_related_alerts(device_token: str) -> list[dict[str, Any]]:
@@ -245,9 +234,114 @@ def get_related_alerts(device_token: str) -> list[dict[str, Any]]:
     return alerts
 
 
+def get_alert_changes(
+    device_token: str,
+    since: datetime.datetime,
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """Return alerts for a token updated after `since` and ids of alerts ended after it."""
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        return [], []
+
+    changed: list[dict[str, Any]] = []
+    for doc in db.collection("alerts").where("updated_at", ">", since).stream():
+        data = doc.to_dict()
+        if device_token in _involved_tokens(data.get("user_involved")):
+            data["id"] = doc.id
+            changed.append(data)
+
+    deleted_ids = [alert_id for alert_id, _ in _ended_alerts(db, device_token, since)]
+    return changed, deleted_ids
+
+
+def _ended_alerts(db: Any, device_token: str, since: datetime.datetime) -> list[tuple[str, datetime.datetime]]:
+    """Ids and deletion times of a token's alerts ended after `since`."""
+    ended: list[tuple[str, datetime.datetime]] = []
+    for doc in db.collection("alert_tombstones").where("deleted_at", ">", since).stream():
+        data = doc.to_dict() or {}
+        tokens = data.get("device_tokens", [])
+        if isinstance(tokens, list) and device_token in tokens:
+            ended.append((doc.id, data["deleted_at"]))
+    return ended
+
+
+def _alert_event(data: dict[str, Any]) -> AlertEvent:
+    event = "alert" if data.get("created_at") == data.get("updated_at") else "alert_updated"
+    return make_alert_event(stream_event_id(data["updated_at"]), event, _stream_payload(data))
+
+
+def _ended_event(alert_id: str, deleted_at: datetime.datetime) -> AlertEvent:
+    return make_alert_event(stream_event_id(deleted_at), "alert_ended", {"alert_id": alert_id})
+
+
+def start_alert_stream_feed() -> list[Any]:
+    """Feed the stream hub from Firestore listeners; returns the watches to unsubscribe.
+
+    Every worker listens, so a change made on any instance reaches the
+    connections held by all of them.
+    """
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        return []
+    hub = get_alert_stream_hub()
+    started = datetime.datetime.now(datetime.timezone.utc)
+    hub.follow_from(stream_event_id(started))
+
+    def on_alerts(_snapshots: Any, changes: Any, _read_time: Any) -> None:
+        for change in changes:
+            # Deletes arrive through the tombstone listener.
+            if change.type.name == "REMOVED":
+                continue
+            try:
+                data = change.document.to_dict() or {}
+                hub.publish_many(_involved_tokens(data.get("user_involved")), _alert_event(data))
+            except Exception as exc:
+                logger.exception("Could not stream alert %s: %s", change.document.id, exc)
+
+    def on_tombstones(_snapshots: Any, changes: Any, _read_time: Any) -> None:
+        for change in changes:
+            if change.type.name != "ADDED":
+                continue
+            try:
+                data = change.document.to_dict() or {}
+                tokens = data.get("device_tokens", [])
+                if isinstance(tokens, list):
+                    hub.publish_many(tokens, _ended_event(change.document.id, data["deleted_at"]))
+            except Exception as exc:
+                logger.exception("Could not stream end of alert %s: %s", change.document.id, exc)
+
+    return [
+        db.collection("alerts").where("updated_at", ">", started).on_snapshot(on_alerts),
+        db.collection("alert_tombstones").where("deleted_at", ">", started).on_snapshot(on_tombstones),
+    ]
+
+
+def get_alert_stream_replay(device_token: str, last_event_id: int) -> list[AlertEvent]:
+    """Rebuild a token's stream events after `last_event_id` from Firestore."""
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        return []
+
+    since = datetime.datetime.fromtimestamp(last_event_id / 1_000_000, tz=datetime.timezone.utc)
+    events: list[AlertEvent] = []
+    for doc in db.collection("alerts").where("updated_at", ">", since).stream():
+        data = doc.to_dict()
+        if device_token in _involved_tokens(data.get("user_involved")):
+            events.append(_alert_event(data))
+    events.extend(_ended_event(alert_id, deleted_at) for alert_id, deleted_at in _ended_alerts(db, device_token, since))
+    # Microsecond rounding can put an event at exactly last_event_id.
+    return sorted((event for event in events if event.event_id > last_event_id), key=lambda event: event.event_id)
+
+
 def get_alert(device_token: str) -> list[dict[str, Any]]:
-    """Alias for fetching alerts related to a device token."""
-    return get_related_alerts(device_token=device_token)
+    """Fetch alerts related to a device token, coalescing identical concurrent polls."""
+    return _alerts_flight.do(
+        device_token,
+        lambda: get_related_alerts(device_token=device_token),
+    )
 
 
 def end_alert(alert_id: str) -> dict[str, Any] | None:
@@ -262,7 +356,22 @@ def end_alert(alert_id: str) -> dict[str, Any] | None:
         return None
 
     payload = alert_doc.to_dict()
-    alert_ref.delete()
+    involved_tokens = _involved_tokens((payload or {}).get("user_involved"))
+    now = datetime.datetime.now(datetime.timezone.utc)
+    batch = db.batch()
+    batch.delete(alert_ref)
+    # Tombstone so delta-sync clients learn about the delete; one batch so neither lands alone.
+    batch.set(
+        db.collection("alert_tombstones").document(alert_id),
+        {
+            "alert_id": alert_id,
+            "device_tokens": involved_tokens,
+            "deleted_at": now,
+            "expiresAt": now + datetime.timedelta(days=get_settings().DELTA_SYNC_RETENTION_DAYS),
+        },
+    )
+    batch.commit()
+    _alerts_flight.invalidate()
     return payload
 
 
@@ -315,4 +424,5 @@ def predict_end_time_and_trigger(
         "updated_at": now,
     }
     db.collection("alerts").document(new_alert_id).set(new_alert_data)
+    _alerts_flight.invalidate()
     return new_alert_data
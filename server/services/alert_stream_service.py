@@ -0,0 +1,233 @@
+"""Alert stream hub - pushes alert changes to connected devices.
+
+Replaces polling of `/alerts/get-alert`: alert_service feeds the hub from
+Firestore listeners on `alerts` and `alert_tombstones`, so every worker and
+instance sees every alert change, and each open Server-Sent Events connection
+receives only its own token's events.
+
+Event ids are the stored `updated_at` / `deleted_at` timestamps in
+microseconds, so a `Last-Event-ID` means the same thing on every worker.
+Listener callbacks run on Firestore's threads while subscribers live on the
+event loop, so delivery is marshalled with `call_soon_threadsafe`. Every token
+keeps a short ring buffer of recent events so a reconnecting client can resume
+without a read; when the buffer does not reach back to its `Last-Event-ID`,
+the caller replays from Firestore instead.
+
+NO FastAPI imports here - HTTP-agnostic business logic.
+"""
+
+import asyncio
+import datetime
+import json
+import logging
+import sys
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any
+
+from core.metrics import get_metrics
+
+logger = logging.getLogger("services.alert_stream")
+
+REPLAY_BUFFER_SIZE = 50
+MAX_TRACKED_TOKENS = 10_000
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+@dataclass(frozen=True)
+class AlertEvent:
+    event_id: int
+    event: str
+    data: str
+
+    def encode(self) -> str:
+        """Render as an SSE frame."""
+        return f"id: {self.event_id}\nevent: {self.event}\ndata: {self.data}\n\n"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def stream_event_id(timestamp: datetime.datetime) -> int:
+    """Event id for a stored timestamp: microseconds since the epoch."""
+    return int(timestamp.timestamp() * 1_000_000)
+
+
+def make_alert_event(event_id: int, event: str, payload: dict[str, Any]) -> AlertEvent:
+    data = json.dumps(payload, default=_json_default, separators=(",", ":"))
+    return AlertEvent(event_id=event_id, event=event, data=data)
+
+
+class AlertSubscription:
+    """One open stream connection for a device token."""
+
+    def __init__(self, device_token: str, loop: asyncio.AbstractEventLoop) -> None:
+        self.device_token = device_token
+        self.loop = loop
+        self.queue: asyncio.Queue[AlertEvent | None] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.pending_bytes = 0
+        self.closed = False
+
+    def deliver(self, event: AlertEvent) -> None:
+        """Enqueue on the subscriber's loop; slow consumers are disconnected."""
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+            self.pending_bytes += len(event.data)
+        except asyncio.QueueFull:
+            # The client resumes from its last event id on reconnect.
+            self.closed = True
+            logger.warning("Disconnecting slow alert stream consumer")
+            get_metrics().inc("alert_stream_slow_disconnects_total")
+            self._drain_and_close()
+
+    def _drain_and_close(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.pending_bytes = 0
+        self.queue.put_nowait(None)
+
+    async def next_event(self, timeout: float) -> AlertEvent | None:
+        """Wait for the next event; raises TimeoutError when idle."""
+        event = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        if event is not None:
+            self.pending_bytes -= len(event.data)
+        return event
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.queue) + self.pending_bytes
+
+
+class AlertStreamHub:
+    """Per-device-token pub/sub with bounded replay buffers."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Every event after this id reached the hub; None until the feed starts.
+        self._complete_from: int | None = None
+        # Highest event id dropped with a whole token buffer.
+        self._evicted_through = 0
+        self._subscribers: dict[str, set[AlertSubscription]] = {}
+        self._buffers: OrderedDict[str, deque[AlertEvent]] = OrderedDict()
+
+        metrics = get_metrics()
+        metrics.register_gauge(
+            "alert_stream_connections",
+            self.connection_count,
+            "Open alert stream connections",
+        )
+        metrics.register_gauge(
+            "alert_stream_bytes_per_connection",
+            self.bytes_per_connection,
+            "Average approximate memory held per stream connection",
+        )
+        metrics.register_gauge(
+            "alert_stream_tracked_tokens",
+            lambda: len(self._buffers),
+            "Device tokens with a replay buffer",
+        )
+
+    def follow_from(self, event_id: int) -> None:
+        """Mark the feed as delivering every event after `event_id`."""
+        with self._lock:
+            self._complete_from = event_id
+
+    def publish(self, device_token: str, alert_event: AlertEvent) -> None:
+        """Record an event for a token and push it to its open connections."""
+        with self._lock:
+            buffer = self._buffers.get(device_token)
+            if buffer is None:
+                buffer = deque(maxlen=REPLAY_BUFFER_SIZE)
+                self._buffers[device_token] = buffer
+                if len(self._buffers) > MAX_TRACKED_TOKENS:
+                    _, evicted = self._buffers.popitem(last=False)
+                    self._evicted_through = max([self._evicted_through, *(item.event_id for item in evicted)])
+            else:
+                self._buffers.move_to_end(device_token)
+            if alert_event in buffer:
+                # Listeners re-deliver a document when a write leaves its timestamp unchanged.
+                return
+            buffer.append(alert_event)
+            subscribers = list(self._subscribers.get(device_token, ()))
+
+        get_metrics().inc("alert_stream_events_published_total")
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, alert_event)
+            except RuntimeError:
+                # Loop already closed; the connection is gone.
+                self.unsubscribe(subscription)
+
+    def publish_many(self, device_tokens: list[str], alert_event: AlertEvent) -> None:
+        for device_token in dict.fromkeys(device_tokens):
+            self.publish(device_token, alert_event)
+
+    def subscribe(
+        self,
+        device_token: str,
+        last_event_id: int | None = None,
+    ) -> tuple[AlertSubscription, list[AlertEvent] | None]:
+        """Open a subscription and return events missed since last_event_id.
+
+        The replay is None when this hub's buffer may not hold all of them;
+        the caller then replays from Firestore.
+        """
+        subscription = AlertSubscription(device_token, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(device_token, set()).add(subscription)
+            replay: list[AlertEvent] | None = []
+            if last_event_id is not None:
+                buffer = self._buffers.get(device_token, deque())
+                complete = (
+                    self._complete_from is not None
+                    and last_event_id >= max(self._complete_from, self._evicted_through)
+                    # A full buffer has dropped events older than its first one.
+                    and (len(buffer) < REPLAY_BUFFER_SIZE or last_event_id >= buffer[0].event_id)
+                )
+                replay = [item for item in buffer if item.event_id > last_event_id] if complete else None
+
+        get_metrics().inc("alert_stream_connections_opened_total")
+        if replay:
+            get_metrics().inc("alert_stream_replayed_events_total", len(replay))
+        return subscription, replay
+
+    def unsubscribe(self, subscription: AlertSubscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.device_token)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.device_token]
+        subscription.closed = True
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def bytes_per_connection(self) -> float:
+        with self._lock:
+            subscriptions = [item for group in self._subscribers.values() for item in group]
+        if not subscriptions:
+            return 0.0
+        return sum(item.memory_bytes() for item in subscriptions) / len(subscriptions)
+
+
+# Hub singleton
+_alert_stream_hub: AlertStreamHub | None = None
+_alert_stream_hub_lock = threading.Lock()
+
+
+def get_alert_stream_hub() -> AlertStreamHub:
+    """Get or create the alert stream hub singleton."""
+    global _alert_stream_hub
+    if _alert_stream_hub is None:
+        with _alert_stream_hub_lock:
+            if _alert_stream_hub is None:
+                _alert_stream_hub = AlertStreamHub()
+    return _alert_stream_hub
@@ -0,0 +1,220 @@
+"""Keystroke-aware autocomplete on top of Google Places.
+
+The app calls /locations/autocomplete on every keystroke. Before a query
+reaches Google it goes through, in order:
+
+0. the offline station search (station_search), which answers station
+   names, codes and aliases without any network call;
+1. the exact-query persistent cache (see google_maps_service);
+2. a prefix trie: when an earlier, shorter query returned fewer than
+   Google's maximum predictions, that list was exhaustive, so a longer query
+   extending it can be answered by filtering that list locally;
+3. a per-session debounce: a query that is superseded by a newer keystroke
+   from the same session within the debounce window is dropped without an
+   upstream call.
+
+Sessions are keyed by the app's Places session token, which is also
+forwarded to Google so a typing session is billed once, and per-session
+counters report how many upstream calls were saved. Requests without a token
+cannot be told apart (clients behind one NAT share an IP), so they are never
+debounced or superseded.
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from core.config import get_settings
+from core.metrics import get_metrics
+from services.google_maps_service import (
+    GOOGLE_AUTOCOMPLETE_MAX_PREDICTIONS,
+    autocomplete_locations,
+    get_cached_autocomplete,
+    normalize_autocomplete_query,
+)
+from services.station_search import get_station_search_index, to_suggestion
+
+MAX_TRACKED_SESSIONS = 10_000
+# Google ends a Places session after a few minutes of inactivity.
+SESSION_IDLE_SECONDS = 180
+
+_WORD_SPLIT = re.compile(r"[^0-9a-z]+")
+
+SOURCE_STATIONS = "stations"
+SOURCE_CACHE = "cache"
+SOURCE_PREFIX = "prefix"
+SOURCE_GOOGLE = "google"
+SOURCE_SUPERSEDED = "superseded"
+
+
+def _words(text: str) -> list[str]:
+    return [word for word in _WORD_SPLIT.split(text.lower()) if word]
+
+
+def _matches(query_words: list[str], suggestion: dict[str, Any]) -> bool:
+    """Every query word must prefix some word of the suggestion."""
+    words = _words(f"{suggestion.get('main_text', '')} {suggestion.get('description', '')}")
+    return all(any(word.startswith(token) for word in words) for token in query_words)
+
+
+@dataclass
+class _TrieNode:
+    children: dict[str, "_TrieNode"] = field(default_factory=dict)
+    suggestions: list[dict[str, Any]] | None = None
+    expires_at: float = 0.0
+
+
+class PrefixTrieCache:
+    """Trie of normalized queries whose Google results were exhaustive."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._root = _TrieNode()
+        self._entries: OrderedDict[str, _TrieNode] = OrderedDict()
+
+    def insert(self, query: str, suggestions: list[dict[str, Any]]) -> None:
+        node = self._root
+        for char in query:
+            node = node.children.setdefault(char, _TrieNode())
+        node.suggestions = suggestions
+        node.expires_at = time.monotonic() + self.ttl_seconds
+        self._entries[query] = node
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            # Nodes stay as trie structure; only their payload is dropped.
+            evicted.suggestions = None
+
+    def lookup(self, query: str) -> list[dict[str, Any]] | None:
+        """Answer `query` from the longest cached proper prefix, if any."""
+        now = time.monotonic()
+        node = self._root
+        best: tuple[str, _TrieNode] | None = None
+        for position, char in enumerate(query):
+            node = node.children.get(char)
+            if node is None:
+                break
+            if position + 1 < len(query) and node.suggestions is not None and node.expires_at > now:
+                best = (query[: position + 1], node)
+        if best is None:
+            return None
+        prefix, node = best
+        self._entries.move_to_end(prefix)
+        query_words = _words(query)
+        return [item for item in node.suggestions or [] if _matches(query_words, item)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@dataclass
+class SessionStats:
+    requests: int = 0
+    upstream_calls: int = 0
+    sequence: int = 0
+    last_seen: float = 0.0
+
+    @property
+    def upstream_calls_saved(self) -> int:
+        return self.requests - self.upstream_calls
+
+
+@dataclass
+class AutocompleteResult:
+    suggestions: list[dict[str, Any]]
+    source: str
+    # None for requests without a session token.
+    session: SessionStats | None
+
+
+class AutocompleteService:
+    def __init__(self, debounce_seconds: float, prefix_cache: PrefixTrieCache) -> None:
+        self.debounce_seconds = debounce_seconds
+        self.prefix_cache = prefix_cache
+        self._sessions: OrderedDict[str, SessionStats] = OrderedDict()
+        metrics = get_metrics()
+        metrics.register_gauge(
+            "autocomplete_prefix_cache_entries", lambda: len(self.prefix_cache), "Queries held in the prefix trie"
+        )
+        metrics.register_gauge(
+            "autocomplete_sessions_tracked", lambda: len(self._sessions), "Autocomplete sessions being tracked"
+        )
+
+    async def autocomplete(self, query: str, limit: int, session_token: str | None) -> AutocompleteResult:
+        normalized = normalize_autocomplete_query(query)
+        session = self._session(session_token) if session_token else None
+        if session is not None:
+            session.requests += 1
+            session.sequence += 1
+            sequence = session.sequence
+
+        stations = get_station_search_index().search(normalized, limit=limit)
+        if stations:
+            return self._saved([to_suggestion(station) for station, _ in stations], SOURCE_STATIONS, session)
+
+        cached = await get_cached_autocomplete(normalized)
+        if cached is not None:
+            return self._saved(cached[:limit], SOURCE_CACHE, session)
+
+        from_prefix = self.prefix_cache.lookup(normalized)
+        if from_prefix:
+            return self._saved(from_prefix[:limit], SOURCE_PREFIX, session)
+
+        if session is not None and self.debounce_seconds > 0:
+            await asyncio.sleep(self.debounce_seconds)
+            if session.sequence != sequence:
+                # A newer keystroke from this session arrived; it will be answered instead.
+                return self._saved([], SOURCE_SUPERSEDED, session)
+
+        if session is not None:
+            session.upstream_calls += 1
+        suggestions = await autocomplete_locations(
+            normalized,
+            limit=GOOGLE_AUTOCOMPLETE_MAX_PREDICTIONS,
+            session_token=session_token,
+            cache_checked=True,
+        )
+        if len(suggestions) < GOOGLE_AUTOCOMPLETE_MAX_PREDICTIONS:
+            self.prefix_cache.insert(normalized, suggestions)
+        return AutocompleteResult(suggestions=suggestions[:limit], source=SOURCE_GOOGLE, session=session)
+
+    def _saved(self, suggestions: list[dict[str, Any]], source: str, session: SessionStats | None) -> AutocompleteResult:
+        get_metrics().inc(
+            f'autocomplete_upstream_calls_saved_total{{source="{source}"}}',
+            help_text="Autocomplete requests answered without calling Google",
+        )
+        return AutocompleteResult(suggestions=suggestions, source=source, session=session)
+
+    def _session(self, key: str) -> SessionStats:
+        now = time.monotonic()
+        session = self._sessions.pop(key, None)
+        if session is None or now - session.last_seen > SESSION_IDLE_SECONDS:
+            session = SessionStats()
+        session.last_seen = now
+        self._sessions[key] = session
+        while len(self._sessions) > MAX_TRACKED_SESSIONS:
+            self._sessions.popitem(last=False)
+        return session
+
+
+# Singleton service (state lives on the event loop; no locking needed)
+_autocomplete_service: AutocompleteService | None = None
+
+
+def get_autocomplete_service() -> AutocompleteService:
+    global _autocomplete_service
+
+    if _autocomplete_service is None:
+        settings = get_settings()
+        _autocomplete_service = AutocompleteService(
+            debounce_seconds=settings.AUTOCOMPLETE_DEBOUNCE_MS / 1000,
+            prefix_cache=PrefixTrieCache(
+                ttl_seconds=settings.AUTOCOMPLETE_CACHE_TTL_SECONDS,
+                max_entries=settings.AUTOCOMPLETE_PREFIX_CACHE_MAX_ENTRIES,
+            ),
+        )
+    return _autocomplete_service
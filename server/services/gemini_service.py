@@ -1,14 +1,66 @@
+import asyncio
+import logging
+import random
+from functools import lru_cache
 from typing import Any
 
-from core.gemini import get_gemini_client, GeminiClient
+from pydantic import ValidationError
+
+from core.config import get_settings
+from core.gemini import get_gemini_client, GeminiAPIError, GeminiClient, GeminiParseError
+from core.metrics import get_metrics
 from api.schemas.gemini import (
     IncidentExtractionRequest,
     IncidentExtractionResponse,
     IncidentDetails,
     BatchIncidentExtractionRequest,
     BatchIncidentExtractionResponse,
+    BatchItemError,
+)
+from services.travel_time import get_travel_time_matrix
+
+logger = logging.getLogger("services.gemini")
+settings = get_settings()
+
+# Bump when the extraction prompt, instructions or schema change, so cached answers are not reused.
+EXTRACTION_PROMPT_VERSION = "incident-extraction-v1"
+
+# Retry backoff for transient Gemini failures (before jitter).
+RETRY_BASE_DELAY_SECONDS = 0.5
+RETRY_MAX_DELAY_SECONDS = 8.0
+
+EXTRACTION_SYSTEM_INSTRUCTION = (
+    "You are an incident detection system for Klang Valley rail lines in Malaysia. "
+    "Read one social media post and decide whether it reports a current service incident "
+    "(delays, breakdowns, signal faults, overcrowding, maintenance closures).\n\n"
+    "Rules:\n"
+    "1. Use only what the post states or strongly implies.\n"
+    "2. Complaints, jokes, questions and resolved or historical incidents are not incidents: "
+    "set is_incident to false and incident_type to 'none'.\n"
+    "3. Give the line as its code (e.g. 'KJ', 'AG', 'SP') and the station by its official name.\n"
+    "4. confidence_score reflects how clearly the post describes an ongoing incident.\n"
+    "Respond only with the JSON object."
 )
 
+EXTRACTION_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_incident": {"type": "boolean"},
+        "line": {"type": "string", "nullable": True},
+        "station": {"type": "string", "nullable": True},
+        "incident_type": {
+            "type": "string",
+            "enum": ["delay", "breakdown", "overcrowding", "signal_fault", "maintenance", "other", "none"],
+        },
+        "severity": {"type": "string", "enum": ["low", "medium", "high", "critical"]},
+        "description": {"type": "string", "nullable": True},
+        "estimated_duration_minutes": {"type": "integer", "nullable": True},
+        "confidence_score": {"type": "number"},
+        "explanation": {"type": "string"},
+    },
+    "required": ["is_incident", "incident_type", "severity", "confidence_score"],
+}
+
 
 class GeminiService:
     """Service for Gemini LLM operations.
@@ -27,6 +79,8 @@ class GeminiService:
             client: GeminiClient instance. If None, uses singleton.
         """
         self.client = client or get_gemini_client()
+        # Shared by every batch on this service, so concurrent requests share the limit.
+        self._semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
     
     async def extract_incident(
         self, 
@@ -34,6 +88,10 @@ class GeminiService:
     ) -> IncidentExtractionResponse:
         """Extract incident information from social media text.
         
+        Each attempt is bounded by GEMINI_TIMEOUT_SECONDS; API errors and
+        timeouts are retried up to GEMINI_MAX_RETRIES times with jittered
+        exponential backoff.
+        
         Args:
             request: Contains text and source metadata
             
@@ -41,17 +99,19 @@ class GeminiService:
             Structured incident extraction result
             
         Raises:
-            GeminiAPIError: If Gemini API fails
+            GeminiAPIError: If Gemini API fails on every attempt
             GeminiParseError: If response cannot be parsed
         """
-        # TODO: Implement incident extraction
-        # 1. Build prompt with examples and instructions
-        # 2. Define output schema for structured response
-        # 3. Call GeminiClient.generate_structured()
-        # 4. Validate response against IncidentDetails
-        # 5. Return IncidentExtractionResponse
-        
-        raise NotImplementedError("Incident extraction logic pending")
+        prompt = self._build_extraction_prompt(request.text, request.source)
+        # Keyed on the post alone: reposts of the same text on another platform reuse the answer.
+        raw_response = await self._generate_with_retries(prompt, cache_input=request.text)
+        incident = self._parse_incident_response(raw_response)
+        is_incident = bool(raw_response.get("is_incident")) and incident.incident_type != "none"
+        return IncidentExtractionResponse(
+            is_incident=is_incident,
+            incident=incident if is_incident else None,
+            raw_explanation=raw_response.get("explanation"),
+        )
     
     async def extract_incidents_batch(
         self,
@@ -66,16 +126,75 @@ class GeminiService:
             Batch extraction results
             
         Note:
-            Processes sequentially to respect rate limits.
-            Consider asyncio.gather() with semaphore for parallel.
+            Items run concurrently, at most GEMINI_MAX_CONCURRENCY Gemini
+            calls at a time across all batches. A failed item does not fail
+            the batch: its result is a non-incident and it is listed in
+            `errors`.
         """
-        # TODO: Implement batch processing
-        # 1. Validate batch size (respect rate limits)
-        # 2. Process each text with extract_incident()
-        # 3. Handle partial failures gracefully
-        # 4. Return aggregated results
+        outcomes = await asyncio.gather(
+            *(self.extract_incident(item) for item in request.texts),
+            return_exceptions=True,
+        )
         
-        raise NotImplementedError("Batch extraction logic pending")
+        results: list[IncidentExtractionResponse] = []
+        errors: list[BatchItemError] = []
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, IncidentExtractionResponse):
+                results.append(outcome)
+                continue
+            if not isinstance(outcome, Exception):
+                raise outcome
+            message = str(outcome) or type(outcome).__name__
+            logger.warning("Incident extraction failed for batch item %d: %s", index, message)
+            results.append(IncidentExtractionResponse(is_incident=False, raw_explanation=f"Extraction failed: {message}"))
+            errors.append(BatchItemError(index=index, error=message))
+        
+        return BatchIncidentExtractionResponse(
+            results=results,
+            processed_count=len(results) - len(errors),
+            failed_count=len(errors),
+            errors=errors,
+        )
+    
+    async def _generate_with_retries(self, prompt: str, cache_input: str) -> dict[str, Any]:
+        """Call Gemini under the concurrency limit, retrying transient failures.
+        
+        Args:
+            prompt: Formatted user prompt
+            cache_input: Text the answer is cached under (see GeminiClient.generate_structured)
+            
+        Returns:
+            Parsed JSON response
+            
+        Raises:
+            GeminiAPIError: If every attempt fails or times out
+            GeminiParseError: If response cannot be parsed (not retried)
+        """
+        last_error: GeminiAPIError | None = None
+        for attempt in range(settings.GEMINI_MAX_RETRIES + 1):
+            if attempt:
+                get_metrics().inc("gemini_retries_total", help_text="Gemini calls retried after an error or timeout")
+                # Full jitter: items that failed together spread their retries out.
+                backoff = min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1))
+                await asyncio.sleep(random.uniform(0, backoff))
+            try:
+                async with self._semaphore:
+                    return await asyncio.wait_for(
+                        self.client.generate_structured(
+                            prompt=prompt,
+                            output_schema=EXTRACTION_OUTPUT_SCHEMA,
+                            system_instruction=EXTRACTION_SYSTEM_INSTRUCTION,
+                            prompt_version=EXTRACTION_PROMPT_VERSION,
+                            cache_input=cache_input,
+                            validate=self._parse_incident_response,
+                        ),
+                        timeout=settings.GEMINI_TIMEOUT_SECONDS,
+                    )
+            except asyncio.TimeoutError:
+                last_error = GeminiAPIError(f"Gemini call timed out after {settings.GEMINI_TIMEOUT_SECONDS}s")
+            except GeminiAPIError as exc:
+                last_error = exc
+        raise last_error
     
     def _build_extraction_prompt(self, text: str, source: str) -> str:
         """Build prompt for incident extraction.
@@ -87,13 +206,13 @@ class GeminiService:
         Returns:
             Formatted prompt for Gemini
         """
-        # TODO: Build comprehensive prompt with:
-        # - System instructions
-        # - Few-shot examples
-        # - Output format specification
-        # - Constraints and edge cases
-        
-        raise NotImplementedError("Prompt building logic pending")
+        return (
+            f"Source: {source}\n"
+            f"Post:\n\"\"\"\n{text.strip()}\n\"\"\"\n\n"
+            "Decide whether this post reports a current rail service incident. "
+            f"Known lines: {', '.join(sorted(set(_line_codes().values())))}. "
+            "Return the result strictly in the JSON format defined."
+        )
     
     def _parse_incident_response(self, raw_response: dict[str, Any]) -> IncidentDetails:
         """Parse and validate Gemini response.
@@ -107,13 +226,49 @@ class GeminiService:
         Raises:
             GeminiParseError: If response is invalid
         """
-        # TODO: Implement parsing logic
-        # 1. Validate required fields
-        # 2. Normalize line codes (e.g., 'Kelana Jaya' → 'KJ')
-        # 3. Validate station names against known list
-        # 4. Calculate confidence score
+        if not isinstance(raw_response, dict):
+            raise GeminiParseError("Gemini response is not a JSON object")
+        try:
+            incident = IncidentDetails.model_validate(
+                {key: raw_response.get(key) for key in IncidentDetails.model_fields if raw_response.get(key) is not None}
+            )
+        except ValidationError as exc:
+            raise GeminiParseError(f"Gemini response does not match IncidentDetails: {exc}") from exc
         
-        raise NotImplementedError("Response parsing logic pending")
+        line = incident.line
+        if line:
+            lowered = line.strip().lower()
+            line = next((code for name, code in _line_codes().items() if lowered in (name, code.lower())), line.strip())
+        station = incident.station
+        if station:
+            station = _station_names().get(station.strip().lower(), station.strip())
+        return incident.model_copy(update={"line": line, "station": station})
+
+
+@lru_cache(maxsize=1)
+def _line_codes() -> dict[str, str]:
+    """Lowercased line names ('kelana jaya', 'lrt kelana jaya line') to code prefixes ('KJ')."""
+    codes: dict[str, str] = {}
+    for station in get_travel_time_matrix().stations:
+        name = str(station.get("line", "")).strip().lower()
+        prefix = "".join(char for char in str(station.get("code", "")) if char.isalpha())
+        if name and prefix:
+            codes[name] = prefix
+            short = name.removeprefix("lrt ").removeprefix("mrt ").removeprefix("ktm ").removesuffix(" line")
+            codes.setdefault(short, prefix)
+    return codes
+
+
+@lru_cache(maxsize=1)
+def _station_names() -> dict[str, str]:
+    """Lowercased station names and codes to official station names."""
+    names: dict[str, str] = {}
+    for station in get_travel_time_matrix().stations:
+        name = str(station.get("name", "")).strip()
+        if name:
+            names[name.lower()] = name
+            names[str(station.get("code", "")).lower()] = name
+    return names
 
 
 # Service singleton
@@ -2,13 +2,27 @@ import json
 import math
 from functools import lru_cache
 from typing import Any
-from urllib.parse import urlencode
-from urllib.request import urlopen
 
 from core.config import get_settings
+from core.http_client import get_json
+from core.metrics import get_metrics
+from core.persistent_cache import get_persistent_cache
+from core.singleflight import AsyncSingleFlight
+from services.station_index import StationIndex
+from services.station_search import STATION_PLACE_ID_PREFIX
 
-AUTOCOMPLETE_URL = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
-GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+AUTOCOMPLETE_URL = f"{get_settings().GOOGLE_MAPS_BASE_URL}/maps/api/place/autocomplete/json"
+GEOCODE_URL = f"{get_settings().GOOGLE_MAPS_BASE_URL}/maps/api/geocode/json"
+
+# Places Autocomplete never returns more predictions than this.
+GOOGLE_AUTOCOMPLETE_MAX_PREDICTIONS = 5
+
+GEOCODE_CACHE_NAMESPACE = "maps_geocode"
+AUTOCOMPLETE_CACHE_NAMESPACE = "maps_autocomplete"
+
+# Station lookups for the same place (e.g. a landmark during an incident) are
+# coalesced and briefly cached so a burst costs a single geocode.
+_station_flight = AsyncSingleFlight(ttl_seconds=get_settings().MICROCACHE_TTL_SECONDS)
 
 
 def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -27,7 +41,7 @@ def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 
 
 @lru_cache(maxsize=1)
-def _load_stations() -> list[dict[str, Any]]:
+def load_stations() -> list[dict[str, Any]]:
     """Load station dataset once per process for fast nearest-station lookups."""
     settings = get_settings()
     with open(settings.STATIONS_DATA_PATH, "r", encoding="utf-8") as station_file:
@@ -37,36 +51,71 @@ def _load_stations() -> list[dict[str, Any]]:
     return stations
 
 
-def _request_google_json(base_url: str, params: dict[str, str]) -> dict[str, Any]:
-    """Make a simple GET request to Google Maps APIs and return parsed JSON."""
-    query_string = urlencode(params)
-    request_url = f"{base_url}?{query_string}"
-    with urlopen(request_url, timeout=15) as response:
-        return json.loads(response.read().decode("utf-8"))
+@lru_cache(maxsize=1)
+def _get_station_index() -> StationIndex:
+    """Build the spatial index once, alongside the dataset load."""
+    return StationIndex(load_stations())
+
+
+async def _request_google_json(base_url: str, params: dict[str, str]) -> dict[str, Any]:
+    """GET a Google Maps API over the shared pooled client and return parsed JSON."""
+    api = base_url.rsplit("/", 2)[-2]
+    get_metrics().inc(
+        f'google_maps_requests_total{{api="{api}"}}',
+        help_text="Requests sent to Google Maps APIs",
+    )
+    return await get_json(base_url, params, metric_label=f"google_maps_{api}")
+
+
+def normalize_autocomplete_query(query: str) -> str:
+    return " ".join(query.lower().split())
 
 
-def autocomplete_locations(query: str, limit: int = 5) -> list[dict[str, Any]]:
-    """Fetch address/place suggestions from Google Places Autocomplete."""
+async def get_cached_autocomplete(query: str) -> list[dict[str, Any]] | None:
+    """Return cached suggestions for exactly this query, or None."""
+    found, cached = await get_persistent_cache().aget(AUTOCOMPLETE_CACHE_NAMESPACE, normalize_autocomplete_query(query))
+    return cached if found else None
+
+
+async def autocomplete_locations(
+    query: str,
+    limit: int = 5,
+    session_token: str | None = None,
+    cache_checked: bool = False,
+) -> list[dict[str, Any]]:
+    """Fetch address/place suggestions from Google Places Autocomplete.
+
+    session_token is forwarded as Google's `sessiontoken` so the keystrokes
+    of one typing session are billed as a session. Pass cache_checked=True
+    when get_cached_autocomplete has already missed for this query, so the
+    lookup (and its miss metric) is not repeated.
+    """
     settings = get_settings()
     if not settings.GOOGLE_MAPS_API_KEY:
         raise RuntimeError("GOOGLE_MAPS_API_KEY is not configured")
 
-    payload = _request_google_json(
-        AUTOCOMPLETE_URL,
-        {
-            "input": query,
-            "key": settings.GOOGLE_MAPS_API_KEY,
-            "components": "country:my",
-            "language": "en",
-        },
-    )
+    if not cache_checked:
+        cached = await get_cached_autocomplete(query)
+        if cached is not None:
+            return cached[:limit]
+
+    params = {
+        "input": query,
+        "key": settings.GOOGLE_MAPS_API_KEY,
+        "components": "country:my",
+        "language": "en",
+    }
+    if session_token:
+        params["sessiontoken"] = session_token
+    payload = await _request_google_json(AUTOCOMPLETE_URL, params)
 
     status = payload.get("status")
     if status not in {"OK", "ZERO_RESULTS"}:
         raise RuntimeError(f"Autocomplete request failed with status: {status}")
 
     suggestions: list[dict[str, Any]] = []
-    for prediction in payload.get("predictions", [])[:limit]:
+    # Cache every prediction Google returned; `limit` is applied on the way out.
+    for prediction in payload.get("predictions", []):
         structured = prediction.get("structured_formatting", {})
         suggestions.append(
             {
@@ -76,16 +125,36 @@ def autocomplete_locations(query: str, limit: int = 5) -> list[dict[str, Any]]:
                 "description": prediction.get("description", ""),
             }
         )
-    return suggestions
 
+    ttl = settings.AUTOCOMPLETE_CACHE_TTL_SECONDS if suggestions else settings.MAPS_NEGATIVE_CACHE_TTL_SECONDS
+    await get_persistent_cache().aset(AUTOCOMPLETE_CACHE_NAMESPACE, normalize_autocomplete_query(query), suggestions, ttl)
+    return suggestions[:limit]
+
+
+def _station_coordinates(code: str) -> tuple[float, float]:
+    for station in load_stations():
+        if station.get("code") == code:
+            return float(station["latitude"]), float(station["longitude"])
+    raise ValueError(f"Unknown station code: {code}")
+
+
+async def geocode_place_id(place_id: str) -> tuple[float, float]:
+    """Resolve a Google place_id (or a local station suggestion id) to latitude/longitude."""
+    if place_id.startswith(STATION_PLACE_ID_PREFIX):
+        return _station_coordinates(place_id.removeprefix(STATION_PLACE_ID_PREFIX))
 
-def geocode_place_id(place_id: str) -> tuple[float, float]:
-    """Resolve a Google place_id to latitude/longitude."""
     settings = get_settings()
     if not settings.GOOGLE_MAPS_API_KEY:
         raise RuntimeError("GOOGLE_MAPS_API_KEY is not configured")
 
-    payload = _request_google_json(
+    cache = get_persistent_cache()
+    found, cached = await cache.aget(GEOCODE_CACHE_NAMESPACE, place_id)
+    if found:
+        if cached is None:
+            raise RuntimeError("Geocode request failed with status: ZERO_RESULTS")
+        return float(cached[0]), float(cached[1])
+
+    payload = await _request_google_json(
         GEOCODE_URL,
         {
             "place_id": place_id,
@@ -93,32 +162,24 @@ def geocode_place_id(place_id: str) -> tuple[float, float]:
         },
     )
     status = payload.get("status")
+    if status == "ZERO_RESULTS":
+        await cache.aset(GEOCODE_CACHE_NAMESPACE, place_id, None, settings.MAPS_NEGATIVE_CACHE_TTL_SECONDS)
     if status != "OK":
         raise RuntimeError(f"Geocode request failed with status: {status}")
 
     result = payload["results"][0]
     location = result["geometry"]["location"]
-    return float(location["lat"]), float(location["lng"])
+    coordinates = float(location["lat"]), float(location["lng"])
+    await cache.aset(GEOCODE_CACHE_NAMESPACE, place_id, list(coordinates), settings.GEOCODE_CACHE_TTL_SECONDS)
+    return coordinates
 
 
 def find_nearest_station(latitude: float, longitude: float) -> dict[str, Any]:
     """Compute nearest station from local stations dataset using haversine distance."""
-    stations = _load_stations()
-    if not stations:
+    nearest = _get_station_index().nearest(latitude, longitude, k=1)
+    if not nearest:
         raise RuntimeError("Stations dataset is empty")
-
-    best_station: dict[str, Any] | None = None
-    best_distance = float("inf")
-    for station in stations:
-        station_lat = float(station["latitude"])
-        station_lng = float(station["longitude"])
-        distance = _haversine_km(latitude, longitude, station_lat, station_lng)
-        if distance < best_distance:
-            best_distance = distance
-            best_station = station
-
-    if best_station is None:
-        raise RuntimeError("Unable to compute nearest station")
+    best_station, best_distance = nearest[0]
 
     return {
         "nearest_station": best_station.get("name", "Unknown"),
@@ -131,14 +192,60 @@ def find_nearest_station(latitude: float, longitude: float) -> dict[str, Any]:
     }
 
 
-def resolve_nearest_station(
+def find_stations_nearby(
+    latitude: float,
+    longitude: float,
+    k: int = 5,
+    radius_km: float | None = None,
+    line: str | None = None,
+) -> list[dict[str, Any]]:
+    """Return up to k closest stations, optionally within radius_km and/or on one line."""
+    index = _get_station_index()
+    if radius_km is None:
+        hits = index.nearest(latitude, longitude, k=k, line=line)
+    else:
+        hits = index.within_radius(latitude, longitude, radius_km, line=line)[:k]
+    return [
+        {
+            "code": station.get("code"),
+            "name": station.get("name", "Unknown"),
+            "line": station.get("line"),
+            "latitude": float(station["latitude"]),
+            "longitude": float(station["longitude"]),
+            "distance_km": round(distance, 3),
+        }
+        for station, distance in hits
+    ]
+
+
+def find_nearest_stations_batch(
+    latitudes: list[float],
+    longitudes: list[float],
+    line: str | None = None,
+) -> dict[str, list[Any]]:
+    """Nearest station for many coordinates at once (vectorized).
+
+    Returns parallel lists: station_indices (position in the stations
+    dataset), station_codes and distances_km; None where no station matched.
+    """
+    index = _get_station_index()
+    positions, distances = index.nearest_batch(latitudes, longitudes, line=line)
+    matched = positions >= 0
+    return {
+        "station_indices": [int(p) if ok else None for p, ok in zip(positions, matched)],
+        "station_codes": [index.stations[p].get("code") if ok else None for p, ok in zip(positions, matched)],
+        "distances_km": [round(float(d), 3) if ok else None for d, ok in zip(distances, matched)],
+    }
+
+
+async def resolve_nearest_station(
     place_id: str | None,
     latitude: float | None,
     longitude: float | None,
 ) -> dict[str, Any]:
     """Resolve location input (place_id or lat/lng) and return nearest station payload."""
     if place_id:
-        latitude, longitude = geocode_place_id(place_id)
+        latitude, longitude = await geocode_place_id(place_id)
 
     if latitude is None or longitude is None:
         raise ValueError("Missing coordinates for nearest station lookup")
@@ -146,9 +253,13 @@ def resolve_nearest_station(
     return find_nearest_station(latitude=latitude, longitude=longitude)
 
 
-def resolve_nearest_station_by_place_id(place_id: str) -> dict[str, Any]:
+async def resolve_nearest_station_by_place_id(place_id: str) -> dict[str, Any]:
     """Resolve nearest station from a required Google place_id."""
     if not place_id:
         raise ValueError("place_id is required for nearest station lookup")
-    latitude, longitude = geocode_place_id(place_id)
-    return find_nearest_station(latitude=latitude, longitude=longitude)
+
+    async def fetch() -> dict[str, Any]:
+        latitude, longitude = await geocode_place_id(place_id)
+        return find_nearest_station(latitude=latitude, longitude=longitude)
+
+    return await _station_flight.do(place_id, fetch)
@@ -0,0 +1,123 @@
+"""Multi-line journey planning over the station travel-time graph.
+
+The graph, interchanges and all-pairs fastest paths live in travel_time's
+TravelTimeMatrix; planning a journey is walking the stored predecessors and
+splitting the stops into per-line legs. Routes store the resulting station
+sequence so alert matching is a set lookup instead of a code-range check.
+"""
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from services.travel_time import canonical_station_code, get_travel_time_matrix, parse_station_code
+
+
+@dataclass(frozen=True)
+class JourneyLeg:
+    line: str | None
+    stations: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Journey:
+    stations: tuple[str, ...]
+    legs: tuple[JourneyLeg, ...]
+    minutes: float
+
+    @property
+    def interchanges(self) -> int:
+        return max(0, len(self.legs) - 1)
+
+
+@lru_cache(maxsize=4096)
+def _plan(departing_station: str, destination_station: str) -> Journey | None:
+    matrix = get_travel_time_matrix()
+    start = matrix.index_of(departing_station)
+    end = matrix.index_of(destination_station)
+    if start is None or end is None:
+        return None
+    positions = matrix.path(start, end)
+    if positions is None:
+        return None
+
+    legs: list[JourneyLeg] = []
+    current_line = matrix.stations[positions[0]].get("line")
+    current: list[str] = []
+    for position in positions:
+        line = matrix.stations[position].get("line")
+        if line != current_line:
+            # Crossing a transfer edge: the rider changes lines here.
+            legs.append(JourneyLeg(line=current_line, stations=tuple(current)))
+            current_line, current = line, []
+        current.append(matrix.codes[position])
+    legs.append(JourneyLeg(line=current_line, stations=tuple(current)))
+
+    return Journey(
+        stations=tuple(matrix.codes[position] for position in positions),
+        legs=tuple(leg for leg in legs if len(leg.stations) > 1) or tuple(legs),
+        minutes=matrix.minutes(departing_station, destination_station) or 0.0,
+    )
+
+
+def plan_journey(departing_station: str, destination_station: str) -> Journey | None:
+    """Fastest journey between two station codes, or None if either is unknown."""
+    return _plan(departing_station.strip().upper(), destination_station.strip().upper())
+
+
+def _legacy_sequence(departing_station: str, destination_station: str) -> list[str] | None:
+    """Same-line code range for stations outside the dataset (e.g. AG7 -> AG12)."""
+    departing, destination = parse_station_code(departing_station), parse_station_code(destination_station)
+    if departing is None or destination is None:
+        return None
+    departing_line, departing_num = departing
+    destination_line, destination_num = destination
+    if departing_line != destination_line:
+        return None
+    step = 1 if destination_num >= departing_num else -1
+    width = len(departing_station) - len(departing_line)
+    return [
+        f"{departing_line}{number:0{width}d}"
+        for number in range(departing_num, destination_num + step, step)
+    ]
+
+
+def route_station_sequence(departing_station: str, destination_station: str) -> list[str]:
+    """Stations a route passes through, ends included, for storing on the route."""
+    journey = plan_journey(departing_station, destination_station)
+    if journey is not None:
+        return list(journey.stations)
+    departing, destination = departing_station.strip().upper(), destination_station.strip().upper()
+    return _legacy_sequence(departing, destination) or [departing, destination]
+
+
+def route_stations(route: dict[str, Any]) -> frozenset[str]:
+    """Canonical station codes of a stored route; routes saved before sequences are planned on read.
+
+    Codes are zero-padded like the dataset, so a route saved with "KJ1" matches
+    alerts and stations written "KJ01".
+    """
+    sequence = route.get("stationSequence")
+    if isinstance(sequence, list) and sequence:
+        return frozenset(canonical_station_code(str(code)) for code in sequence)
+    departing = str(route.get("departingStation", "")).strip()
+    destination = str(route.get("destinationStation", "")).strip()
+    if not departing or not destination:
+        return frozenset()
+    return _cached_route_stations(canonical_station_code(departing), canonical_station_code(destination))
+
+
+@lru_cache(maxsize=4096)
+def _cached_route_stations(departing_station: str, destination_station: str) -> frozenset[str]:
+    sequence = route_station_sequence(departing_station, destination_station)
+    return frozenset(canonical_station_code(code) for code in sequence)
+
+
+def journey_to_dict(journey: Journey) -> dict[str, Any]:
+    return {
+        "stations": list(journey.stations),
+        "legs": [{"line": leg.line, "stations": list(leg.stations)} for leg in journey.legs],
+        "minutes": math.ceil(journey.minutes),
+        "interchanges": journey.interchanges,
+    }
@@ -0,0 +1,718 @@
+"""Materialized station x weekly-minute commuter occupancy.
+
+For every stored route schedule, a commuter is counted at each station of the
+route's station sequence in the minute they pass it (timeFrom plus the
+travel-time matrix offset from the departing station). Counts live in one
+int32 NumPy array of shape (stations, MINUTES_IN_WEEK).
+
+Each route's contribution is kept in a registry keyed by "user_id/route_id",
+so route create/edit/delete replace just that route's cells. The registry is
+also the subscriber reference: per station, the set of route keys passing
+through it, with each route's schedule windows.
+
+The table is built from Firestore once (or loaded from the last snapshot) and
+saved to OCCUPANCY_SNAPSHOT_PATH periodically while it has unsaved changes.
+It then catches up with routes written since the snapshot, and keeps catching
+up periodically with writes made by other instances.
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+import tempfile
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+from typing import Any
+
+import numpy as np
+
+from core.config import get_settings
+from services.journey_planner import route_station_sequence, route_stations
+from services.schedule_engine import (
+    DAYS_ORDER,
+    MINUTES_IN_DAY,
+    MINUTES_IN_WEEK,
+    schedule_week_minute,
+    schedule_window,
+)
+from services.travel_time import canonical_station_code, get_travel_time_matrix
+
+logger = logging.getLogger("services.occupancy")
+
+# A catch-up also re-reads routes written this long before the last one, to
+# cover clock skew between instances and Firestore.
+CATCH_UP_OVERLAP = datetime.timedelta(minutes=1)
+
+
+@dataclass(frozen=True)
+class RouteOccupancy:
+    user_id: str
+    # route_stations() of the route: what notify_affected_users matches, codes outside the dataset included.
+    codes: tuple[str, ...]
+    stations: tuple[int, ...]
+    # Minutes from the departing station to each of `stations`.
+    offsets: tuple[int, ...]
+    # (station index, week minute) for every schedule and every station passed.
+    passes: tuple[tuple[int, int], ...]
+    # (start, end) week minutes of each schedule window.
+    windows: tuple[tuple[int, int], ...]
+
+
+@dataclass(frozen=True)
+class StationWindows:
+    starts: np.ndarray
+    ends: np.ndarray
+    # Position of each window's user (OccupancyTable.user_id_at).
+    users: np.ndarray
+    # Slot of each window's route, so a route write can replace just its windows.
+    routes: np.ndarray
+    # Longest window, so an overlap query only reads starts in [first - longest, last].
+    longest: int
+
+    def overlapping(self, first: int, last: int) -> "StationWindows":
+        """Windows overlapping minutes [first, last], across the week boundary."""
+        selected = []
+        for shift in (0, MINUTES_IN_WEEK, -MINUTES_IN_WEEK):
+            low = np.searchsorted(self.starts, first - shift - self.longest, side="left")
+            high = np.searchsorted(self.starts, last - shift, side="right")
+            candidates = np.arange(low, high)
+            selected.append(candidates[self.ends[low:high] + shift >= first])
+        chosen = np.sort(np.concatenate(selected))
+        return StationWindows(
+            self.starts[chosen], self.ends[chosen], self.users[chosen], self.routes[chosen], self.longest
+        )
+
+
+class OccupancyTable:
+    def __init__(self, station_codes: list[str]) -> None:
+        self.station_codes = list(station_codes)
+        self._station_index = {code: position for position, code in enumerate(self.station_codes)}
+        self._lock = threading.Lock()
+        self._clear()
+        # Route keys written while a load replaces the registry; re-read when it finishes.
+        self._pending: set[str] | None = None
+        # Firestore writes up to this time are reflected (None until loaded).
+        self.synced_at: datetime.datetime | None = None
+        self.ready = False
+        self.dirty = False
+
+    def _clear(self) -> None:
+        self.counts = np.zeros((len(self.station_codes), MINUTES_IN_WEEK), dtype=np.int32)
+        self._routes: dict[str, RouteOccupancy] = {}
+        self._by_station: list[set[str]] = [set() for _ in self.station_codes]
+        # Route keys per station code, for alert dry runs (codes outside the dataset included).
+        self._by_code: dict[str, set[str]] = {}
+        # Per code schedule windows; built on first use, then patched with the routes
+        # written since (_stale_windows) when next read.
+        self._code_windows: dict[str, StationWindows] = {}
+        self._stale_windows: dict[str, set[str]] = {}
+        # Per route (window bounds as an (n, 2) array, user position, route slot), kept alongside _routes.
+        self._route_windows: dict[str, tuple[np.ndarray, int, int]] = {}
+        self._route_slots: dict[str, int] = {}
+        self._user_ids: list[str] = []
+        self._user_positions: dict[str, int] = {}
+        # Whether each user (by position) has a device token; None until known.
+        self._user_tokens: list[bool | None] = []
+
+    @staticmethod
+    def route_key(user_id: str, route_id: str) -> str:
+        return f"{user_id}/{route_id}"
+
+    def station_index(self, code: str) -> int | None:
+        return self._station_index.get(code.strip().upper())
+
+    def _route_path(self, route: dict[str, Any]) -> tuple[tuple[int, ...], tuple[int, ...]]:
+        """(stations, minute offsets from the departing station) of a route document."""
+        departing = canonical_station_code(str(route.get("departingStation", "")))
+        destination = canonical_station_code(str(route.get("destinationStation", "")))
+        sequence = route.get("stationSequence")
+        if not (isinstance(sequence, list) and sequence):
+            if not departing or not destination:
+                return (), ()
+            sequence = route_station_sequence(departing, destination)
+        sequence = [canonical_station_code(str(code)) for code in sequence]
+
+        matrix = get_travel_time_matrix()
+        stations: list[int] = []
+        offsets: list[int] = []
+        for position, code in enumerate(sequence):
+            station = self.station_index(str(code))
+            if station is None:
+                continue
+            minutes = matrix.minutes(departing, str(code)) if departing else None
+            stations.append(station)
+            # Stations the matrix cannot reach fall back to the old 2 minutes per stop.
+            offsets.append(round(minutes) if minutes is not None else position * 2)
+        return tuple(stations), tuple(offsets)
+
+    @staticmethod
+    def _schedule_cells(
+        stations: tuple[int, ...],
+        offsets: tuple[int, ...],
+        schedules: list[dict[str, Any]],
+    ) -> tuple[tuple[tuple[int, int], ...], tuple[tuple[int, int], ...]]:
+        """(passes, windows) of `schedules` on a route with these stations."""
+        passes: list[tuple[int, int]] = []
+        windows: list[tuple[int, int]] = []
+        for schedule in schedules:
+            start = schedule_week_minute(schedule.get("dayOfWeek"), schedule.get("timeFrom"))
+            if start is None:
+                continue
+            passes.extend((station, (start + offset) % MINUTES_IN_WEEK) for station, offset in zip(stations, offsets))
+            window = schedule_window(schedule)
+            if window is not None:
+                windows.append(window)
+        return tuple(passes), tuple(windows)
+
+    def _occupancy_for(self, user_id: str, route: dict[str, Any]) -> RouteOccupancy | None:
+        stations, offsets = self._route_path(route)
+        passes, windows = self._schedule_cells(stations, offsets, route.get("schedules", []))
+        # Routes wholly outside the dataset have no passes but still match alerts.
+        if not passes and not windows:
+            return None
+        return RouteOccupancy(
+            user_id=user_id,
+            codes=tuple(sorted(route_stations(route))),
+            stations=stations,
+            offsets=offsets,
+            passes=passes,
+            windows=windows,
+        )
+
+    def _apply(self, occupancy: RouteOccupancy, sign: int) -> None:
+        if not occupancy.passes:
+            return
+        rows, minutes = zip(*occupancy.passes)
+        # add.at handles repeated (station, minute) cells correctly.
+        np.add.at(self.counts, (np.array(rows), np.array(minutes)), sign)
+
+    def set_route(self, user_id: str, route_id: str, route: dict[str, Any] | None) -> None:
+        """Replace one route's contribution; None (a deleted route) removes it."""
+        key = self.route_key(user_id, route_id)
+        occupancy = self._occupancy_for(user_id, route) if route is not None else None
+        with self._lock:
+            if self._pending is not None:
+                self._pending.add(key)
+                return
+            self._set(key, occupancy)
+
+    def _put(self, user_id: str, route_id: str, route: dict[str, Any] | None) -> None:
+        """set_route for the load itself, which is never held back."""
+        occupancy = self._occupancy_for(user_id, route) if route is not None else None
+        with self._lock:
+            self._set(self.route_key(user_id, route_id), occupancy)
+
+    def add_schedules(
+        self,
+        user_id: str,
+        route_id: str,
+        route: dict[str, Any],
+        schedules: list[dict[str, Any]],
+    ) -> None:
+        """Add newly written schedules to a route without its existing ones.
+
+        `route` is the route document; it is only used when the route has no
+        entry yet (no schedule counted so far).
+        """
+        key = self.route_key(user_id, route_id)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.add(key)
+                return
+            previous = self._routes.get(key)
+            if previous is None:
+                occupancy = self._occupancy_for(user_id, {**route, "schedules": schedules})
+            else:
+                passes, windows = self._schedule_cells(previous.stations, previous.offsets, schedules)
+                occupancy = replace(previous, passes=previous.passes + passes, windows=previous.windows + windows)
+            self._set(key, occupancy)
+
+    def _set(self, key: str, occupancy: RouteOccupancy | None) -> None:
+        previous = self._routes.pop(key, None)
+        self._route_windows.pop(key, None)
+        if previous is not None:
+            self._apply(previous, -1)
+            for station in previous.stations:
+                self._by_station[station].discard(key)
+            for code in previous.codes:
+                self._by_code[code].discard(key)
+        if occupancy is not None:
+            self._routes[key] = occupancy
+            self._track_windows(key, occupancy)
+            self._apply(occupancy, 1)
+            for station in occupancy.stations:
+                self._by_station[station].add(key)
+            for code in occupancy.codes:
+                self._by_code.setdefault(code, set()).add(key)
+        for code in set(previous.codes if previous else ()) | set(occupancy.codes if occupancy else ()):
+            if code in self._code_windows:
+                self._stale_windows.setdefault(code, set()).add(key)
+        self.dirty = True
+
+    def _track_windows(self, key: str, occupancy: RouteOccupancy) -> None:
+        position = self._user_positions.get(occupancy.user_id)
+        if position is None:
+            position = self._user_positions[occupancy.user_id] = len(self._user_ids)
+            self._user_ids.append(occupancy.user_id)
+            self._user_tokens.append(None)
+        slot = self._route_slots.setdefault(key, len(self._route_slots))
+        bounds = np.array(occupancy.windows, dtype=np.int32).reshape(-1, 2)
+        self._route_windows[key] = (bounds, position, slot)
+
+    def _window_entries(self, keys: Iterable[str]) -> StationWindows:
+        """Windows of the routes `keys`, sorted by start."""
+        entries = [self._route_windows[key] for key in keys]
+        bounds = np.concatenate([entry[0] for entry in entries]) if entries else np.empty((0, 2), np.int32)
+        order = np.argsort(bounds[:, 0], kind="stable")
+        starts, ends = bounds[order, 0], bounds[order, 1]
+        sizes = np.fromiter((len(entry[0]) for entry in entries), dtype=np.int64, count=len(entries))
+        users = np.fromiter((entry[1] for entry in entries), dtype=np.int32, count=len(entries))
+        routes = np.fromiter((entry[2] for entry in entries), dtype=np.int32, count=len(entries))
+        return StationWindows(
+            starts=starts,
+            ends=ends,
+            users=np.repeat(users, sizes)[order],
+            routes=np.repeat(routes, sizes)[order],
+            longest=int((ends - starts).max()) if len(starts) else 0,
+        )
+
+    def _patched_windows(self, code: str, current: StationWindows, keys: set[str]) -> StationWindows:
+        """`current` with the windows of routes `keys` replaced by what they are now."""
+        keep = ~np.isin(current.routes, [self._route_slots[key] for key in keys])
+        added = self._window_entries([key for key in keys if key in self._by_code.get(code, ())])
+        at = np.searchsorted(current.starts[keep], added.starts, side="right")
+        return StationWindows(
+            starts=np.insert(current.starts[keep], at, added.starts),
+            ends=np.insert(current.ends[keep], at, added.ends),
+            users=np.insert(current.users[keep], at, added.users),
+            routes=np.insert(current.routes[keep], at, added.routes),
+            # Not lowered for removed windows; a larger bound only widens the search.
+            longest=max(current.longest, added.longest),
+        )
+
+    def profile(self, code: str) -> np.ndarray | None:
+        """Copy of one station's per-minute counts for the whole week."""
+        station = self.station_index(code)
+        if station is None:
+            return None
+        with self._lock:
+            return self.counts[station].copy()
+
+    def route_keys_at(self, station: int) -> list[str]:
+        with self._lock:
+            return list(self._by_station[station])
+
+    def route(self, key: str) -> RouteOccupancy | None:
+        with self._lock:
+            return self._routes.get(key)
+
+    def routes(self) -> list[tuple[str, RouteOccupancy]]:
+        """Snapshot of the registry as (route key, occupancy) pairs."""
+        with self._lock:
+            return list(self._routes.items())
+
+    def station_windows(self, code: str) -> StationWindows:
+        """Schedule windows of every route through station `code`, sorted by start."""
+        with self._lock:
+            cached = self._code_windows.get(code)
+            if cached is None:
+                cached = self._window_entries(self._by_code.get(code, ()))
+                # Unknown codes (any string a caller sends) are not kept.
+                if code in self._by_code:
+                    self._code_windows[code] = cached
+            elif code in self._stale_windows:
+                # Only the routes written since the last read are re-sorted in.
+                cached = self._code_windows[code] = self._patched_windows(code, cached, self._stale_windows.pop(code))
+            return cached
+
+    def user_id_at(self, position: int) -> str:
+        return self._user_ids[position]
+
+    def set_device_token(self, user_id: str, has_token: bool) -> None:
+        """Record whether a user with routes here has a device token."""
+        with self._lock:
+            position = self._user_positions.get(user_id)
+            if position is not None:
+                self._user_tokens[position] = has_token
+
+    def has_device_token(self, positions: np.ndarray) -> np.ndarray:
+        """Mask of the users at `positions` that have a device token.
+
+        Users not known yet are read from Firestore in one get_all; answers are
+        kept, since device_token is only written at registration.
+        """
+        with self._lock:
+            unknown = [
+                self._user_ids[position] for position in positions.tolist() if self._user_tokens[position] is None
+            ]
+        if unknown:
+            for user_id, has_token in _read_device_tokens(unknown).items():
+                self.set_device_token(user_id, has_token)
+        with self._lock:
+            return np.array([bool(self._user_tokens[position]) for position in positions.tolist()], dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def save(self, path: str) -> None:
+        """Write counts and registry as NumPy arrays (atomic rename)."""
+        with self._lock:
+            station_codes = list(self.station_codes)
+            keys = list(self._routes)
+            routes = [self._routes[key] for key in keys]
+            counts = self.counts.copy()
+            synced_at = self.synced_at
+            tokens = [
+                (user, has_token) for user, has_token in zip(self._user_ids, self._user_tokens) if has_token is not None
+            ]
+            self.dirty = False
+        pass_route = [index for index, route in enumerate(routes) for _ in route.passes]
+        window_route = [index for index, route in enumerate(routes) for _ in route.windows]
+        station_route = [index for index, route in enumerate(routes) for _ in route.stations]
+        code_route = [index for index, route in enumerate(routes) for _ in route.codes]
+
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # A unique temp file per save, so overlapping saves never write the same file.
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".npz", delete=False) as temp_file:
+            try:
+                np.savez_compressed(
+                    temp_file,
+                    station_codes=np.array(station_codes),
+                    synced_at=np.array(synced_at.timestamp() if synced_at is not None else 0.0),
+                    counts=counts,
+                    route_keys=np.array(keys, dtype=str),
+                    route_users=np.array([route.user_id for route in routes], dtype=str),
+                    station_route=np.array(station_route, dtype=np.int32),
+                    station_index=np.array([s for route in routes for s in route.stations], dtype=np.int32),
+                    station_offset=np.array([o for route in routes for o in route.offsets], dtype=np.int32),
+                    code_route=np.array(code_route, dtype=np.int32),
+                    code_value=np.array([code for route in routes for code in route.codes], dtype=str),
+                    token_user=np.array([user for user, _ in tokens], dtype=str),
+                    token_value=np.array([has_token for _, has_token in tokens], dtype=bool),
+                    pass_route=np.array(pass_route, dtype=np.int32),
+                    pass_station=np.array([s for route in routes for s, _ in route.passes], dtype=np.int32),
+                    pass_minute=np.array([m for route in routes for _, m in route.passes], dtype=np.int32),
+                    window_route=np.array(window_route, dtype=np.int32),
+                    window_start=np.array([w[0] for route in routes for w in route.windows], dtype=np.int32),
+                    window_end=np.array([w[1] for route in routes for w in route.windows], dtype=np.int32),
+                )
+            except BaseException:
+                os.unlink(temp_file.name)
+                raise
+        os.replace(temp_file.name, path)
+
+    def load(self, path: str) -> bool:
+        """Load a snapshot; False if it is missing, from an older format or built for another station list."""
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as snapshot:
+            if not {"station_offset", "synced_at", "code_value", "token_user"} <= set(snapshot.files):
+                return False
+            if list(snapshot["station_codes"]) != self.station_codes or not snapshot["synced_at"]:
+                return False
+            synced_at = datetime.datetime.fromtimestamp(float(snapshot["synced_at"]), datetime.timezone.utc)
+            keys = snapshot["route_keys"].tolist()
+            users = snapshot["route_users"].tolist()
+            stations: list[list[int]] = [[] for _ in keys]
+            offsets: list[list[int]] = [[] for _ in keys]
+            codes: list[list[str]] = [[] for _ in keys]
+            passes: list[list[tuple[int, int]]] = [[] for _ in keys]
+            windows: list[list[tuple[int, int]]] = [[] for _ in keys]
+            for route, station, offset in zip(
+                snapshot["station_route"].tolist(),
+                snapshot["station_index"].tolist(),
+                snapshot["station_offset"].tolist(),
+            ):
+                stations[route].append(station)
+                offsets[route].append(offset)
+            for route, station, minute in zip(
+                snapshot["pass_route"].tolist(), snapshot["pass_station"].tolist(), snapshot["pass_minute"].tolist()
+            ):
+                passes[route].append((station, minute))
+            for route, start, end in zip(
+                snapshot["window_route"].tolist(), snapshot["window_start"].tolist(), snapshot["window_end"].tolist()
+            ):
+                windows[route].append((start, end))
+            for route, code in zip(snapshot["code_route"].tolist(), snapshot["code_value"].tolist()):
+                codes[route].append(code)
+            tokens = list(zip(snapshot["token_user"].tolist(), snapshot["token_value"].tolist()))
+            counts = snapshot["counts"].astype(np.int32)
+
+        with self._lock:
+            self._clear()
+            self.counts = counts
+            for index, key in enumerate(keys):
+                route = RouteOccupancy(
+                    user_id=users[index],
+                    codes=tuple(codes[index]),
+                    stations=tuple(stations[index]),
+                    offsets=tuple(offsets[index]),
+                    passes=tuple(passes[index]),
+                    windows=tuple(windows[index]),
+                )
+                self._routes[key] = route
+                self._track_windows(key, route)
+                for station in route.stations:
+                    self._by_station[station].add(key)
+                for code in route.codes:
+                    self._by_code.setdefault(code, set()).add(key)
+            for user_id, has_token in tokens:
+                position = self._user_positions.get(user_id)
+                if position is not None:
+                    self._user_tokens[position] = bool(has_token)
+            self.synced_at = synced_at
+            self.dirty = False
+        return True
+
+    def rebuild(self) -> None:
+        """Recompute from every user's routes in Firestore."""
+        # Imported here: route_service updates this table on every route write.
+        from core.firebase import get_firestore_client, initialize_firebase
+        from services.route_service import get_user_routes_with_schedules
+
+        initialize_firebase()
+        db = get_firestore_client()
+        if db is None:
+            return
+        started = datetime.datetime.now(datetime.timezone.utc)
+        with self._lock:
+            self._clear()
+        for user_doc in db.collection("users").stream():
+            for route in get_user_routes_with_schedules(user_doc.id):
+                self._put(user_doc.id, str(route.get("id", "")), route)
+            self.set_device_token(user_doc.id, _has_device_token(user_doc.to_dict()))
+        self.synced_at = started
+
+    def catch_up(self) -> int:
+        """Apply routes written or deleted in Firestore since synced_at, by any instance.
+
+        Returns the number of routes re-read or removed.
+        """
+        from services.reminder_service import sync_route_reminders
+        from services.route_service import get_all_route_changes
+
+        if self.synced_at is None:
+            return 0
+        started = datetime.datetime.now(datetime.timezone.utc)
+        changed, deleted = get_all_route_changes(self.synced_at - CATCH_UP_OVERLAP)
+        for user_id, route in changed:
+            self._put(user_id, str(route.get("id", "")), route)
+            sync_route_reminders(user_id, str(route.get("id", "")))
+        for user_id, route_id in deleted:
+            self._put(user_id, route_id, None)
+            sync_route_reminders(user_id, route_id)
+        self.synced_at = started
+        return len(changed) + len(deleted)
+
+    def begin_load(self) -> None:
+        """Hold back route writes until finish_load, so replacing the registry does not lose them."""
+        with self._lock:
+            self._pending = set()
+
+    def finish_load(self) -> None:
+        """Re-read the routes written since begin_load from Firestore and stop holding writes back."""
+        from services.route_service import get_route_with_schedules
+
+        while True:
+            with self._lock:
+                keys = self._pending
+                if not keys:
+                    self._pending = None
+                    return
+                # Writes during the re-read are held again and picked up by the next pass.
+                self._pending = set()
+            for key in keys:
+                user_id, route_id = key.split("/", 1)
+                self._put(user_id, route_id, get_route_with_schedules(user_id, route_id))
+
+    def cancel_load(self) -> None:
+        with self._lock:
+            self._pending = None
+
+
+def _has_device_token(user_data: dict[str, Any] | None) -> bool:
+    # The check notify_affected_users applies before matching a user's routes.
+    device_token = (user_data or {}).get("device_token")
+    return isinstance(device_token, str) and bool(device_token)
+
+
+def _read_device_tokens(user_ids: list[str]) -> dict[str, bool]:
+    from core.firebase import get_firestore_client, initialize_firebase
+
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        return {}
+    refs = [db.collection("users").document(user_id) for user_id in user_ids]
+    return {
+        snapshot.id: _has_device_token(snapshot.to_dict() if snapshot.exists else None)
+        for snapshot in db.get_all(refs)
+    }
+
+
+def station_occupancy(code: str, day: str | None, bucket_minutes: int) -> dict[str, Any] | None:
+    """Commuters passing `code` per bucket, for one day or the whole week."""
+    table = get_occupancy_table()
+    profile = table.profile(code)
+    if profile is None:
+        return None
+    first_minute = 0
+    if day is not None:
+        first_minute = DAYS_ORDER.index(day) * MINUTES_IN_DAY
+        profile = profile[first_minute:first_minute + MINUTES_IN_DAY]
+    usable = len(profile) - len(profile) % bucket_minutes
+    sums = profile[:usable].reshape(-1, bucket_minutes).sum(axis=1)
+    if usable < len(profile):
+        sums = np.append(sums, profile[usable:].sum())
+
+    buckets = []
+    for position, count in enumerate(sums.tolist()):
+        minute = first_minute + position * bucket_minutes
+        buckets.append(
+            {
+                "day": DAYS_ORDER[minute // MINUTES_IN_DAY],
+                "time": f"{minute % MINUTES_IN_DAY // 60:02d}:{minute % 60:02d}",
+                "count": int(count),
+            }
+        )
+    return {"station": code.strip().upper(), "total": int(profile.sum()), "buckets": buckets}
+
+
+def _contains(sorted_values: np.ndarray, value: int) -> bool:
+    position = int(sorted_values.searchsorted(value))
+    return position < len(sorted_values) and sorted_values[position] == value
+
+
+def estimate_alert_impact(
+    affected_stations: list[str],
+    start_minute: int,
+    duration_minutes: int,
+    bucket_minutes: int,
+    sample_size: int,
+) -> dict[str, Any]:
+    """Who an alert on these stations would reach, without sending anything.
+
+    Uses notify_affected_users' rule (the station is in route_stations() of
+    the route, a schedule window is active and the rider has a device token)
+    over [start, start + duration] from the per-station window arrays, so the
+    cost follows the routes through the affected stations rather than the
+    total number of users.
+    """
+    table = get_occupancy_table()
+    last_minute = start_minute + duration_minutes
+    bucket_starts = list(range(start_minute, last_minute + 1, bucket_minutes))
+
+    # Narrowed to the whole range once; each bucket only scans what is left.
+    windows = {
+        code: table.station_windows(code).overlapping(start_minute, last_minute)
+        for code in dict.fromkeys(canonical_station_code(item) for item in affected_stations)
+    }
+    reached = [station.users for station in windows.values()]
+    candidates = np.unique(np.concatenate(reached)) if reached else np.array([], dtype=np.int32)
+    everyone = candidates[table.has_device_token(candidates)]
+
+    per_station = {code: np.intersect1d(station.users, everyone) for code, station in windows.items()}
+
+    buckets = []
+    for bucket_start in bucket_starts:
+        bucket_last = min(bucket_start + bucket_minutes - 1, last_minute)
+        reached = [station.overlapping(bucket_start, bucket_last).users for station in windows.values()]
+        minute = bucket_start % MINUTES_IN_WEEK
+        buckets.append(
+            {
+                "day": DAYS_ORDER[minute // MINUTES_IN_DAY],
+                "time": f"{minute % MINUTES_IN_DAY // 60:02d}:{minute % 60:02d}",
+                "recipients": int(len(np.intersect1d(np.concatenate(reached), everyone))) if reached else 0,
+            }
+        )
+
+    sample = [
+        {
+            "user_id": table.user_id_at(int(position)),
+            "stations": [code for code, users in per_station.items() if _contains(users, position)],
+        }
+        for position in everyone[:sample_size]
+    ]
+    return {
+        "total_recipients": int(len(everyone)),
+        "stations": [{"station": code, "recipients": int(len(users))} for code, users in per_station.items()],
+        "buckets": buckets,
+        "sample": sample,
+    }
+
+
+# Singleton table (loaded in the background at startup)
+_occupancy_table: OccupancyTable | None = None
+_occupancy_table_lock = threading.Lock()
+
+
+def get_occupancy_table() -> OccupancyTable:
+    global _occupancy_table
+
+    if _occupancy_table is None:
+        with _occupancy_table_lock:
+            if _occupancy_table is None:
+                _occupancy_table = OccupancyTable(get_travel_time_matrix().codes)
+    return _occupancy_table
+
+
+def load_occupancy_table() -> OccupancyTable:
+    """Fill the table from the snapshot and catch up, or from Firestore if there is none.
+
+    Route writes made during the load are re-read once it is done.
+    """
+    table = get_occupancy_table()
+    path = get_settings().OCCUPANCY_SNAPSHOT_PATH
+    table.begin_load()
+    try:
+        loaded = table.load(path)
+        retention = datetime.timedelta(days=get_settings().DELTA_SYNC_RETENTION_DAYS)
+        oldest_tombstone = datetime.datetime.now(datetime.timezone.utc) - retention
+        if loaded and table.synced_at is not None and table.synced_at < oldest_tombstone:
+            # Route tombstones since then may have expired, so deletes could be missed.
+            logger.info("Occupancy snapshot is older than the tombstone retention, rebuilding")
+            loaded = False
+        if loaded:
+            try:
+                logger.info("Occupancy snapshot caught up with %d route changes", table.catch_up())
+            except Exception as exc:
+                logger.warning("Could not catch up the occupancy snapshot, rebuilding: %s", exc)
+                loaded = False
+        if not loaded:
+            table.rebuild()
+            table.save(path)
+        table.finish_load()
+    except Exception as exc:
+        table.cancel_load()
+        logger.warning("Could not load occupancy table: %s", exc)
+        return table
+    table.ready = True
+    return table
+
+
+async def persist_occupancy_periodically(interval_seconds: float) -> None:
+    """Save the table whenever it has changes, every `interval_seconds`."""
+    path = get_settings().OCCUPANCY_SNAPSHOT_PATH
+    while True:
+        await asyncio.sleep(interval_seconds)
+        table = get_occupancy_table()
+        if table.ready and table.dirty:
+            try:
+                await asyncio.to_thread(table.save, path)
+            except Exception as exc:
+                logger.warning("Could not save occupancy snapshot: %s", exc)
+
+
+async def sync_occupancy_periodically(interval_seconds: float) -> None:
+    """Catch the table up with other instances' route writes every `interval_seconds`."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        table = get_occupancy_table()
+        if table.ready:
+            try:
+                await asyncio.to_thread(table.catch_up)
+            except Exception as exc:
+                logger.warning("Could not catch up occupancy table: %s", exc)
@@ -113,15 +113,18 @@ async def predict_incident():
     }
 
     client = get_gemini_client()
+    my_tz = timezone(timedelta(hours=8))
     try:
         prediction = await client.generate_structured(
             prompt=user_prompt,
             output_schema=output_schema,
-            system_instruction=system_instruction
+            system_instruction=system_instruction,
+            # Same posts on the same day give the same answer; bump the version when the prompt changes.
+            prompt_version="predict-incident-v1",
+            cache_input=f"{datetime.now(my_tz).date().isoformat()}\n{user_prompt}",
         )
         if prediction:
             # Add runned_at timestamp (UTC+8 for Malaysia)
-            my_tz = timezone(timedelta(hours=8))
             prediction['runned_at'] = datetime.now(my_tz).isoformat()
         return prediction
     except Exception as e:
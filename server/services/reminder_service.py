@@ -0,0 +1,290 @@
+"""Pre-departure reminders for upcoming commutes.
+
+Every schedule window in the occupancy registry is one weekly departure. The
+queue keeps the next firing of each one (REMINDER_LEAD_MINUTES before
+timeFrom) in a min-heap keyed by rider wall-clock minute, and the dispatcher
+sleeps until the head is due, so a wake-up only touches the departures that
+are due. Fired departures go back on the heap one week later.
+
+Route writes re-sync a route's departures. Entries for edited or deleted
+schedules stay in the heap and are dropped when they reach the head.
+
+A rider is reminded when an active alert lists a station on their route (or
+always, with REMINDER_DISRUPTIONS_ONLY off). Every instance runs a dispatcher;
+before sending, each one creates a reminder_claims document for the route and
+fire minute, so only the first instance to claim a reminder sends it.
+"""
+
+import asyncio
+import datetime
+import heapq
+import logging
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from google.api_core.exceptions import AlreadyExists
+
+from core.config import get_settings
+from core.firebase import get_firestore_client, initialize_firebase
+from core.metrics import get_metrics
+from services.occupancy_service import OccupancyTable, RouteOccupancy, get_occupancy_table
+from services.schedule_engine import MINUTES_IN_DAY, MINUTES_IN_WEEK, rider_wall_minute
+
+logger = logging.getLogger("services.reminders")
+
+# Claims only need to outlive the minute they guard; expiresAt is for a
+# Firestore TTL policy on reminder_claims.
+CLAIM_TTL = datetime.timedelta(days=1)
+
+
+@dataclass(frozen=True)
+class DueReminder:
+    key: str
+    # Week minute of the schedule's timeFrom.
+    departure: int
+    # Rider wall minute the reminder came due at; the same on every instance.
+    fire_at: int
+
+
+class ReminderQueue:
+    def __init__(self, lead_minutes: int) -> None:
+        self.lead_minutes = lead_minutes
+        # (wall minute to fire at, route key, departure week minute)
+        self._heap: list[tuple[int, str, int]] = []
+        self._queued: set[tuple[str, int]] = set()
+        self._departures: dict[str, frozenset[int]] = {}
+        self._lock = threading.Lock()
+        # Set by the dispatcher; called when a sync puts an earlier entry at the head.
+        self.on_earlier: Callable[[], None] | None = None
+        self.active = False
+        # Keys synced while fill() runs; their sync is newer than fill's snapshot.
+        self._synced_during_fill: set[str] | None = None
+
+        metrics = get_metrics()
+        metrics.register_gauge("reminder_queue_entries", lambda: len(self._heap), "Queued reminder firings")
+        metrics.register_gauge(
+            "reminder_queue_routes", lambda: len(self._departures), "Routes with upcoming reminders"
+        )
+
+    def _next_fire(self, departure: int, now: int) -> int:
+        fire_at = now - now % MINUTES_IN_WEEK + (departure - self.lead_minutes) % MINUTES_IN_WEEK
+        return fire_at if fire_at >= now else fire_at + MINUTES_IN_WEEK
+
+    def _push(self, key: str, departure: int, fire_at: int) -> None:
+        if (key, departure) in self._queued:
+            return
+        self._queued.add((key, departure))
+        heapq.heappush(self._heap, (fire_at, key, departure))
+
+    def sync(self, key: str, route: RouteOccupancy | None, now: int) -> None:
+        """Replace one route's departures; None (a deleted route) removes them."""
+        self._sync(key, route, now, filling=False)
+
+    def _sync(self, key: str, route: RouteOccupancy | None, now: int, filling: bool) -> None:
+        departures = frozenset(start % MINUTES_IN_WEEK for start, _ in route.windows) if route else frozenset()
+        with self._lock:
+            if not self.active:
+                return
+            if self._synced_during_fill is not None:
+                if filling and key in self._synced_during_fill:
+                    return
+                if not filling:
+                    self._synced_during_fill.add(key)
+            head = self._heap[0][0] if self._heap else None
+            if departures:
+                self._departures[key] = departures
+            else:
+                self._departures.pop(key, None)
+            for departure in departures:
+                self._push(key, departure, self._next_fire(departure, now))
+            earlier = bool(self._heap) and (head is None or self._heap[0][0] < head)
+        if earlier and self.on_earlier is not None:
+            self.on_earlier()
+
+    def fill(self, routes: Callable[[], list[tuple[str, RouteOccupancy]]], now: int) -> None:
+        """Start syncing, then queue every route of the registry snapshot `routes()`.
+
+        The snapshot is taken after syncing starts, so a route written in
+        between is either in it or synced on its own.
+        """
+        with self._lock:
+            self.active = True
+            self._synced_during_fill = set()
+        for key, route in routes():
+            self._sync(key, route, now, filling=True)
+        with self._lock:
+            self._synced_during_fill = None
+
+    def pop_due(self, now: int) -> list[DueReminder]:
+        """Departures whose reminder is due at `now`; each is re-queued for next week."""
+        due: list[DueReminder] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, key, departure = heapq.heappop(self._heap)
+                self._queued.discard((key, departure))
+                if departure not in self._departures.get(key, ()):
+                    continue
+                self._push(key, departure, fire_at + MINUTES_IN_WEEK)
+                # After a stall, skip reminders for trains that have already left.
+                if fire_at + self.lead_minutes >= now:
+                    due.append(DueReminder(key=key, departure=departure, fire_at=fire_at))
+        return due
+
+    def next_fire(self) -> int | None:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+def _active_incidents(db: Any) -> list[dict[str, Any]]:
+    incidents = []
+    for doc in db.collection("alerts").stream():
+        details = (doc.to_dict() or {}).get("incident_details")
+        if isinstance(details, dict) and isinstance(details.get("affected_stations"), list):
+            incidents.append(details)
+    return incidents
+
+
+def _reminder_message(
+    table: OccupancyTable,
+    route: RouteOccupancy,
+    departure: int,
+    lead_minutes: int,
+    incidents: list[dict[str, Any]],
+) -> tuple[str, str]:
+    departing = table.station_codes[route.stations[0]]
+    destination = table.station_codes[route.stations[-1]]
+    at = f"{departure % MINUTES_IN_DAY // 60:02d}:{departure % 60:02d}"
+    if not incidents:
+        return "Upcoming commute", f"Your {at} {departing} to {destination} commute leaves in {lead_minutes} minutes."
+    incident = incidents[0]
+    on_route = set(route.codes)
+    stations = ", ".join(code for code in (str(item).upper() for item in incident["affected_stations"]) if code in on_route)
+    body = f"{incident.get('type') or 'Incident'} at {stations}"
+    if incident.get("description"):
+        body = f"{body}: {incident['description']}"
+    return f"Disruption on your {at} {departing} commute", body
+
+
+def send_reminders(due: list[DueReminder]) -> int:
+    """Notify the riders of due departures; returns the number of messages sent."""
+    # Imported here: route_service re-syncs the reminder queue on every route write.
+    from services.alert_service import send_alert_to_device
+
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        return 0
+
+    settings = get_settings()
+    table = get_occupancy_table()
+    # One alerts read per wake-up, shared by every due departure.
+    incidents = _active_incidents(db)
+    sent = 0
+    for reminder in due:
+        route = table.route(reminder.key)
+        # Routes wholly outside the station dataset have no stops to name.
+        if route is None or not route.stations:
+            continue
+        on_route = set(route.codes)
+        relevant = [
+            incident
+            for incident in incidents
+            if on_route.intersection(str(code).upper() for code in incident["affected_stations"])
+        ]
+        if settings.REMINDER_DISRUPTIONS_ONLY and not relevant:
+            continue
+
+        user_doc = db.collection("users").document(route.user_id).get()
+        device_token = (user_doc.to_dict() or {}).get("device_token") if user_doc.exists else None
+        if not isinstance(device_token, str) or not device_token:
+            continue
+
+        route_id = reminder.key.split("/", 1)[-1]
+        if not _claim(db, route.user_id, route_id, reminder.fire_at):
+            continue
+
+        title, body = _reminder_message(table, route, reminder.departure, settings.REMINDER_LEAD_MINUTES, relevant)
+        if send_alert_to_device(
+            token=device_token,
+            title=title,
+            body=body,
+            data={"type": "commute_reminder", "route_id": route_id},
+        ):
+            sent += 1
+    if sent:
+        get_metrics().inc("reminders_sent_total", sent, help_text="Pre-departure reminders sent")
+    return sent
+
+
+def _claim(db: Any, user_id: str, route_id: str, fire_at: int) -> bool:
+    """Create the claim for one reminder firing; False if another instance holds it."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    try:
+        db.collection("reminder_claims").document(f"{user_id}:{route_id}:{fire_at}").create(
+            {"claimedAt": now, "expiresAt": now + CLAIM_TTL}
+        )
+    except AlreadyExists:
+        get_metrics().inc("reminders_claimed_elsewhere_total", help_text="Due reminders another instance sent")
+        return False
+    return True
+
+
+def sync_route_reminders(user_id: str, route_id: str) -> None:
+    """Re-read a route's departures from the occupancy registry after a write."""
+    table = get_occupancy_table()
+    key = table.route_key(user_id, route_id)
+    get_reminder_queue().sync(key, table.route(key), rider_wall_minute())
+
+
+async def run_reminder_dispatcher() -> None:
+    """Send reminders as departures come due; runs until cancelled."""
+    queue = get_reminder_queue()
+    table = get_occupancy_table()
+    while not table.ready:
+        await asyncio.sleep(1)
+
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    queue.on_earlier = lambda: loop.call_soon_threadsafe(wake.set)
+    queue.fill(table.routes, rider_wall_minute())
+
+    while True:
+        # Cleared before popping so a sync during the send still wakes the next wait.
+        wake.clear()
+        due = queue.pop_due(rider_wall_minute())
+        if due:
+            get_metrics().inc("reminders_due_total", len(due), help_text="Reminder firings that came due")
+            try:
+                await asyncio.to_thread(send_reminders, due)
+            except Exception as exc:
+                logger.warning("Could not send %d reminders: %s", len(due), exc)
+
+        next_fire = queue.next_fire()
+        timestamp = time.time()
+        # Sleep to the start of the due minute; None waits for the first sync.
+        timeout = None if next_fire is None else max(0.0, (next_fire - rider_wall_minute(timestamp)) * 60 - timestamp % 60)
+        try:
+            await asyncio.wait_for(wake.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+# Singleton queue (filled by the dispatcher once the occupancy table is ready)
+_reminder_queue: ReminderQueue | None = None
+_reminder_queue_lock = threading.Lock()
+
+
+def get_reminder_queue() -> ReminderQueue:
+    global _reminder_queue
+
+    if _reminder_queue is None:
+        with _reminder_queue_lock:
+            if _reminder_queue is None:
+                _reminder_queue = ReminderQueue(lead_minutes=get_settings().REMINDER_LEAD_MINUTES)
+    return _reminder_queue
@@ -4,7 +4,11 @@ from uuid import uuid4
 
 from firebase_admin import firestore
 
+from core.config import get_settings
 from core.firebase import get_firestore_client, initialize_firebase
+from core.singleflight import SingleFlight
+
+_top3_flight = SingleFlight(ttl_seconds=get_settings().MICROCACHE_TTL_SECONDS)
 
 
 def send_report(
@@ -28,10 +32,16 @@ def send_report(
 
     doc_id = str(uuid4())
     db.collection("reports").document(doc_id).set(record)
+    _top3_flight.invalidate()
     return doc_id
 
 
 def get_top3_report() -> list[dict[str, Any]]:
+    """Return the 3 latest reports, shared across concurrent and back-to-back callers."""
+    return _top3_flight.do("top3", _fetch_top3_report)
+
+
+def _fetch_top3_report() -> list[dict[str, Any]]:
     initialize_firebase()
     db = get_firestore_client()
     if db is None:
@@ -2,21 +2,32 @@ import datetime
 from typing import Any
 from uuid import uuid4
 
+from core.config import get_settings
 from core.firebase import get_firestore_client, initialize_firebase
+from services.journey_planner import route_station_sequence
+from services.occupancy_service import get_occupancy_table
+from services.reminder_service import sync_route_reminders
+from services.schedule_engine import DAYS_ORDER, rider_week_minute
+from services.schedule_index import WeeklyScheduleIndex, get_schedule_index_cache
+from services.travel_time import calc_time_to
 from services.user_service import get_user_by_email
 
-DAYS_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-MINUTES_IN_DAY = 1440
-MINUTES_IN_WEEK = 7 * MINUTES_IN_DAY
+# Firestore rejects batches with more than 500 writes.
+MAX_BATCH_WRITES = 500
 
 
-def get_user_routes_with_schedules(user_id: str) -> list[dict[str, Any]]:
+def get_user_routes_with_schedules(
+    user_id: str,
+    updated_since: datetime.datetime | None = None,
+) -> list[dict[str, Any]]:
     initialize_firebase()
     db = get_firestore_client()
     if db is None:
         return []
 
     routes_ref = db.collection("users").document(user_id).collection("routes")
+    if updated_since is not None:
+        routes_ref = routes_ref.where("updatedAt", ">", updated_since)
     routes = routes_ref.stream()
 
     full_routes: list[dict[str, Any]] = []
@@ -38,39 +49,134 @@ def get_user_routes_with_schedules(user_id: str) -> list[dict[str, Any]]:
     return full_routes
 
 
-def calcTimeTo(time_from: str, departing_station: str, destination_station: str) -> str:
-    buffer_time = 10
-    departing_station_num = int(departing_station[2:])
-    destination_station_num = int(destination_station[2:])
-    duration = abs(destination_station_num - departing_station_num) * 2 + buffer_time
-    time_from_dt = datetime.datetime.strptime(time_from, "%H:%M")
-    time_to_dt = time_from_dt + datetime.timedelta(minutes=duration)
-    return time_to_dt.strftime("%H:%M")
+def get_route_with_schedules(user_id: str, route_id: str) -> dict[str, Any] | None:
+    """One route with all its schedules, or None if it does not exist."""
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        return None
+
+    route_ref = db.collection("users").document(user_id).collection("routes").document(route_id)
+    snapshot = route_ref.get()
+    if not snapshot.exists:
+        return None
+    route_data = snapshot.to_dict() or {}
+    route_data["id"] = route_id
+    route_data["schedules"] = [
+        {**(schedule_doc.to_dict() or {}), "id": schedule_doc.id}
+        for schedule_doc in route_ref.collection("schedules").stream()
+    ]
+    return route_data
+
+
+def get_all_route_changes(
+    since: datetime.datetime,
+) -> tuple[list[tuple[str, dict[str, Any]]], list[tuple[str, str]]]:
+    """Every user's routes written after `since` as (user id, route), and deletes as (user id, route id).
+
+    Collection-group queries on routes.updatedAt and deleted_routes.deletedAt;
+    both fields need a collection-group single-field index.
+    """
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        return [], []
+
+    changed: list[tuple[str, dict[str, Any]]] = []
+    for route_doc in db.collection_group("routes").where("updatedAt", ">", since).stream():
+        route_data = route_doc.to_dict() or {}
+        route_data["id"] = route_doc.id
+        route_data["schedules"] = [
+            {**(schedule_doc.to_dict() or {}), "id": schedule_doc.id}
+            for schedule_doc in route_doc.reference.collection("schedules").stream()
+        ]
+        changed.append((route_doc.reference.parent.parent.id, route_data))
+
+    changed_keys = {(user_id, route["id"]) for user_id, route in changed}
+    deleted = [
+        (doc.reference.parent.parent.id, doc.id)
+        for doc in db.collection_group("deleted_routes").where("deletedAt", ">", since).stream()
+    ]
+    # A route id re-created after its delete is reported as changed only.
+    return changed, [key for key in deleted if key not in changed_keys]
+
+
+def _resolve_user_id(email: str, user_id: str | None = None) -> str | None:
+    """Prefer the id from a verified session; fall back to an email lookup."""
+    if user_id:
+        return user_id
+    user = get_user_by_email(email)
+    resolved = user.get("id") if user else None
+    return resolved if isinstance(resolved, str) and resolved else None
+
+
+def _routes_changed(user_id: str, routes: dict[str, dict[str, Any] | None]) -> None:
+    """Refresh derived per-user state after route writes on this instance.
+
+    `routes` maps each written route id to the route as written, with all of
+    its schedules (None for a deleted route), so nothing is read back.
+    """
+    get_schedule_index_cache().invalidate(user_id)
+    table = get_occupancy_table()
+    for route_id, route in routes.items():
+        table.set_route(user_id, route_id, route)
+        sync_route_reminders(user_id, route_id)
+
+
+def _schedules_added(user_id: str, routes: dict[str, tuple[dict[str, Any], list[dict[str, Any]]]]) -> None:
+    """_routes_changed for writes that only added schedules: route id -> (route, new schedules)."""
+    get_schedule_index_cache().invalidate(user_id)
+    table = get_occupancy_table()
+    for route_id, (route, schedules) in routes.items():
+        table.add_schedules(user_id, route_id, route, schedules)
+        sync_route_reminders(user_id, route_id)
 
 
 def add_schedule(user_id: str, route_id: str, day_of_week: str, time_from: str, time_to: str) -> str | None:
+    added = _add_schedule(user_id, route_id, day_of_week, time_from, time_to)
+    if added is None:
+        return None
+    route, schedule = added
+    _schedules_added(user_id, {route_id: (route, [schedule])})
+    return schedule["id"]
+
+
+def _add_schedule(
+    user_id: str,
+    route_id: str,
+    day_of_week: str,
+    time_from: str,
+    time_to: str,
+) -> tuple[dict[str, Any], dict[str, Any]] | None:
+    """Write one schedule; returns (route, schedule) as stored, or None if the route does not exist."""
     initialize_firebase()
     db = get_firestore_client()
     if db is None:
         return None
 
     route_ref = db.collection("users").document(user_id).collection("routes").document(route_id)
-    if not route_ref.get().exists:
+    route_snapshot = route_ref.get()
+    if not route_snapshot.exists:
         return None
 
     schedule_id = str(uuid4())
     schedule_ref = route_ref.collection("schedules").document(schedule_id)
 
+    now = datetime.datetime.now(datetime.timezone.utc)
     schedule_data = {
         "dayOfWeek": day_of_week,
         "timeFrom": time_from,
         "timeTo": time_to,
-        "createdAt": datetime.datetime.now(datetime.timezone.utc),
-        "updatedAt": datetime.datetime.now(datetime.timezone.utc),
+        "createdAt": now,
+        "updatedAt": now,
     }
 
-    schedule_ref.set(schedule_data)
-    return schedule_id
+    # Bump the parent route so delta sync picks up schedule changes.
+    batch = db.batch()
+    batch.set(schedule_ref, schedule_data)
+    batch.update(route_ref, {"updatedAt": now})
+    batch.commit()
+    return route_snapshot.to_dict() or {}, {**schedule_data, "id": schedule_id}
 
 
 def create_route(
@@ -82,15 +188,15 @@ def create_route(
     departing_station: str,
     destination_station: str,
     route_desc: str,
+    user_id: str | None = None,
 ) -> str | None:
     initialize_firebase()
     db = get_firestore_client()
     if db is None:
         return None
 
-    user = get_user_by_email(email)
-    user_id = user.get("id") if user else None
-    if not isinstance(user_id, str) or not user_id:
+    user_id = _resolve_user_id(email, user_id)
+    if user_id is None:
         return None
 
     routes_ref = db.collection("users").document(user_id).collection("routes")
@@ -98,7 +204,7 @@ def create_route(
     route_ref = routes_ref.document(route_id)
 
     time_from = time.strftime("%H:%M")
-    time_to = calcTimeTo(time_from, departing_station, destination_station)
+    time_to = calc_time_to(time_from, departing_station, destination_station)
     days = [day.strip() for day in day_of_week.split(",") if day.strip()]
     if not days:
         return None
@@ -108,6 +214,7 @@ def create_route(
         "destinationLocation": destination_location,
         "departingStation": departing_station,
         "destinationStation": destination_station,
+        "stationSequence": route_station_sequence(departing_station, destination_station),
         "description": route_desc,
         "updatedAt": datetime.datetime.now(datetime.timezone.utc),
     }
@@ -116,16 +223,177 @@ def create_route(
     route_ref.set(route_data)
 
     schedules_ref = route_ref.collection("schedules")
+    schedules: list[dict[str, Any]] = []
     for day in days:
         existing_schedules = (
             schedules_ref.where("dayOfWeek", "==", day).where("timeFrom", "==", time_from).limit(1).stream()
         )
         if not any(existing_schedules):
-            add_schedule(user_id, route_id, day, time_from, time_to)
+            added = _add_schedule(user_id, route_id, day, time_from, time_to)
+            if added is not None:
+                schedules.append(added[1])
 
+    _routes_changed(user_id, {route_id: {**route_data, "schedules": schedules}})
     return route_id
 
 
+def _commit_writes(db: Any, writes: list[tuple[str, Any, dict[str, Any]]]) -> None:
+    """Commit (op, ref, data) writes as few Firestore batches as possible."""
+    for start in range(0, len(writes), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for op, ref, data in writes[start:start + MAX_BATCH_WRITES]:
+            if op == "set":
+                batch.set(ref, data)
+            elif op == "delete":
+                batch.delete(ref)
+            else:
+                batch.update(ref, data)
+        batch.commit()
+
+
+def _is_valid_time(value: str) -> bool:
+    try:
+        datetime.datetime.strptime(value, "%H:%M")
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def create_routes_batch(
+    email: str,
+    routes: list[dict[str, Any]],
+    user_id: str | None = None,
+) -> list[dict[str, Any]] | None:
+    """Create many routes for one user with a single user lookup and batched writes.
+
+    Each item takes the same fields as create_route. Returns one result per
+    item (in input order), or None when the user does not exist.
+    """
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        return None
+
+    user_id = _resolve_user_id(email, user_id)
+    if user_id is None:
+        return None
+
+    routes_ref = db.collection("users").document(user_id).collection("routes")
+    now = datetime.datetime.now(datetime.timezone.utc)
+    writes: list[tuple[str, Any, dict[str, Any]]] = []
+    results: list[dict[str, Any]] = []
+    created: dict[str, dict[str, Any]] = {}
+
+    for index, item in enumerate(routes):
+        days = list(dict.fromkeys(day.strip() for day in item["day_of_week"].split(",") if day.strip()))
+        time_from = item["time"].strftime("%H:%M")
+        try:
+            time_to = calc_time_to(time_from, item["departing_station"], item["destination_station"])
+        except (ValueError, IndexError):
+            results.append({"index": index, "status": "invalid", "error": "Invalid station code"})
+            continue
+        if not days:
+            results.append({"index": index, "status": "invalid", "error": "No day_of_week given"})
+            continue
+        if any(day not in DAYS_ORDER for day in days):
+            results.append({"index": index, "status": "invalid", "error": "Invalid day_of_week"})
+            continue
+
+        route_id = str(uuid4())
+        route_ref = routes_ref.document(route_id)
+        route_data = {
+            "departingLocation": item["departing_location"],
+            "destinationLocation": item["destination_location"],
+            "departingStation": item["departing_station"],
+            "destinationStation": item["destination_station"],
+            "stationSequence": route_station_sequence(item["departing_station"], item["destination_station"]),
+            "description": item["route_desc"],
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        writes.append(("set", route_ref, route_data))
+        schedules = []
+        for day in days:
+            schedule_data = {
+                "dayOfWeek": day,
+                "timeFrom": time_from,
+                "timeTo": time_to,
+                "createdAt": now,
+                "updatedAt": now,
+            }
+            writes.append(("set", route_ref.collection("schedules").document(str(uuid4())), schedule_data))
+            schedules.append(schedule_data)
+        created[route_id] = {**route_data, "schedules": schedules}
+        results.append({"index": index, "status": "created", "route_id": route_id})
+
+    _commit_writes(db, writes)
+    _routes_changed(user_id, created)
+    return results
+
+
+def add_schedules_batch(user_id: str, schedules: list[dict[str, Any]]) -> list[dict[str, Any]] | None:
+    """Add many schedules across a user's routes with one read and batched writes.
+
+    Route existence is checked for all referenced routes in a single get_all.
+    Returns one result per item (in input order).
+    """
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        return None
+
+    routes_ref = db.collection("users").document(user_id).collection("routes")
+    route_ids = list(dict.fromkeys(item["route_id"] for item in schedules))
+    existing_routes = {
+        snapshot.id: snapshot.to_dict() or {}
+        for snapshot in db.get_all([routes_ref.document(route_id) for route_id in route_ids])
+        if snapshot.exists
+    }
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    writes: list[tuple[str, Any, dict[str, Any]]] = []
+    results: list[dict[str, Any]] = []
+    seen: set[tuple[str, str, str]] = set()
+    added: dict[str, tuple[dict[str, Any], list[dict[str, Any]]]] = {}
+
+    for index, item in enumerate(schedules):
+        route_id = item["route_id"]
+        day = item["day_of_week"].strip()
+        time_from = item["time_from"]
+        time_to = item["time_to"]
+        key = (route_id, day, time_from)
+
+        error = None
+        if route_id not in existing_routes:
+            error = "Route not found"
+        elif day not in DAYS_ORDER:
+            error = "Invalid day_of_week"
+        elif not _is_valid_time(time_from) or not _is_valid_time(time_to):
+            error = "Times must be HH:MM"
+        elif key in seen:
+            error = "Duplicate schedule in request"
+        if error is not None:
+            results.append({"index": index, "status": "invalid", "error": error})
+            continue
+
+        seen.add(key)
+        schedule_id = str(uuid4())
+        schedule_data = {"dayOfWeek": day, "timeFrom": time_from, "timeTo": time_to, "createdAt": now, "updatedAt": now}
+        writes.append(
+            ("set", routes_ref.document(route_id).collection("schedules").document(schedule_id), schedule_data)
+        )
+        added.setdefault(route_id, (existing_routes[route_id], []))[1].append({**schedule_data, "id": schedule_id})
+        results.append({"index": index, "status": "created", "schedule_id": schedule_id})
+
+    # Bump each touched route once so delta sync picks up the new schedules.
+    for route_id in added:
+        writes.append(("update", routes_ref.document(route_id), {"updatedAt": now}))
+
+    _commit_writes(db, writes)
+    _schedules_added(user_id, added)
+    return results
+
+
 def edit_route(
     email: str,
     route_id: str,
@@ -136,15 +404,15 @@ def edit_route(
     departing_station: str,
     destination_station: str,
     route_desc: str,
+    user_id: str | None = None,
 ) -> str | None:
     initialize_firebase()
     db = get_firestore_client()
     if db is None:
         return None
 
-    user = get_user_by_email(email)
-    user_id = user.get("id") if user else None
-    if not isinstance(user_id, str) or not user_id:
+    user_id = _resolve_user_id(email, user_id)
+    if user_id is None:
         return None
 
     route_ref = db.collection("users").document(user_id).collection("routes").document(route_id)
@@ -152,7 +420,7 @@ def edit_route(
         return None
 
     time_from = time.strftime("%H:%M")
-    time_to = calcTimeTo(time_from, departing_station, destination_station)
+    time_to = calc_time_to(time_from, departing_station, destination_station)
     days = [day.strip() for day in day_of_week.split(",") if day.strip()]
     if not days:
         return None
@@ -162,6 +430,7 @@ def edit_route(
         "destinationLocation": destination_location,
         "departingStation": departing_station,
         "destinationStation": destination_station,
+        "stationSequence": route_station_sequence(departing_station, destination_station),
         "description": route_desc,
         "updatedAt": datetime.datetime.now(datetime.timezone.utc),
     }
@@ -195,7 +464,7 @@ def edit_route(
                 }
             )
         else:
-            add_schedule(user_id, route_id, primary_day, time_from, time_to)
+            _add_schedule(user_id, route_id, primary_day, time_from, time_to)
 
     for extra_day in days[1:]:
         existing_extra = next(
@@ -203,20 +472,21 @@ def edit_route(
             None,
         )
         if existing_extra is None:
-            add_schedule(user_id, route_id, extra_day, time_from, time_to)
+            _add_schedule(user_id, route_id, extra_day, time_from, time_to)
 
+    # An edit rewrites schedules it found by query, so the route is read back once.
+    _routes_changed(user_id, {route_id: get_route_with_schedules(user_id, route_id)})
     return route_id
 
 
-def delete_route(email: str, route_id: str) -> bool:
+def delete_route(email: str, route_id: str, user_id: str | None = None) -> bool:
     initialize_firebase()
     db = get_firestore_client()
     if db is None:
         return False
 
-    user = get_user_by_email(email)
-    user_id = user.get("id") if user else None
-    if not isinstance(user_id, str) or not user_id:
+    user_id = _resolve_user_id(email, user_id)
+    if user_id is None:
         return False
 
     route_ref = db.collection("users").document(user_id).collection("routes").document(route_id)
@@ -224,22 +494,29 @@ def delete_route(email: str, route_id: str) -> bool:
     if not route_snapshot.exists:
         return False
 
-    for schedule_doc in route_ref.collection("schedules").stream():
-        schedule_doc.reference.delete()
-
-    route_ref.delete()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    expires_at = now + datetime.timedelta(days=get_settings().DELTA_SYNC_RETENTION_DAYS)
+    writes: list[tuple[str, Any, dict[str, Any]]] = [
+        ("delete", schedule_doc.reference, {}) for schedule_doc in route_ref.collection("schedules").stream()
+    ]
+    # Tombstone so delta-sync clients learn about the delete. A route's schedules
+    # fit in one batch with it, so the route never disappears without its tombstone.
+    tombstone_ref = db.collection("users").document(user_id).collection("deleted_routes").document(route_id)
+    writes.append(("delete", route_ref, {}))
+    writes.append(("set", tombstone_ref, {"deletedAt": now, "expiresAt": expires_at}))
+    _commit_writes(db, writes)
+    _routes_changed(user_id, {route_id: None})
     return True
 
 
-def get_specific_route(email: str, route_id: str) -> dict[str, Any] | None:
+def get_specific_route(email: str, route_id: str, user_id: str | None = None) -> dict[str, Any] | None:
     initialize_firebase()
     db = get_firestore_client()
     if db is None:
         return None
 
-    user = get_user_by_email(email)
-    user_id = user.get("id") if user else None
-    if not isinstance(user_id, str) or not user_id:
+    user_id = _resolve_user_id(email, user_id)
+    if user_id is None:
         return None
 
     route_ref = db.collection("users").document(user_id).collection("routes").document(route_id)
@@ -258,12 +535,43 @@ def get_specific_route(email: str, route_id: str) -> dict[str, Any] | None:
     return _flatten_route_schedule_fields(route_data, schedules)
 
 
-def get_all_routes_by_email(email: str) -> list[dict[str, Any]]:
-    user = get_user_by_email(email)
-    user_id = user.get("id") if user else None
-    if not isinstance(user_id, str) or not user_id:
+def get_all_routes_by_email(email: str, user_id: str | None = None) -> list[dict[str, Any]]:
+    user_id = _resolve_user_id(email, user_id)
+    if user_id is None:
         return []
-    raw_routes = get_user_routes_with_schedules(user_id)
+    return _flatten_routes(get_user_routes_with_schedules(user_id))
+
+
+def get_route_changes_by_email(
+    email: str,
+    since: datetime.datetime,
+    user_id: str | None = None,
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """Return routes created/updated after `since` and ids of routes deleted after it."""
+    initialize_firebase()
+    db = get_firestore_client()
+    if db is None:
+        return [], []
+
+    user_id = _resolve_user_id(email, user_id)
+    if user_id is None:
+        return [], []
+
+    changed = _flatten_routes(get_user_routes_with_schedules(user_id, updated_since=since))
+    tombstones = (
+        db.collection("users")
+        .document(user_id)
+        .collection("deleted_routes")
+        .where("deletedAt", ">", since)
+        .stream()
+    )
+    changed_ids = {route["id"] for route in changed}
+    # A route id re-created after its delete is reported as changed only.
+    deleted_ids = [doc.id for doc in tombstones if doc.id not in changed_ids]
+    return changed, deleted_ids
+
+
+def _flatten_routes(raw_routes: list[dict[str, Any]]) -> list[dict[str, Any]]:
     flattened_routes: list[dict[str, Any]] = []
 
     for route in raw_routes:
@@ -293,57 +601,42 @@ def _flatten_route_schedule_fields(route_data: dict[str, Any], schedules: list[d
     return route_data
 
 
-def get_next_upcoming_route(email: str, timestamp: float) -> dict[str, Any] | None:
-    dt = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
-    current_day = dt.strftime("%A")
-    current_time_str = dt.strftime("%H:%M")
+def _user_schedule_index(user_id: str) -> WeeklyScheduleIndex:
+    cache = get_schedule_index_cache()
+    index, generation = cache.get(user_id)
+    if index is None:
+        index = WeeklyScheduleIndex(get_user_routes_with_schedules(user_id))
+        # Dropped if a route write invalidated the user while this was read.
+        cache.put(user_id, index, generation)
+    return index
 
-    user = get_user_by_email(email)
-    user_id = user.get("id") if user else None
-    if not isinstance(user_id, str) or not user_id:
-        return None
 
-    routes = get_user_routes_with_schedules(user_id)
-    if not routes:
+def _upcoming_candidate(index: WeeklyScheduleIndex, minute: int) -> dict[str, Any] | None:
+    departure = index.next_after(minute)
+    if departure is None:
         return None
-
-    try:
-        current_day_idx = DAYS_ORDER.index(current_day)
-    except ValueError:
+    candidate = departure.route.copy()
+    candidate.pop("schedules", None)
+    candidate["routeId"] = str(departure.route.get("id", ""))
+    candidate.update(departure.schedule)
+    candidate["scheduleId"] = str(departure.schedule.get("id", ""))
+    candidate.pop("id", None)
+    return candidate
+
+
+def get_next_upcoming_route(email: str, timestamp: float, user_id: str | None = None) -> dict[str, Any] | None:
+    user_id = _resolve_user_id(email, user_id)
+    if user_id is None:
         return None
 
-    current_hour, current_min = map(int, current_time_str.split(":"))
-    current_total_min = (current_day_idx * MINUTES_IN_DAY) + (current_hour * 60) + current_min
-
-    best_candidate = None
-    min_wait = float("inf")
-
-    for route in routes:
-        schedules = route.get("schedules", [])
-        for schedule in schedules:
-            day = schedule.get("dayOfWeek")
-            time_str = schedule.get("timeFrom")
-            if not day or not time_str:
-                continue
-
-            try:
-                day_idx = DAYS_ORDER.index(str(day))
-                hour, minute = map(int, str(time_str).split(":"))
-            except (ValueError, AttributeError):
-                continue
-
-            schedule_total_min = (day_idx * MINUTES_IN_DAY) + (hour * 60) + minute
-            wait = (schedule_total_min - current_total_min) % MINUTES_IN_WEEK
-
-            if float(wait) < min_wait:
-                min_wait = float(wait)
-                candidate = route.copy()
-                candidate.pop("schedules", None)
-                candidate["routeId"] = str(route.get("id", ""))
-                candidate.update(schedule)
-                candidate["scheduleId"] = str(schedule.get("id", ""))
-                if "id" in candidate:
-                    del candidate["id"]
-                best_candidate = candidate
-
-    return best_candidate
+    return _upcoming_candidate(_user_schedule_index(user_id), rider_week_minute(timestamp))
+
+
+def get_next_upcoming_routes_batch(user_ids: list[str], timestamp: float) -> dict[str, dict[str, Any] | None]:
+    """Next departure for each user at one moment, e.g. for a reminder sweep.
+
+    The weekly minute is computed once; each user costs a cached-index bisect,
+    plus one route load the first time (or after the cache entry expires).
+    """
+    minute = rider_week_minute(timestamp)
+    return {user_id: _upcoming_candidate(_user_schedule_index(user_id), minute) for user_id in dict.fromkeys(user_ids)}
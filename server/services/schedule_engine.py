@@ -0,0 +1,95 @@
+"""Schedule evaluation in the riders' timezone on integer week minutes.
+
+Schedules are stored as local wall-clock values ("Monday", "08:00" to
+"08:40") in the riders' timezone (RIDER_TIMEZONE). Every check converts the
+moment being evaluated into that timezone once, as a minute offset from
+Monday 00:00, and compares it with schedule windows parsed into the same
+offsets. Parsed windows are cached, so a sweep over many users does no
+string formatting or parsing per schedule.
+"""
+
+import datetime
+from functools import lru_cache
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from core.config import get_settings
+
+DAYS_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MINUTES_IN_DAY = 1440
+MINUTES_IN_WEEK = 7 * MINUTES_IN_DAY
+
+_DAY_INDEX = {day: position for position, day in enumerate(DAYS_ORDER)}
+
+
+@lru_cache(maxsize=1)
+def rider_timezone() -> ZoneInfo:
+    return ZoneInfo(get_settings().RIDER_TIMEZONE)
+
+
+def week_minute(moment: datetime.datetime) -> int:
+    """Minutes since Monday 00:00 in `moment`'s own timezone."""
+    return moment.weekday() * MINUTES_IN_DAY + moment.hour * 60 + moment.minute
+
+
+def rider_week_minute(timestamp: float | None = None) -> int:
+    """Week minute of a Unix timestamp (default: now) in the riders' timezone."""
+    if timestamp is None:
+        moment = datetime.datetime.now(rider_timezone())
+    else:
+        moment = datetime.datetime.fromtimestamp(timestamp, tz=rider_timezone())
+    return week_minute(moment)
+
+
+def rider_wall_minute(timestamp: float | None = None) -> int:
+    """Rider-local wall-clock minutes since 0001-01-01 00:00 (a Monday).
+
+    Increases across weeks, and `rider_wall_minute(ts) % MINUTES_IN_WEEK`
+    equals `rider_week_minute(ts)`, so week minutes map onto it directly.
+    """
+    if timestamp is None:
+        moment = datetime.datetime.now(rider_timezone())
+    else:
+        moment = datetime.datetime.fromtimestamp(timestamp, tz=rider_timezone())
+    return (moment.toordinal() - 1) * MINUTES_IN_DAY + moment.hour * 60 + moment.minute
+
+
+@lru_cache(maxsize=8192)
+def _day_minute(time_str: str) -> int | None:
+    try:
+        hour, minute = map(int, time_str.split(":"))
+    except ValueError:
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour * 60 + minute
+
+
+def schedule_week_minute(day: Any, time_str: Any) -> int | None:
+    day_index = _DAY_INDEX.get(str(day))
+    if day_index is None or not time_str:
+        return None
+    minute = _day_minute(str(time_str))
+    return None if minute is None else day_index * MINUTES_IN_DAY + minute
+
+
+def schedule_window(schedule: dict[str, Any]) -> tuple[int, int] | None:
+    """(start, end) week minutes of a schedule; trips past midnight end the next day."""
+    start = schedule_week_minute(schedule.get("dayOfWeek"), schedule.get("timeFrom"))
+    if start is None or not schedule.get("timeTo"):
+        return None
+    end_of_day = _day_minute(str(schedule["timeTo"]))
+    if end_of_day is None:
+        return None
+    duration = (end_of_day - start % MINUTES_IN_DAY) % MINUTES_IN_DAY
+    return start, start + duration
+
+
+def is_schedule_active(schedule: dict[str, Any], minute: int) -> bool:
+    """True if `minute` (a rider week minute) falls inside the schedule's window."""
+    window = schedule_window(schedule)
+    if window is None:
+        return False
+    start, end = window
+    # Sunday-night windows run on into Monday, i.e. past MINUTES_IN_WEEK.
+    return start <= minute <= end or start <= minute + MINUTES_IN_WEEK <= end
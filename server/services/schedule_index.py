@@ -0,0 +1,123 @@
+"""Per-user weekly departure index for "next upcoming route" lookups.
+
+Every schedule becomes one point on the weekly minute axis of
+schedule_engine (rider-local Monday 00:00 is 0)
+held in a sorted list, so the next departure after any moment is a bisect
+instead of a scan over every route and schedule. Indexes are cached per user
+in a bounded LRU with a TTL; route writes on this instance invalidate the
+user's entry immediately, and the TTL bounds staleness from other instances.
+Invalidation also bumps the user's generation, so an index built from routes
+read before a write is not cached after it.
+"""
+
+import bisect
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from core.config import get_settings
+from services.schedule_engine import MINUTES_IN_WEEK, schedule_week_minute
+
+@dataclass(frozen=True)
+class Departure:
+    route: dict[str, Any]
+    schedule: dict[str, Any]
+    wait_minutes: int
+
+
+class WeeklyScheduleIndex:
+    def __init__(self, routes: list[dict[str, Any]]) -> None:
+        points: list[tuple[int, int, dict[str, Any], dict[str, Any]]] = []
+        for route in routes:
+            for schedule in route.get("schedules", []):
+                minute = schedule_week_minute(schedule.get("dayOfWeek"), schedule.get("timeFrom"))
+                if minute is not None:
+                    # The running count keeps input order among equal minutes.
+                    points.append((minute, len(points), route, schedule))
+        points.sort(key=lambda point: (point[0], point[1]))
+        self._minutes = [point[0] for point in points]
+        self._entries = [(point[2], point[3]) for point in points]
+
+    def __len__(self) -> int:
+        return len(self._minutes)
+
+    def next_after(self, minute: int) -> Departure | None:
+        """First departure at or after `minute`, wrapping into next week."""
+        if not self._minutes:
+            return None
+        position = bisect.bisect_left(self._minutes, minute)
+        if position == len(self._minutes):
+            position = 0
+        route, schedule = self._entries[position]
+        return Departure(route=route, schedule=schedule, wait_minutes=(self._minutes[position] - minute) % MINUTES_IN_WEEK)
+
+
+class ScheduleIndexCache:
+    def __init__(self, ttl_seconds: float, max_users: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._entries: OrderedDict[str, tuple[float, WeeklyScheduleIndex]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Generations come from one counter; users pruned from the map share
+        # the floor, which is at least any generation they ever had.
+        self._counter = itertools.count(1)
+        self._generations: OrderedDict[str, int] = OrderedDict()
+        self._generation_floor = 0
+
+    def get(self, user_id: str) -> tuple[WeeklyScheduleIndex | None, int]:
+        """Return the cached index, if any, and the generation to pass to put."""
+        with self._lock:
+            generation = self._generations.get(user_id, self._generation_floor)
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None, generation
+            expires_at, index = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None, generation
+            self._entries.move_to_end(user_id)
+            return index, generation
+
+    def put(self, user_id: str, index: WeeklyScheduleIndex, generation: int) -> None:
+        """Cache an index unless the user was invalidated since get returned `generation`."""
+        with self._lock:
+            if self._generations.get(user_id, self._generation_floor) != generation:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, index)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._generations[user_id] = next(self._counter)
+            self._generations.move_to_end(user_id)
+            while len(self._generations) > self.max_users:
+                _, pruned = self._generations.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, pruned)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton cache (process-wide; route writes invalidate entries)
+_schedule_index_cache: ScheduleIndexCache | None = None
+_schedule_index_cache_lock = threading.Lock()
+
+
+def get_schedule_index_cache() -> ScheduleIndexCache:
+    global _schedule_index_cache
+
+    if _schedule_index_cache is None:
+        with _schedule_index_cache_lock:
+            if _schedule_index_cache is None:
+                settings = get_settings()
+                _schedule_index_cache = ScheduleIndexCache(
+                    ttl_seconds=settings.SCHEDULE_INDEX_TTL_SECONDS,
+                    max_users=settings.SCHEDULE_INDEX_MAX_USERS,
+                )
+    return _schedule_index_cache
@@ -0,0 +1,124 @@
+"""Versioned, pre-serialized station catalog for clients.
+
+The catalog is built once per process from data/stations.json. Its version is
+a hash of the canonical content, so clients can keep their copy until the
+version (and therefore the ETag) changes. Each encoding is serialized and
+gzipped once up front; requests only pick the right bytes.
+
+Encodings:
+- "rows": {"version", "count", "stations": [{code, name, line, latitude, longitude}, ...]}
+- "columnar": {"version", "count", "lines": [...], "columns": {"code": [...], "name": [...],
+  "line": [index into lines, ...], "latitude": [...], "longitude": [...]}}
+"""
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from services.google_maps_service import load_stations
+
+FORMAT_ROWS = "rows"
+FORMAT_COLUMNAR = "columnar"
+CATALOG_FORMATS = (FORMAT_ROWS, FORMAT_COLUMNAR)
+
+_FIELDS = ("code", "name", "line", "latitude", "longitude")
+_GZIP_SUFFIX = "-gz"
+
+
+def _dumps(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+@dataclass(frozen=True)
+class CatalogBody:
+    etag: str
+    body: bytes
+    gzip_etag: str
+    gzip_body: bytes
+
+
+class StationCatalog:
+    def __init__(self, stations: list[dict[str, Any]]) -> None:
+        rows = [{field: station.get(field) for field in _FIELDS} for station in stations]
+        self.version = hashlib.sha256(_dumps(rows)).hexdigest()[:16]
+        self.count = len(rows)
+
+        lines = sorted({str(row["line"]) for row in rows if row["line"]})
+        line_index = {line: position for position, line in enumerate(lines)}
+        columnar = {
+            "version": self.version,
+            "count": self.count,
+            "lines": lines,
+            "columns": {
+                "code": [row["code"] for row in rows],
+                "name": [row["name"] for row in rows],
+                "line": [line_index.get(str(row["line"])) for row in rows],
+                "latitude": [row["latitude"] for row in rows],
+                "longitude": [row["longitude"] for row in rows],
+            },
+        }
+        payloads = {
+            FORMAT_ROWS: {"version": self.version, "count": self.count, "stations": rows},
+            FORMAT_COLUMNAR: columnar,
+        }
+        self._bodies = {name: self._encode(name, payload) for name, payload in payloads.items()}
+
+    def _encode(self, name: str, payload: dict[str, Any]) -> CatalogBody:
+        body = _dumps(payload)
+        etag = f'"{self.version}-{name}"'
+        return CatalogBody(
+            etag=etag,
+            body=body,
+            gzip_etag=f'"{self.version}-{name}{_GZIP_SUFFIX}"',
+            # mtime=0 keeps the gzip bytes identical across restarts.
+            gzip_body=gzip.compress(body, compresslevel=9, mtime=0),
+        )
+
+    def get(self, format: str) -> CatalogBody:
+        if format not in self._bodies:
+            raise ValueError(f"Unknown catalog format: {format}")
+        return self._bodies[format]
+
+    def is_current(self, format: str, if_none_match: str | None) -> bool:
+        """True if an If-None-Match header names this version of `format`, in any encoding."""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        current = self.get(format)
+        for tag in if_none_match.split(","):
+            tag = tag.strip().removeprefix("W/")
+            if tag in (current.etag, current.gzip_etag):
+                return True
+        return False
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """Whether an Accept-Encoding header allows gzip (q=0 refuses it)."""
+    qualities: dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+@lru_cache(maxsize=1)
+def get_station_catalog() -> StationCatalog:
+    """Build and serialize the catalog once per process."""
+    return StationCatalog(load_stations())
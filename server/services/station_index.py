@@ -0,0 +1,223 @@
+"""Spatial index over the stations dataset.
+
+Stations are placed on the unit sphere as 3D Cartesian points and stored in a
+KD-tree. Straight-line (chord) distance between such points increases
+monotonically with great-circle distance, so nearest / radius results are
+exact haversine results without any projection error, and queries cost
+O(log n) instead of a scan over every station. One tree covers all stations
+and one more per line serves line-filtered queries.
+
+For thousands of points at once (analytics, bulk imports) `nearest_batch`
+skips the tree and takes the largest dot product against a precomputed
+station matrix with NumPy, in chunks to bound memory.
+"""
+
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Upper bound on query x station cells per NumPy chunk (~32 MB of float64).
+BATCH_CHUNK_CELLS = 4_000_000
+
+Point = tuple[float, float, float]
+
+
+def to_unit_vector(latitude: float, longitude: float) -> Point:
+    lat = math.radians(latitude)
+    lng = math.radians(longitude)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lng), cos_lat * math.sin(lng), math.sin(lat))
+
+
+def chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+
+def km_to_chord(distance_km: float) -> float:
+    return 2 * math.sin(min(distance_km / (2 * EARTH_RADIUS_KM), math.pi / 2))
+
+
+@dataclass
+class _Node:
+    point: Point
+    item: int
+    axis: int
+    left: "_Node | None"
+    right: "_Node | None"
+
+
+class KDTree:
+    """Static 3-d tree over (point, item index) pairs."""
+
+    def __init__(self, points: list[Point], items: list[int]) -> None:
+        self.size = len(points)
+        self._root = self._build(list(zip(points, items)), depth=0)
+
+    def _build(self, entries: list[tuple[Point, int]], depth: int) -> _Node | None:
+        if not entries:
+            return None
+        axis = depth % 3
+        entries.sort(key=lambda entry: entry[0][axis])
+        mid = len(entries) // 2
+        point, item = entries[mid]
+        return _Node(
+            point=point,
+            item=item,
+            axis=axis,
+            left=self._build(entries[:mid], depth + 1),
+            right=self._build(entries[mid + 1 :], depth + 1),
+        )
+
+    def nearest(self, target: Point, k: int = 1) -> list[tuple[float, int]]:
+        """Return up to k (squared chord distance, item) pairs, closest first."""
+        # Max-heap of the best k so far, stored as negated distances.
+        best: list[tuple[float, int]] = []
+
+        def visit(node: _Node | None) -> None:
+            if node is None:
+                return
+            dist_sq = _dist_sq(node.point, target)
+            if len(best) < k:
+                heapq.heappush(best, (-dist_sq, node.item))
+            elif dist_sq < -best[0][0]:
+                heapq.heapreplace(best, (-dist_sq, node.item))
+
+            diff = target[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            visit(near)
+            if len(best) < k or diff * diff < -best[0][0]:
+                visit(far)
+
+        visit(self._root)
+        return sorted((-neg_dist, item) for neg_dist, item in best)
+
+    def within(self, target: Point, radius: float) -> list[tuple[float, int]]:
+        """Return (squared chord distance, item) pairs within `radius`, closest first."""
+        radius_sq = radius * radius
+        found: list[tuple[float, int]] = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            dist_sq = _dist_sq(node.point, target)
+            if dist_sq <= radius_sq:
+                found.append((dist_sq, node.item))
+            diff = target[node.axis] - node.point[node.axis]
+            if diff < 0 or diff * diff <= radius_sq:
+                stack.append(node.left)
+            if diff >= 0 or diff * diff <= radius_sq:
+                stack.append(node.right)
+        found.sort()
+        return found
+
+
+def _unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    lat = np.radians(latitudes)
+    lng = np.radians(longitudes)
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)), axis=-1)
+
+
+def _dist_sq(a: Point, b: Point) -> float:
+    dx = a[0] - b[0]
+    dy = a[1] - b[1]
+    dz = a[2] - b[2]
+    return dx * dx + dy * dy + dz * dz
+
+
+class StationIndex:
+    """k-nearest and within-radius station queries, optionally per line."""
+
+    def __init__(self, stations: list[dict[str, Any]]) -> None:
+        self.stations = stations
+        points = [to_unit_vector(float(s["latitude"]), float(s["longitude"])) for s in stations]
+        self._tree = KDTree(points, list(range(len(stations))))
+
+        by_line: dict[str, list[int]] = {}
+        for position, station in enumerate(stations):
+            by_line.setdefault(str(station.get("line") or ""), []).append(position)
+        self._line_trees = {
+            line: KDTree([points[i] for i in positions], positions) for line, positions in by_line.items()
+        }
+        self._vectors = np.array(points, dtype=np.float64).reshape(-1, 3)
+        self._line_positions = {line: np.array(positions, dtype=np.intp) for line, positions in by_line.items()}
+
+    @property
+    def lines(self) -> list[str]:
+        return sorted(line for line in self._line_trees if line)
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 1,
+        line: str | None = None,
+    ) -> list[tuple[dict[str, Any], float]]:
+        """Return up to k (station, distance_km) pairs, closest first."""
+        tree = self._tree_for(line)
+        if tree is None or k <= 0:
+            return []
+        hits = tree.nearest(to_unit_vector(latitude, longitude), k)
+        return [(self.stations[item], chord_to_km(math.sqrt(dist_sq))) for dist_sq, item in hits]
+
+    def within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        line: str | None = None,
+    ) -> list[tuple[dict[str, Any], float]]:
+        """Return (station, distance_km) pairs within radius_km, closest first."""
+        tree = self._tree_for(line)
+        if tree is None or radius_km < 0:
+            return []
+        hits = tree.within(to_unit_vector(latitude, longitude), km_to_chord(radius_km))
+        return [(self.stations[item], chord_to_km(math.sqrt(dist_sq))) for dist_sq, item in hits]
+
+    def nearest_batch(
+        self,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        line: str | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return (station positions, distances_km) for each query point.
+
+        Positions index into `stations`. An unknown line or an empty dataset
+        yields -1 positions and NaN distances.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64).ravel()
+        longitudes = np.asarray(longitudes, dtype=np.float64).ravel()
+        if latitudes.shape != longitudes.shape:
+            raise ValueError("latitudes and longitudes must have the same length")
+
+        count = latitudes.shape[0]
+        positions = np.full(count, -1, dtype=np.intp)
+        distances = np.full(count, np.nan, dtype=np.float64)
+        candidates = np.arange(len(self.stations), dtype=np.intp) if line is None else self._line_positions.get(line)
+        if candidates is None or candidates.size == 0 or count == 0:
+            return positions, distances
+
+        station_vectors = self._vectors[candidates]
+        chunk = max(1, BATCH_CHUNK_CELLS // candidates.size)
+        for start in range(0, count, chunk):
+            stop = min(start + chunk, count)
+            queries = _unit_vectors(latitudes[start:stop], longitudes[start:stop])
+            # Largest dot product == smallest angle == nearest station.
+            dots = queries @ station_vectors.T
+            best = np.argmax(dots, axis=1)
+            best_dot = np.clip(dots[np.arange(stop - start), best], -1.0, 1.0)
+            chord = np.sqrt(np.maximum(2.0 - 2.0 * best_dot, 0.0))
+            positions[start:stop] = candidates[best]
+            distances[start:stop] = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+        return positions, distances
+
+    def _tree_for(self, line: str | None) -> KDTree | None:
+        if line is None:
+            return self._tree
+        return self._line_trees.get(line)
@@ -0,0 +1,152 @@
+"""Offline fuzzy search over station names, codes and aliases.
+
+Many autocomplete queries are just station names, which we already have
+locally. Every searchable term (name, code, aliases from
+data/station_aliases.json in English, Malay and Chinese) is normalized and
+broken into padded character trigrams held in an inverted index. A query
+scores candidates by trigram Dice similarity, with a boost for prefix
+matches so partially typed names rank well, and every query word must be
+covered by the term so "Bangsar South" does not resolve to a station.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from core.config import get_settings
+
+# Station suggestions use this place_id prefix; geocoding resolves them
+# locally instead of calling Google.
+STATION_PLACE_ID_PREFIX = "station:"
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_ABBREVIATIONS = {"kg": "kampung", "tmn": "taman", "jln": "jalan", "univ": "universiti"}
+_NOISE_WORDS = {"lrt", "mrt", "stesen", "station", "stn"}
+
+
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    words = _NON_WORD.sub(" ", stripped.replace("'", "")).split()
+    return " ".join(_ABBREVIATIONS.get(word, word) for word in words if word not in _NOISE_WORDS)
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+@dataclass(frozen=True)
+class _Term:
+    text: str
+    grams: frozenset[str]
+    words: tuple[str, ...]
+    station: int
+
+
+class StationSearchIndex:
+    """Trigram inverted index over station search terms."""
+
+    def __init__(
+        self,
+        stations: list[dict[str, Any]],
+        aliases: dict[str, list[str]],
+        min_score: float = 0.5,
+    ) -> None:
+        self.stations = stations
+        self.min_score = min_score
+        self._terms: list[_Term] = []
+        self._postings: dict[str, list[int]] = {}
+
+        for position, station in enumerate(stations):
+            code = str(station.get("code") or "")
+            raw_terms = [str(station.get("name") or ""), code, *aliases.get(code, [])]
+            seen: set[str] = set()
+            for raw in raw_terms:
+                text = normalize(raw)
+                # "SS 15" should also match "ss15".
+                for variant in (text, text.replace(" ", "")):
+                    if variant and variant not in seen:
+                        seen.add(variant)
+                        self._add_term(variant, position)
+
+    def _add_term(self, text: str, station: int) -> None:
+        grams = frozenset(trigrams(text))
+        term_id = len(self._terms)
+        self._terms.append(_Term(text=text, grams=grams, words=tuple(text.split()), station=station))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(term_id)
+
+    def search(self, query: str, limit: int = 5) -> list[tuple[dict[str, Any], float]]:
+        """Return up to `limit` (station, score) pairs, best first."""
+        text = normalize(query)
+        if len(text) < 2:
+            return []
+        query_grams = trigrams(text)
+        query_words = text.split()
+
+        candidates: set[int] = set()
+        for gram in query_grams:
+            candidates.update(self._postings.get(gram, ()))
+
+        best: dict[int, float] = {}
+        for term_id in candidates:
+            term = self._terms[term_id]
+            if not _covers(term.words, query_words):
+                continue
+            if term.text.startswith(text):
+                score = 0.8 + 0.2 * len(text) / len(term.text)
+            else:
+                score = _dice(query_grams, term.grams)
+            if score >= self.min_score and score > best.get(term.station, 0.0):
+                best[term.station] = score
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.stations[position], score) for position, score in ranked]
+
+
+def _covers(term_words: tuple[str, ...], query_words: list[str]) -> bool:
+    """Each query word must prefix, or closely resemble, some word of the term."""
+    for query_word in query_words:
+        query_grams = trigrams(query_word)
+        if not any(
+            word.startswith(query_word) or _dice(query_grams, trigrams(word)) >= 0.5 for word in term_words
+        ):
+            return False
+    return True
+
+
+def to_suggestion(station: dict[str, Any]) -> dict[str, Any]:
+    """Shape a station like a Places autocomplete suggestion."""
+    name = str(station.get("name", ""))
+    line = station.get("line")
+    return {
+        "place_id": f"{STATION_PLACE_ID_PREFIX}{station.get('code')}",
+        "main_text": name,
+        "secondary_text": f"{line} ({station.get('code')})" if line else station.get("code"),
+        "description": f"{name}, {line}" if line else name,
+    }
+
+
+@lru_cache(maxsize=1)
+def get_station_search_index() -> StationSearchIndex:
+    """Build the search index once per process."""
+    # Imported here: google_maps_service owns the dataset load.
+    from services.google_maps_service import load_stations
+
+    settings = get_settings()
+    aliases: dict[str, list[str]] = {}
+    if os.path.exists(settings.STATION_ALIASES_PATH):
+        with open(settings.STATION_ALIASES_PATH, "r", encoding="utf-8") as alias_file:
+            aliases = json.load(alias_file)
+    return StationSearchIndex(load_stations(), aliases, min_score=settings.STATION_SEARCH_MIN_SCORE)
@@ -0,0 +1,258 @@
+"""Station-to-station travel times for schedule windows.
+
+Adjacent stations on a line are joined by a segment whose run time comes
+from a configured timetable (data/station_run_times.json) when present,
+otherwise from the straight-line distance at an average line speed plus a
+dwell at each stop. Stations sharing a name on different lines, and the
+interchange groups in data/station_interchanges.json, are joined by
+transfers. All-pairs shortest travel times (and the predecessor of each
+stop on those paths) are computed once, so a lookup is a dict hit and a
+list index.
+
+Timetable format (every key optional):
+    {
+        "dwell_minutes": 0.5,
+        "transfer_minutes": 5,
+        "segments": [{"from": "KJ01", "to": "KJ02", "minutes": 2.5}, ...]
+    }
+"""
+
+import datetime
+import heapq
+import json
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from core.config import get_settings
+from services.google_maps_service import load_stations
+
+EARTH_RADIUS_KM = 6371.0088
+# Never model a hop between two stops as shorter than this.
+MIN_SEGMENT_MINUTES = 1.0
+
+_CODE_PATTERN = re.compile(r"^([A-Za-z]+)(\d+)$")
+# Dataset codes zero-pad the stop number to this width ("KJ01").
+STATION_NUMBER_WIDTH = 2
+
+
+@dataclass
+class Timetable:
+    dwell_minutes: float = 0.5
+    transfer_minutes: float = 5.0
+    segments: dict[tuple[str, str], float] = field(default_factory=dict)
+
+
+def load_timetable(path: str) -> Timetable:
+    """Load configured run times; a missing file means coordinate estimates only."""
+    if not os.path.exists(path):
+        return Timetable()
+    with open(path, "r", encoding="utf-8") as timetable_file:
+        raw = json.load(timetable_file)
+    if not isinstance(raw, dict):
+        raise RuntimeError("Station run times must be a JSON object")
+
+    timetable = Timetable()
+    if "dwell_minutes" in raw:
+        timetable.dwell_minutes = float(raw["dwell_minutes"])
+    if "transfer_minutes" in raw:
+        timetable.transfer_minutes = float(raw["transfer_minutes"])
+    for segment in raw.get("segments", []):
+        try:
+            start, end, minutes = str(segment["from"]), str(segment["to"]), float(segment["minutes"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise RuntimeError(f"Invalid run time segment: {segment}") from exc
+        if minutes <= 0:
+            raise RuntimeError(f"Run time must be positive: {segment}")
+        timetable.segments[(start, end)] = minutes
+        timetable.segments.setdefault((end, start), minutes)
+    return timetable
+
+
+def load_interchanges(path: str) -> list[tuple[list[str], float | None]]:
+    """Load interchange groups: [{"stations": ["KJ13", "AG7"], "minutes": 4}, ...]."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as interchange_file:
+        raw = json.load(interchange_file)
+    if not isinstance(raw, list):
+        raise RuntimeError("Station interchanges must be a list")
+
+    groups: list[tuple[list[str], float | None]] = []
+    for group in raw:
+        try:
+            codes = [str(code).strip().upper() for code in group["stations"]]
+            minutes = float(group["minutes"]) if group.get("minutes") is not None else None
+        except (KeyError, TypeError, ValueError) as exc:
+            raise RuntimeError(f"Invalid interchange: {group}") from exc
+        groups.append((codes, minutes))
+    return groups
+
+
+def _haversine_km(a: dict[str, Any], b: dict[str, Any]) -> float:
+    lat1, lat2 = math.radians(float(a["latitude"])), math.radians(float(b["latitude"]))
+    dlat = lat2 - lat1
+    dlon = math.radians(float(b["longitude"]) - float(a["longitude"]))
+    h = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def parse_station_code(code: str) -> tuple[str, int] | None:
+    """(line prefix, stop number) of a code like "KJ13", or None for other strings."""
+    match = _CODE_PATTERN.match(code)
+    return (match.group(1).upper(), int(match.group(2))) if match else None
+
+
+def canonical_station_code(code: str) -> str:
+    """`code` as the dataset writes it: upper case, stop number zero-padded ("kj1" -> "KJ01")."""
+    code = code.strip().upper()
+    parsed = parse_station_code(code)
+    if parsed is None:
+        return code
+    line, number = parsed
+    return f"{line}{number:0{STATION_NUMBER_WIDTH}d}"
+
+
+def _code_order(code: str) -> tuple[str, int]:
+    return parse_station_code(code) or (code, 0)
+
+
+class TravelTimeMatrix:
+    """Precomputed shortest in-train minutes between every pair of stations."""
+
+    def __init__(
+        self,
+        stations: list[dict[str, Any]],
+        timetable: Timetable,
+        avg_speed_kmh: float,
+        interchanges: list[tuple[list[str], float | None]] | None = None,
+    ) -> None:
+        self.stations = stations
+        self.codes = [str(station["code"]) for station in stations]
+        self._index = {code: position for position, code in enumerate(self.codes)}
+        self.timetable = timetable
+        self.avg_speed_kmh = avg_speed_kmh
+        self.edges: list[list[tuple[int, float]]] = [[] for _ in stations]
+
+        by_line: dict[str, list[int]] = {}
+        by_name: dict[str, list[int]] = {}
+        for position, station in enumerate(stations):
+            by_line.setdefault(str(station.get("line") or ""), []).append(position)
+            by_name.setdefault(str(station.get("name") or "").strip().lower(), []).append(position)
+
+        for members in by_line.values():
+            members.sort(key=lambda position: _code_order(self.codes[position]))
+            for start, end in zip(members, members[1:]):
+                self._link(start, end, self._segment_minutes(stations, start, end))
+                self._link(end, start, self._segment_minutes(stations, end, start))
+
+        for members in by_name.values():
+            for start in members:
+                for end in members:
+                    if start != end:
+                        self._link(start, end, timetable.transfer_minutes)
+
+        for codes, minutes in interchanges or []:
+            # Stations on lines missing from the dataset are skipped.
+            members = [self._index[code] for code in codes if code in self._index]
+            for start in members:
+                for end in members:
+                    if start != end:
+                        self._link(start, end, timetable.transfer_minutes if minutes is None else minutes)
+
+        self._minutes: list[list[float]] = []
+        self._previous: list[list[int]] = []
+        for source in range(len(stations)):
+            best, previous = self._shortest_from(source)
+            self._minutes.append(best)
+            self._previous.append(previous)
+
+    def _segment_minutes(self, stations: list[dict[str, Any]], start: int, end: int) -> float:
+        configured = self.timetable.segments.get((self.codes[start], self.codes[end]))
+        if configured is not None:
+            return configured
+        running = _haversine_km(stations[start], stations[end]) / self.avg_speed_kmh * 60
+        return max(MIN_SEGMENT_MINUTES, running + self.timetable.dwell_minutes)
+
+    def _link(self, start: int, end: int, minutes: float) -> None:
+        self.edges[start].append((end, minutes))
+
+    def _shortest_from(self, source: int) -> tuple[list[float], list[int]]:
+        best = [math.inf] * len(self.codes)
+        previous = [-1] * len(self.codes)
+        best[source] = 0.0
+        queue = [(0.0, source)]
+        while queue:
+            minutes, node = heapq.heappop(queue)
+            if minutes > best[node]:
+                continue
+            for neighbour, cost in self.edges[node]:
+                candidate = minutes + cost
+                if candidate < best[neighbour]:
+                    best[neighbour] = candidate
+                    previous[neighbour] = node
+                    heapq.heappush(queue, (candidate, neighbour))
+        return best, previous
+
+    def minutes(self, departing_station: str, destination_station: str) -> float | None:
+        """In-train minutes between two station codes, or None if unknown/unconnected."""
+        start = self._index.get(departing_station.strip().upper())
+        end = self._index.get(destination_station.strip().upper())
+        if start is None or end is None:
+            return None
+        minutes = self._minutes[start][end]
+        return None if math.isinf(minutes) else minutes
+
+    def index_of(self, code: str) -> int | None:
+        return self._index.get(code.strip().upper())
+
+    def path(self, start: int, end: int) -> list[int] | None:
+        """Station positions along the fastest path, both ends included."""
+        if math.isinf(self._minutes[start][end]):
+            return None
+        positions = [end]
+        while positions[-1] != start:
+            positions.append(self._previous[start][positions[-1]])
+        positions.reverse()
+        return positions
+
+
+def _legacy_minutes(departing_station: str, destination_station: str) -> float:
+    """Old estimate (2 minutes per stop) for codes outside the dataset."""
+    departing, destination = parse_station_code(departing_station), parse_station_code(destination_station)
+    if departing is None or destination is None:
+        raise ValueError(f"Invalid station code: {departing_station} or {destination_station}")
+    _, departing_num = departing
+    _, destination_num = destination
+    return abs(destination_num - departing_num) * 2
+
+
+def journey_minutes(departing_station: str, destination_station: str) -> int:
+    """Door-to-platform buffer plus in-train minutes, rounded up."""
+    settings = get_settings()
+    minutes = get_travel_time_matrix().minutes(departing_station, destination_station)
+    if minutes is None:
+        minutes = _legacy_minutes(departing_station, destination_station)
+    return math.ceil(minutes + settings.TRAVEL_TIME_BUFFER_MINUTES)
+
+
+def calc_time_to(time_from: str, departing_station: str, destination_station: str) -> str:
+    """Expected arrival ("HH:MM") for a trip leaving at `time_from`."""
+    time_from_dt = datetime.datetime.strptime(time_from, "%H:%M")
+    time_to_dt = time_from_dt + datetime.timedelta(minutes=journey_minutes(departing_station, destination_station))
+    return time_to_dt.strftime("%H:%M")
+
+
+@lru_cache(maxsize=1)
+def get_travel_time_matrix() -> TravelTimeMatrix:
+    """Build the all-pairs matrix once per process."""
+    settings = get_settings()
+    return TravelTimeMatrix(
+        load_stations(),
+        load_timetable(settings.STATION_RUN_TIMES_PATH),
+        avg_speed_kmh=settings.TRAVEL_TIME_AVG_SPEED_KMH,
+        interchanges=load_interchanges(settings.STATION_INTERCHANGES_PATH),
+    )
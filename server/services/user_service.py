@@ -1,24 +1,55 @@
+import asyncio
 import datetime
+import hmac
+import logging
 from typing import Any
 from uuid import uuid4
 
+from google.api_core.exceptions import AlreadyExists
+
 from api.schemas.user import RegisterUserRequest, UserResponse
+from core.config import get_settings
 from core.firebase import get_firestore_client, initialize_firebase
-from utils.hashing_utils import hash_password, verify_password
+from core.hashing_pool import get_hashing_pool
+from utils.hashing_utils import needs_rehash
 
+logger = logging.getLogger("services.users")
 
-def _get_users_collection() -> Any:
+# emails/{normalized_email} -> {"user_id": ...}; makes lookups direct gets and
+# uniqueness enforceable at write time.
+EMAIL_INDEX_COLLECTION = "emails"
+
+
+def _get_db() -> Any:
     initialize_firebase()
     db = get_firestore_client()
     if db is None:
         raise RuntimeError("Could not obtain Firestore client")
-    return db.collection("users")
+    return db
+
+
+def _get_users_collection() -> Any:
+    return _get_db().collection("users")
 
 
-def _normalize_email(email: str) -> str:
+def _get_email_index_collection() -> Any:
+    return _get_db().collection(EMAIL_INDEX_COLLECTION)
+
+
+class InvalidEmailError(ValueError):
+    """The email cannot be stored under emails/{email}."""
+
+
+def normalize_email(email: str) -> str:
+    """Canonical email form, shared by the API, the jobs and the email index."""
     return email.lower().strip()
 
 
+def is_indexable_email(email: str) -> bool:
+    # "/" would turn emails/{email} into a nested path instead of a document id.
+    return "/" not in email
+
+
 def _parse_date_of_birth(date_of_birth: str | None) -> datetime.datetime:
     tz_utc8 = datetime.timezone(datetime.timedelta(hours=8))
     if date_of_birth:
@@ -29,21 +60,36 @@ def _parse_date_of_birth(date_of_birth: str | None) -> datetime.datetime:
     return datetime.datetime.now(datetime.timezone.utc)
 
 
+def _legacy_query_user(email: str) -> Any | None:
+    # Users created before the email index existed; disable the fallback once
+    # scripts/backfill_email_index.py has run.
+    if not get_settings().EMAIL_INDEX_LEGACY_FALLBACK:
+        return None
+    query = _get_users_collection().where("email", "==", email).limit(1)
+    return next(query.stream(), None)
+
+
 def check_email_exists(email: str) -> bool:
-    collection_ref = _get_users_collection()
-    query = collection_ref.where("email", "==", _normalize_email(email)).limit(1)
-    return any(True for _ in query.stream())
+    normalized = normalize_email(email)
+    if is_indexable_email(normalized) and _get_email_index_collection().document(normalized).get().exists:
+        return True
+    return _legacy_query_user(normalized) is not None
 
 
 def get_user_by_email(email: str) -> dict[str, Any] | None:
-    collection_ref = _get_users_collection()
-    query = collection_ref.where("email", "==", _normalize_email(email)).limit(1)
+    normalized = normalize_email(email)
+    index_snapshot = _get_email_index_collection().document(normalized).get() if is_indexable_email(normalized) else None
+    if index_snapshot is not None and index_snapshot.exists:
+        user_id = (index_snapshot.to_dict() or {}).get("user_id")
+        doc = _get_users_collection().document(str(user_id)).get() if user_id else None
+    else:
+        doc = _legacy_query_user(normalized)
 
-    for doc in query.stream():
-        data = doc.to_dict()
-        data["id"] = doc.id
-        return data
-    return None
+    if doc is None or not doc.exists:
+        return None
+    data = doc.to_dict() or {}
+    data["id"] = doc.id
+    return data
 
 
 def map_user_record_to_response(user_data: dict[str, Any]) -> UserResponse:
@@ -58,33 +104,64 @@ def map_user_record_to_response(user_data: dict[str, Any]) -> UserResponse:
     )
 
 
-def validate_login(email: str, password: str) -> bool:
-    user = get_user_by_email(email)
+async def validate_login(email: str, password: str) -> dict[str, Any] | None:
+    """Check credentials and return the user record, or None if they are wrong.
+
+    Legacy or low-cost hashes are upgraded on success.
+
+    bcrypt runs on the dedicated hashing pool and Firestore I/O on worker
+    threads, so the shared request threadpool is never held during a login.
+    """
+    user = await asyncio.to_thread(get_user_by_email, email)
     if user is None:
-        return False
-    stored_password = user.get("password_enc", "")
+        return None
+    stored_password = str(user.get("password_enc", ""))
     try:
-        return verify_password(password, stored_password)
+        is_valid = await get_hashing_pool().verify(password, stored_password)
     except ValueError:
         # Backward compatibility for legacy plaintext records.
-        return stored_password == password
+        is_valid = hmac.compare_digest(stored_password.encode("utf-8"), password.encode("utf-8"))
 
+    if not is_valid:
+        return None
+    if needs_rehash(stored_password):
+        await _rehash_password(str(user.get("id", "")), password)
+    return user
 
-def register_user(user_in: RegisterUserRequest) -> UserResponse:
+
+async def _rehash_password(user_id: str, password: str) -> None:
+    # Best effort: a failed upgrade must never fail the login itself.
+    try:
+        new_hash = await get_hashing_pool().hash(password)
+        collection_ref = _get_users_collection()
+        await asyncio.to_thread(
+            collection_ref.document(user_id).update,
+            {
+                "password_enc": new_hash,
+                "last_modified": datetime.datetime.now(datetime.timezone.utc),
+            },
+        )
+    except Exception as exc:
+        logger.warning("Password rehash failed for user %s: %s", user_id, exc)
+
+
+async def register_user(user_in: RegisterUserRequest) -> UserResponse:
     """
     Registers a new user into Firestore after normalization.
     """
 
-    email = _normalize_email(str(user_in.email))
+    email = normalize_email(str(user_in.email))
+    if not is_indexable_email(email):
+        raise InvalidEmailError("Email addresses containing '/' are not supported")
 
-    if check_email_exists(email):
+    if await asyncio.to_thread(check_email_exists, email):
         raise ValueError("User with this email already exists")
 
     now = datetime.datetime.now(datetime.timezone.utc)
     dob = _parse_date_of_birth(user_in.date_of_birth)
     record = {
         "user_name": user_in.username,
-        "password_enc": hash_password(user_in.password),
+        "password_enc": await get_hashing_pool().hash(user_in.password),
         "email": email,
         "date_of_birth": dob,
         "created_at": now,
@@ -93,11 +170,29 @@ def register_user(user_in: RegisterUserRequest) -> UserResponse:
     }
 
     doc_id = str(uuid4())
-    collection_ref = _get_users_collection()
-    collection_ref.document(doc_id).set(record)
+    try:
+        await asyncio.to_thread(_create_user_with_email_index, doc_id, email, record)
+    except AlreadyExists:
+        raise ValueError("User with this email already exists")
 
     return UserResponse(
         id=doc_id,
         email=email,
         username=user_in.username,
     )
+
+
+def _create_user_with_email_index(user_id: str, email: str, record: dict[str, Any]) -> None:
+    """Write the user and its email index atomically.
+
+    `create` fails if the index document already exists, so of two concurrent
+    registrations for one email exactly one commits.
+    """
+    db = _get_db()
+    batch = db.batch()
+    batch.create(
+        db.collection(EMAIL_INDEX_COLLECTION).document(email),
+        {"user_id": user_id, "created_at": record["created_at"]},
+    )
+    batch.set(db.collection("users").document(user_id), record)
+    batch.commit()
@@ -1,12 +1,29 @@
 
 import bcrypt
 
+from core.config import get_settings
+
 # Hash password with bcrypt
-def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()  # Generate a salt
+def hash_password(password: str, rounds: int | None = None) -> str:
+    salt = bcrypt.gensalt(rounds=rounds or get_settings().BCRYPT_ROUNDS)  # Generate a salt
     hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)  # Hash password with the salt
     return hashed_password.decode('utf-8')
 
 # Verify password with bcrypt
 def verify_password(password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+# Read the cost factor from a bcrypt hash ($2b$12$...), None if not bcrypt
+def get_hash_rounds(hashed_password: str) -> int | None:
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or not parts[1].startswith("2"):
+        return None
+    try:
+        return int(parts[2])
+    except ValueError:
+        return None
+
+# Legacy plaintext and lower-cost hashes should be upgraded on next login
+def needs_rehash(hashed_password: str, rounds: int | None = None) -> bool:
+    current_rounds = get_hash_rounds(hashed_password)
+    return current_rounds is None or current_rounds < (rounds or get_settings().BCRYPT_ROUNDS)